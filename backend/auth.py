@@ -5,8 +5,11 @@ management depends on `require_admin`. The token lives in an httpOnly,
 SameSite=Lax cookie so JavaScript never touches it and cross-site writes cannot
 carry it.
 """
+import asyncio
 import datetime as dt
-from typing import Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 import bcrypt
 import jwt
@@ -20,35 +23,111 @@ from config import (
     BOOTSTRAP_ADMIN_USERNAME,
     JWT_SECRET,
     JWT_TTL_HOURS,
+    PASSWORD_HASH_MAX_WAITING,
+    PASSWORD_HASH_WORKERS,
 )
 from database import async_session, get_db
 from models import User
+from session_cache import session_cache
 
 _ALGORITHM = "HS256"
 
 
-def hash_password(password: str) -> str:
+def _timed(function: Callable[..., Any], *args: Any) -> tuple[float, Any]:
+    return time.perf_counter(), function(*args)
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool, with queue counters for the admin UI.
+
+    ``workers`` calls run at once; up to ``max_waiting`` more queue behind
+    them, and further calls are refused with 503 until the queue drains.
+    """
+
+    def __init__(self, workers: int, max_waiting: int):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self.pending = 0
+        self.peak_pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.work_seconds = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    async def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.workers + self.max_waiting:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="password_hashing_busy")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        submitted = time.perf_counter()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, _timed, function, *args,
+            )
+        finally:
+            self.pending -= 1
+        wait = started - submitted
+        self.calls += 1
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.work_seconds += time.perf_counter() - started
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_waiting": self.max_waiting,
+            "in_flight": min(self.pending, self.workers),
+            "waiting": max(0, self.pending - self.workers),
+            "peak_pending": self.peak_pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+            "work_seconds": self.work_seconds,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_WAITING)
+
+
+def _hash(password: str) -> str:
     return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
 
 
-def verify_password(password: str, password_hash: str) -> bool:
+def _check(password: str, password_hash: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode(), password_hash.encode())
     except ValueError:
         return False
 
 
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(_hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await password_hasher.run(_check, password, password_hash)
+
+
 def create_token(user_id: int) -> str:
     now = dt.datetime.now(dt.timezone.utc)
     payload = {"sub": str(user_id), "iat": now, "exp": now + dt.timedelta(hours=JWT_TTL_HOURS)}
     return jwt.encode(payload, JWT_SECRET, algorithm=_ALGORITHM)
 
 
-def _user_id_from_token(token: str) -> Optional[int]:
+def _token_claims(token: str) -> Optional[tuple[int, float]]:
+    """The user id and expiry (epoch seconds) of a valid token, else None."""
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[_ALGORITHM])
-        return int(payload["sub"])
-    except (jwt.InvalidTokenError, KeyError, ValueError):
+        return int(payload["sub"]), float(payload["exp"])
+    except (jwt.InvalidTokenError, KeyError, TypeError, ValueError):
         return None
 
 
@@ -56,15 +135,24 @@ async def current_user(
     session_token: Optional[str] = Cookie(default=None, alias=AUTH_COOKIE_NAME),
     db: AsyncSession = Depends(get_db),
 ) -> Optional[User]:
-    """The signed-in user, or None. Used where auth is optional."""
+    """The signed-in user, or None. Used where auth is optional.
+
+    Resolved sessions are served from session_cache, so the returned User
+    may be a detached snapshot; routes only read it.
+    """
     if not session_token:
         return None
-    user_id = _user_id_from_token(session_token)
-    if user_id is None:
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        return cached
+    claims = _token_claims(session_token)
+    if claims is None:
         return None
+    user_id, expires_at = claims
     user = await db.get(User, user_id)
     if user is None or not user.is_active:
         return None
+    session_cache.put(session_token, user, expires_at - time.time())
     return user
 
 
@@ -94,7 +182,7 @@ async def ensure_bootstrap_admin() -> None:
             return
         db.add(User(
             username=BOOTSTRAP_ADMIN_USERNAME,
-            password_hash=hash_password(BOOTSTRAP_ADMIN_PASSWORD),
+            password_hash=await hash_password(BOOTSTRAP_ADMIN_PASSWORD),
             is_admin=True,
         ))
         await db.commit()
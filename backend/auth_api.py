@@ -12,6 +12,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from auth import (
     create_token,
     hash_password,
+    password_hasher,
     require_admin,
     require_user,
     verify_password,
@@ -20,6 +21,7 @@ from config import AUTH_COOKIE_NAME, AUTH_COOKIE_SECURE, JWT_TTL_HOURS
 from database import get_db
 from models import User
 from schemas import CreateUserRequest, LoginRequest, UpdateUserRequest, UserOut
+from session_cache import session_cache
 
 router = APIRouter()
 
@@ -40,7 +42,11 @@ def _set_session_cookie(response: Response, user_id: int) -> None:
 async def login(credentials: LoginRequest, response: Response, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == credentials.username))
     user = result.scalar_one_or_none()
-    if user is None or not user.is_active or not verify_password(credentials.password, user.password_hash):
+    if (
+        user is None
+        or not user.is_active
+        or not await verify_password(credentials.password, user.password_hash)
+    ):
         raise HTTPException(status_code=401, detail="Invalid username or password")
     _set_session_cookie(response, user.id)
     return user
@@ -65,6 +71,18 @@ async def list_users(_: User = Depends(require_user), db: AsyncSession = Depends
     return list(result.scalars())
 
 
+@router.get("/auth/password-hashing")
+async def password_hashing_stats(_: User = Depends(require_admin)):
+    """This worker's bcrypt pool: queue depth, rejections, and time spent."""
+    return password_hasher.stats()
+
+
+@router.get("/auth/session-cache")
+async def session_cache_stats(_: User = Depends(require_admin)):
+    """This worker's cached session lookups; each uvicorn worker has its own."""
+    return session_cache.stats()
+
+
 @router.post("/auth/users", response_model=UserOut, status_code=201)
 async def create_user(
     payload: CreateUserRequest,
@@ -73,7 +91,7 @@ async def create_user(
 ):
     user = User(
         username=payload.username,
-        password_hash=hash_password(payload.password),
+        password_hash=await hash_password(payload.password),
         is_admin=payload.is_admin,
     )
     db.add(user)
@@ -99,11 +117,13 @@ async def update_user(
     if user.id == admin.id and (payload.is_active is False or payload.is_admin is False):
         raise HTTPException(status_code=400, detail="You cannot deactivate or demote your own account")
     if payload.password is not None:
-        user.password_hash = hash_password(payload.password)
+        user.password_hash = await hash_password(payload.password)
     if payload.is_admin is not None:
         user.is_admin = payload.is_admin
     if payload.is_active is not None:
         user.is_active = payload.is_active
     await db.commit()
     await db.refresh(user)
+    # Other workers hear the trigger's 'user_auth' NOTIFY (migration 022).
+    session_cache.invalidate_user(user.id, user.auth_revision)
     return user
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncConnection
 
 from config import DATABASE_URL
 from database import async_session, engine
+from feature_reads import feature_counts
 
 
 logger = logging.getLogger(__name__)
@@ -153,13 +154,18 @@ async def _download(url: str, dest: Path) -> None:
                             last_progress = progress
 
 
+# feature_type is nullable; the summary's keys are JSON object keys.
+_UNTYPED_COUNT_KEY = "untyped"
+
+
 async def _counts() -> dict[str, int]:
     async with async_session() as db:
-        rows = (await db.execute(text(
-            "SELECT feature_type, count(*) FROM features "
-            "WHERE source_kind = 'osm_import' GROUP BY feature_type ORDER BY 2 DESC"
-        ))).all()
-    return {row[0]: row[1] for row in rows}
+        counts = await feature_counts(db)
+    return {
+        entry.feature_type or _UNTYPED_COUNT_KEY: entry.count
+        for entry in counts
+        if entry.source_kind == "osm_import"
+    }
 
 
 async def _run_job(country_key: str) -> None:
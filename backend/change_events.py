@@ -0,0 +1,267 @@
+"""Change notifications pushed to clients over Server-Sent Events.
+
+Each worker holds one raw asyncpg connection that LISTENs on the channels the
+migration-015 triggers NOTIFY, and fans every notification out to the open
+event streams. Subscribers replace per-tab ``/features/version`` polling, so
+idle tabs cost no pooled connections and no queries.
+
+Payloads are state, not deltas: a slow subscriber only ever needs the newest
+value per event, and a reconnect is repaired by re-reading current state.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import suppress
+from typing import Any
+
+import asyncpg
+
+from config import CHANGE_EVENTS_KEEPALIVE_S, DATABASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel -> SSE event name.
+CHANNELS = {"feature_stat": "features", "road_network_state": "road_network"}
+ROAD_NETWORK_FIELDS = ("status", "progress", "is_stale", "source_revision", "published_revision")
+KEEPALIVE = b": keepalive\n\n"
+# Browsers wait this long (ms) before reconnecting a dropped stream.
+RETRY = b"retry: 5000\n\n"
+_MAX_BACKOFF_S = 30.0
+# A connection must stay up this long before the reconnect backoff resets,
+# so a flapping database cannot drive a tight reconnect loop.
+_STABLE_CONNECTION_S = 60.0
+
+
+def sse_message(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def decode_notification(channel: str, payload: str) -> tuple[str, Any] | None:
+    if channel == "feature_stat":
+        return CHANNELS[channel], {"revision": int(payload)}
+    if channel == "road_network_state":
+        return CHANNELS[channel], json.loads(payload)
+    return None
+
+
+class Subscription:
+    """Latest value per event; pushes never block the broadcaster."""
+
+    def __init__(self) -> None:
+        self._pending: dict[str, Any] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, event: str, data: Any) -> None:
+        self._pending[event] = data
+        self._ready.set()
+
+    async def next(self, timeout: float) -> list[tuple[str, Any]]:
+        """Pending events, or an empty list once ``timeout`` passes idle."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return list(pending.items())
+
+
+async def _connect() -> asyncpg.Connection:
+    return await asyncpg.connect(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1))
+
+
+async def _snapshot(connection: asyncpg.Connection) -> dict[str, Any]:
+    revision = await connection.fetchval("SELECT revision FROM feature_stat WHERE id")
+    snapshot: dict[str, Any] = {"features": {"revision": revision}}
+    row = await connection.fetchrow(
+        f"SELECT {', '.join(ROAD_NETWORK_FIELDS)} FROM road_network_build_state WHERE id = 1"
+    )
+    if row is not None:
+        snapshot["road_network"] = dict(row)
+    return snapshot
+
+
+class ChangeBroadcaster:
+    """One LISTEN connection shared by every subscriber of this worker.
+
+    The connection opens with the first subscriber or watcher and, once no
+    watcher is registered, closes after the last subscriber leaves. It is
+    health-checked every keepalive tick and reopened with
+    backoff when lost; state is re-read after each LISTEN so nothing committed
+    while disconnected is missed.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]] = _connect,
+        snapshot: Callable[[Any], Awaitable[dict[str, Any]]] = _snapshot,
+        health_interval: float = CHANGE_EVENTS_KEEPALIVE_S,
+        min_backoff: float = 1.0,
+    ) -> None:
+        self._connect = connect
+        self._snapshot = snapshot
+        self._health_interval = health_interval
+        self._min_backoff = min_backoff
+        self._latest: dict[str, Any] = {}
+        self._watchers: dict[str, tuple[Callable[[str], None], Callable[[bool], None]]] = {}
+        self._subscribers: set[Subscription] = set()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._relisten = False
+        self._closing = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def _needed(self) -> bool:
+        return not self._closing and bool(self._subscribers or self._watchers)
+
+    def _start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        for event, data in self._latest.items():
+            subscription.push(event, data)
+        self._subscribers.add(subscription)
+        self._start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._needed:
+            self._wake.set()
+
+    def watch(
+        self,
+        channel: str,
+        on_payload: Callable[[str], None],
+        on_listening: Callable[[bool], None],
+    ) -> None:
+        """Deliver a channel that is not an SSE event to in-process state.
+
+        ``on_listening`` is told whenever the channel starts or stops being
+        heard, so state that depends on never missing a payload can reset.
+        A watcher keeps the connection open with no SSE subscriber; call it
+        from the running loop (the app lifespan).
+        """
+        self._watchers[channel] = (on_payload, on_listening)
+        if self._task is not None and not self._task.done():
+            # LISTEN on the new channel too: reconnect.
+            self._relisten = True
+            self._wake.set()
+        self._start()
+
+    def _set_listening(self, listening: bool) -> None:
+        for _, on_listening in self._watchers.values():
+            on_listening(listening)
+
+    def publish(self, event: str, data: Any) -> None:
+        if self._latest.get(event) == data:
+            return
+        self._latest[event] = data
+        for subscription in self._subscribers:
+            subscription.push(event, data)
+
+    def _on_notification(self, _connection, _pid, channel: str, payload: str) -> None:
+        if channel in self._watchers:
+            try:
+                self._watchers[channel][0](payload)
+            except ValueError:
+                logger.warning("Ignoring malformed %s notification: %r", channel, payload)
+            return
+        try:
+            decoded = decode_notification(channel, payload)
+        except ValueError:
+            logger.warning("Ignoring malformed %s notification: %r", channel, payload)
+            return
+        if decoded is not None:
+            self.publish(*decoded)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        backoff = self._min_backoff
+        while self._needed:
+            try:
+                connection = await self._connect()
+            except Exception:
+                logger.warning("Change-event LISTEN connection failed; retrying in %.0fs", backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, _MAX_BACKOFF_S)
+                continue
+            connected_at = loop.time()
+            try:
+                connection.add_termination_listener(lambda _connection: self._wake.set())
+                self._relisten = False
+                for channel in (*CHANNELS, *self._watchers):
+                    await connection.add_listener(channel, self._on_notification)
+                for event, data in (await self._snapshot(connection)).items():
+                    self.publish(event, data)
+                self._set_listening(True)
+                await self._hold(connection)
+            except Exception:
+                logger.warning("Change-event LISTEN connection lost", exc_info=True)
+            finally:
+                self._set_listening(False)
+                if not connection.is_closed():
+                    await connection.close()
+            if self._relisten or not self._needed:
+                continue
+            if loop.time() - connected_at >= _STABLE_CONNECTION_S:
+                backoff = self._min_backoff
+            logger.warning("Change-event LISTEN connection closed; reconnecting in %.0fs", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, _MAX_BACKOFF_S)
+        # Cached state may go stale once nobody is listening.
+        self._latest.clear()
+
+    async def _hold(self, connection) -> None:
+        while self._needed and not self._relisten and not connection.is_closed():
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._health_interval)
+            except asyncio.TimeoutError:
+                # Half-open sockets only surface when something is sent.
+                await connection.fetchval("SELECT 1")
+
+    async def close(self) -> None:
+        # Also ends the loop should the cancel land as the wake completes,
+        # which wait_for may swallow.
+        self._closing = True
+        self._subscribers.clear()
+        self._wake.set()
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._watchers.clear()
+        self._closing = False
+
+
+async def event_stream(
+    broadcaster: ChangeBroadcaster,
+    keepalive: float = CHANGE_EVENTS_KEEPALIVE_S,
+) -> AsyncIterator[bytes]:
+    """SSE body: current state first, then every change, with idle keepalives."""
+    subscription = broadcaster.subscribe()
+    try:
+        yield RETRY
+        while True:
+            events = await subscription.next(keepalive)
+            if not events:
+                yield KEEPALIVE
+            for event, data in events:
+                yield sse_message(event, data)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+broadcaster = ChangeBroadcaster()
@@ -16,6 +16,78 @@ FULL_BASE_THRESHOLD = int(os.getenv("FULL_BASE_THRESHOLD", "50000"))
 # Bounded feature reads never return more than this many rows, so a viewport
 # query at low zoom over a country-scale dataset cannot flood the browser.
 FEATURE_QUERY_LIMIT = int(os.getenv("FEATURE_QUERY_LIMIT", "4000"))
+# Default page size of the keyset-paginated /features/page walk.
+FEATURE_PAGE_SIZE = int(os.getenv("FEATURE_PAGE_SIZE", "1000"))
+# Most features one /features/batch-get read, or operations one
+# /features/batch transaction, may name.
+FEATURE_BATCH_LIMIT = int(os.getenv("FEATURE_BATCH_LIMIT", "1000"))
+# Most grid cells one /features/clusters read may return; wider viewports are
+# answered from a coarser grid level instead.
+CLUSTER_MAX_CELLS = int(os.getenv("CLUSTER_MAX_CELLS", "4096"))
+
+# Rows fetched per server-side cursor round trip when /features streams its
+# collection; bounds per-request memory independently of the result size.
+FEATURE_STREAM_BATCH_SIZE = int(os.getenv("FEATURE_STREAM_BATCH_SIZE", "1000"))
+
+# /features/changes answers "full reload required" instead of a delta once
+# more rows than this changed since the client's revision.
+FEATURE_CHANGES_LIMIT = int(os.getenv("FEATURE_CHANGES_LIMIT", "5000"))
+
+# Per-worker LRU of serialized bbox viewport responses, invalidated by the
+# feature_stat revision. 0 disables it. Viewports are snapped outward to this
+# grid (degrees) so editors panning the same area share entries.
+VIEWPORT_CACHE_MAX_BYTES = int(os.getenv("VIEWPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+VIEWPORT_SNAP_DEGREES = float(os.getenv("VIEWPORT_SNAP_DEGREES", "0.005"))
+# Per-worker LRU of recent /features/search results, invalidated the same way.
+# Type-ahead repeats the same few prefixes, so a small budget covers it.
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# Per-worker cache of rendered editor vector tiles, evicted tile by tile from
+# the bounds each write records (migration 017). 0 disables it. Set
+# TILE_CACHE_MBTILES to a writable path to also keep tiles in a shared
+# on-disk MBTiles file that survives restarts and is shared by workers.
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+TILE_CACHE_MBTILES = os.getenv("TILE_CACHE_MBTILES", "")
+
+# Let PostgreSQL assemble collection reads as final GeoJSON text, skipping the
+# per-row json.loads → model → JSON round trip in Python. Opt-in until a
+# deployment has compared both paths on its own data.
+FEATURE_SQL_ASSEMBLY = os.getenv("FEATURE_SQL_ASSEMBLY", "").lower() in ("1", "true", "yes")
+
+# Shapely validation and road splitting of geometries with at least this many
+# positions run on a worker pool instead of the event loop, so one huge
+# polygon edit does not stall every other request on the worker. Smaller ones
+# stay inline, where a pool hop would cost more than the work. The pool is
+# GEOMETRY_WORKERS threads (GEOS releases the GIL) or, with
+# GEOMETRY_EXECUTOR=process, processes; 0 workers keeps everything inline.
+GEOMETRY_OFFLOAD_MIN_VERTICES = int(os.getenv("GEOMETRY_OFFLOAD_MIN_VERTICES", "2000"))
+GEOMETRY_WORKERS = int(os.getenv("GEOMETRY_WORKERS", "2"))
+GEOMETRY_EXECUTOR = os.getenv("GEOMETRY_EXECUTOR", "thread").lower()
+
+# Overpass imports start the preferred mirror and, when it has not sent a
+# byte after this many seconds, the next one too; the first to answer wins
+# and the others are cancelled. 0 walks the mirrors one at a time instead.
+OVERPASS_HEDGE_DELAY_S = float(os.getenv("OVERPASS_HEDGE_DELAY_S", "5"))
+# Set OVERPASS_CACHE_DIR to a writable directory to keep raw Overpass
+# responses on disk, compressed and shared by workers, so repeating an import
+# of the same area skips the mirrors. Entries expire after the TTL; past the
+# byte budget the least recently used go first. Imports may bypass it.
+OVERPASS_CACHE_DIR = os.getenv("OVERPASS_CACHE_DIR", "")
+OVERPASS_CACHE_MAX_BYTES = int(os.getenv("OVERPASS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+OVERPASS_CACHE_TTL_S = float(os.getenv("OVERPASS_CACHE_TTL_S", str(6 * 3600)))
+
+# Admin area imports (oblast scale) are cut into square tiles of this many
+# degrees, each one Overpass query within the 0.25 deg² viewport-import cap,
+# and fetched this many at a time; public mirrors allow only a couple of
+# concurrent queries per client.
+TILED_IMPORT_MAX_AREA_DEG2 = float(os.getenv("TILED_IMPORT_MAX_AREA_DEG2", "16"))
+TILED_IMPORT_TILE_DEGREES = min(0.5, float(os.getenv("TILED_IMPORT_TILE_DEGREES", "0.5")))
+TILED_IMPORT_CONCURRENCY = max(1, int(os.getenv("TILED_IMPORT_CONCURRENCY", "2")))
+
+# Server-Sent Events: seconds between keepalive comments on an idle stream.
+# Below nginx's proxy_read_timeout so idle subscribers are not cut off; the
+# same tick health-checks the worker's LISTEN connection.
+CHANGE_EVENTS_KEEPALIVE_S = float(os.getenv("CHANGE_EVENTS_KEEPALIVE_S", "25"))
 
 # Production traffic is same-origin through nginx; CORS exists only for direct
 # development access to :8000. Wildcard origins with credentials are invalid
@@ -46,3 +118,17 @@ ROUTE_STATEMENT_TIMEOUT_MS = int(os.getenv("ROUTE_STATEMENT_TIMEOUT_MS", "60000"
 # never wide open on a fresh install. Leave unset to seed no one.
 BOOTSTRAP_ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "")
 BOOTSTRAP_ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "")
+
+# Seconds a validated session token and its active user stay cached per
+# worker, and how many sessions are kept; 0 disables the cache. Sessions are
+# cached only while the worker's change-event connection LISTENs, so the
+# 'user_auth' notification (022) evicts them on any authorization change.
+AUTH_SESSION_CACHE_TTL_S = float(os.getenv("AUTH_SESSION_CACHE_TTL_S", "30"))
+AUTH_SESSION_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_SESSION_CACHE_MAX_ENTRIES", "1024"))
+
+# bcrypt takes a few hundred milliseconds per call by design, so it runs on a
+# pool of this many threads instead of the event loop (bcrypt releases the
+# GIL). At most PASSWORD_HASH_MAX_WAITING calls queue behind them; a login
+# flood beyond that gets 503 rather than an ever-growing queue.
+PASSWORD_HASH_WORKERS = max(1, int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+PASSWORD_HASH_MAX_WAITING = max(0, int(os.getenv("PASSWORD_HASH_MAX_WAITING", "32")))
@@ -0,0 +1,93 @@
+"""Thin HTTP routes that read or write many features per request: the
+cursor-paged full walk, batch reads by id, and transactional batches.
+
+main.py includes this router before features_api's, so ``/features/page``
+is not taken for a ``/features/{feature_id}`` read.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import require_user
+from config import FEATURE_PAGE_SIZE, FEATURE_QUERY_LIMIT
+from database import get_db
+import feature_batch_service as batches
+from feature_http import bbox_predicate, mutation_http_error, parse_bbox
+from feature_reads import (
+    PageCursor,
+    collection_query,
+    decode_page_cursor,
+    feature_batch,
+    feature_page,
+    feature_revision,
+    page_query,
+)
+from models import User
+from schemas import (
+    FeatureBatch,
+    FeatureBatchResponse,
+    FeatureIds,
+    GeoJSONFeatureBatch,
+    GeoJSONFeaturePage,
+)
+
+
+router = APIRouter()
+
+
+@router.get("/features/page", response_model=GeoJSONFeaturePage)
+async def get_feature_page(
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    bbox: Optional[str] = Query(
+        default=None,
+        description="west,south,east,north; first page only, later pages keep it",
+    ),
+    limit: int = Query(default=FEATURE_PAGE_SIZE, ge=1, le=FEATURE_QUERY_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    """Walk every feature in id order, one bounded page per request."""
+    if cursor is None:
+        bounds = parse_bbox(bbox) if bbox is not None else None
+        page = PageCursor(after_id=0, revision=await feature_revision(db), bounds=bounds)
+    else:
+        try:
+            page = decode_page_cursor(cursor)
+        except ValueError as error:
+            raise HTTPException(status_code=422, detail=str(error)) from error
+        if bbox is not None and parse_bbox(bbox) != page.bounds:
+            raise HTTPException(status_code=422, detail="bbox does not match the page cursor")
+    query = collection_query()
+    if page.bounds is not None:
+        query = query.where(bbox_predicate(page.bounds))
+    body = await feature_page(db, page_query(query, page, limit), page, limit)
+    return Response(body, media_type="application/json")
+
+
+@router.post("/features/batch-get", response_model=GeoJSONFeatureBatch)
+async def get_feature_batch(request: FeatureIds, db: AsyncSession = Depends(get_db)):
+    """Many features in one round trip, in request order; ids with no feature
+    are listed under ``missing`` instead of failing the batch."""
+    return Response(await feature_batch(db, request.ids), media_type="application/json")
+
+
+@router.post("/features/batch", response_model=FeatureBatchResponse)
+async def apply_feature_batch(
+    batch: FeatureBatch,
+    user: User = Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create, update, and delete many features in one transaction. Each
+    update or delete carries its own If-Match version as ``if_match``."""
+    try:
+        results = await batches.apply_feature_batch(db, batch.operations, user)
+    except batches.BatchOperationFailed as failure:
+        error = mutation_http_error(failure.error)
+        rejected = FeatureBatchResponse(
+            committed=False,
+            results=batches.batch_failure_results(batch.operations, failure),
+            detail=error.detail,
+        )
+        return JSONResponse(rejected.model_dump(mode="json"), status_code=error.status_code)
+    return FeatureBatchResponse(committed=True, results=results)
@@ -0,0 +1,256 @@
+"""Transactional create/update/delete batches over the feature mutation
+services.
+
+Each operation is validated like its single-feature route, but the batch
+reads its targets, building links and published roads with one query each
+and commits once (rule B6). Validation follows list order; the writes are
+then sent together.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Mapping, Optional, Sequence
+
+from geoalchemy2.functions import ST_AsGeoJSON
+from sqlalchemy import ARRAY, Integer, any_, bindparam, delete, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from feature_mutations import (
+    FeatureMutationError,
+    FeatureNotFound,
+    InvalidFeature,
+    Prefetched,
+    StaleFeature,
+    apply_update,
+    check_delete,
+    database_conflict,
+    new_feature,
+    parse_version_tag,
+)
+from models import Feature, User
+from schemas import FeatureBatchOperation, FeatureBatchResult
+from serializers import feature_response
+
+
+class BatchOperationFailed(FeatureMutationError):
+    """One operation stopped a batch; the whole batch was rolled back.
+
+    ``index`` is None when the failure surfaced at commit and cannot be
+    pinned to one operation.
+    """
+
+    def __init__(self, index: Optional[int], error: FeatureMutationError):
+        super().__init__(str(error))
+        self.index = index
+        self.error = error
+
+
+def batch_failure_results(
+    operations: Sequence[FeatureBatchOperation],
+    failure: BatchOperationFailed,
+) -> list[FeatureBatchResult]:
+    return [
+        FeatureBatchResult(
+            op=operation.op,
+            id=getattr(operation, "id", None),
+            status="failed" if index == failure.index else "not_applied",
+            detail=str(failure.error) if index == failure.index else None,
+        )
+        for index, operation in enumerate(operations)
+    ]
+
+
+def _id_array(feature_ids: Sequence[int]):
+    return bindparam("feature_ids", list(feature_ids), type_=ARRAY(Integer))
+
+
+async def _locked_features(
+    db: AsyncSession,
+    feature_ids: Sequence[int],
+) -> dict[int, tuple[Feature, Optional[str]]]:
+    # One read locks every target, in id order so two overlapping batches
+    # cannot deadlock.
+    rows = (await db.execute(
+        select(Feature, ST_AsGeoJSON(Feature.geometry).label("geometry_json"))
+        .where(Feature.id == any_(_id_array(sorted(feature_ids))))
+        .order_by(Feature.id)
+        .with_for_update()
+    )).all()
+    return {row.Feature.id: (row.Feature, row.geometry_json) for row in rows}
+
+
+async def _prefetch(
+    db: AsyncSession,
+    operations: Sequence[FeatureBatchOperation],
+    locked: Mapping[int, tuple[Feature, Optional[str]]],
+) -> Prefetched:
+    """Every building a batch may link to and every published road it may
+    delete or tombstone, read before the first operation is staged."""
+    building_ids = {feature.building_id for feature, _ in locked.values()}
+    building_ids.update(
+        operation.feature.building_id for operation in operations if operation.op != "delete"
+    )
+    building_ids.discard(None)
+    road_ids = [feature.id for feature, _ in locked.values() if feature.feature_type == "road"]
+    building_types = dict((await db.execute(
+        select(Feature.id, Feature.feature_type)
+        .where(Feature.id == any_(_id_array(sorted(building_ids))))
+    )).all()) if building_ids else {}
+    published_roads = set((await db.scalars(
+        text("SELECT DISTINCT feature_id FROM road_network_edges "
+             "WHERE feature_id = ANY(:feature_ids)")
+        .bindparams(_id_array(road_ids))
+    )).all()) if road_ids else set()
+    return Prefetched(building_types, published_roads)
+
+
+async def _stage_operation(
+    db: AsyncSession,
+    operation: FeatureBatchOperation,
+    user: User,
+    expected_updated_at: Optional[datetime],
+    locked: Mapping[int, tuple[Feature, Optional[str]]],
+    prefetched: Prefetched,
+) -> tuple[str, Feature]:
+    if operation.op == "create":
+        db_feature = await new_feature(db, operation.feature, user, prefetched)
+        db.add(db_feature)
+        return "created", db_feature
+    if operation.id not in locked:
+        raise FeatureNotFound("Feature not found")
+    db_feature, geometry_json = locked[operation.id]
+    if db_feature.updated_at != expected_updated_at:
+        raise StaleFeature("feature_changed")
+    if operation.op == "delete":
+        await check_delete(
+            db, db_feature, confirm_published=operation.confirm_published, prefetched=prefetched,
+        )
+        return "deleted", db_feature
+    if geometry_json is None:
+        raise InvalidFeature("Feature geometry is missing")
+    await apply_update(
+        db, db_feature, json.loads(geometry_json), operation.feature, user,
+        confirm_published=operation.confirm_published, prefetched=prefetched,
+    )
+    return "updated", db_feature
+
+
+def _track(
+    prefetched: Prefetched,
+    locked: Mapping[int, tuple[Feature, Optional[str]]],
+    status: str,
+    db_feature: Feature,
+) -> None:
+    """Show later operations the effect of a staged one on building links,
+    as if the batch ran one operation at a time."""
+    if status == "deleted":
+        prefetched.building_types.pop(db_feature.id, None)
+        # The DELETE clears these links in the database (ON DELETE SET NULL);
+        # clear them in memory too, without marking the rows dirty.
+        for feature, _ in locked.values():
+            if feature.building_id == db_feature.id:
+                set_committed_value(feature, "building_id", None)
+    elif status == "updated":
+        prefetched.building_types[db_feature.id] = db_feature.feature_type
+
+
+async def _written_results(
+    db: AsyncSession,
+    operations: Sequence[FeatureBatchOperation],
+    staged: Sequence[tuple[str, Feature]],
+) -> list[FeatureBatchResult]:
+    # One read returns every written row with its trigger-set updated_at and
+    # any building link a later delete cleared. It runs before the commit,
+    # while the rows are still locked or invisible to others, so none can
+    # have been deleted since they were written.
+    written = [db_feature.id for status, db_feature in staged if status != "deleted"]
+    rows = (await db.execute(
+        select(Feature, ST_AsGeoJSON(Feature.geometry).label("geometry_json"))
+        .where(Feature.id == any_(_id_array(written)))
+        .execution_options(populate_existing=True)
+    )).all() if written else []
+    current = {row.Feature.id: row for row in rows}
+    results = []
+    for operation, (status, db_feature) in zip(operations, staged):
+        response = None
+        if status != "deleted":
+            row = current[db_feature.id]
+            geometry = json.loads(row.geometry_json) if row.geometry_json else None
+            response = feature_response(row.Feature, geometry)
+        results.append(FeatureBatchResult(
+            op=operation.op, id=db_feature.id, status=status, feature=response,
+        ))
+    return results
+
+
+async def apply_feature_batch(
+    db: AsyncSession,
+    operations: Sequence[FeatureBatchOperation],
+    user: User,
+) -> list[FeatureBatchResult]:
+    """Apply create/update/delete operations in one transaction, with the
+    outcome of running them one at a time in list order.
+
+    Versions and duplicate targets are checked before any row is read, every
+    target is locked by one query, and the building links and published-road
+    checks of every operation are read by one query each. Operations are
+    then validated in list order, each against the batch's earlier ones: a
+    business cannot link to a building deleted before it. The writes go out
+    together: creates and updates are flushed, then one DELETE removes every
+    deleted row, clearing links to them (ON DELETE SET NULL) just as a later
+    single delete would. The written rows are read back and the batch
+    commits once, so the feature_stat revision moves once (migration 021).
+    The first failing operation rolls everything back and raises
+    BatchOperationFailed.
+    """
+    versions: dict[int, datetime] = {}
+    for index, operation in enumerate(operations):
+        if operation.op == "create":
+            continue
+        try:
+            if operation.id in versions:
+                raise InvalidFeature("A feature may appear only once in a batch")
+            versions[operation.id] = parse_version_tag(operation.if_match)
+        except FeatureMutationError as error:
+            raise BatchOperationFailed(index, error) from error
+
+    staged: list[tuple[str, Feature]] = []
+    try:
+        locked = await _locked_features(db, list(versions)) if versions else {}
+        prefetched = await _prefetch(db, operations, locked)
+        # Validation reads must not flush row by row; the commit flushes the
+        # staged inserts and updates together.
+        with db.no_autoflush:
+            for index, operation in enumerate(operations):
+                try:
+                    status, db_feature = await _stage_operation(
+                        db, operation, user, versions.get(getattr(operation, "id", None)),
+                        locked, prefetched,
+                    )
+                except FeatureMutationError as error:
+                    raise BatchOperationFailed(index, error) from error
+                _track(prefetched, locked, status, db_feature)
+                staged.append((status, db_feature))
+        deleted_ids = [db_feature.id for status, db_feature in staged if status == "deleted"]
+        try:
+            await db.flush()
+            if deleted_ids:
+                for status, db_feature in staged:
+                    if status == "deleted":
+                        db.expunge(db_feature)
+                await db.execute(
+                    delete(Feature)
+                    .where(Feature.id == any_(_id_array(deleted_ids)))
+                    .execution_options(synchronize_session=False)
+                )
+            results = await _written_results(db, operations, staged)
+            await db.commit()
+        except IntegrityError as error:
+            raise BatchOperationFailed(None, database_conflict(error)) from error
+    except BatchOperationFailed:
+        await db.rollback()
+        raise
+    return results
@@ -4,7 +4,12 @@ from __future__ import annotations
 import math
 from typing import Any, Mapping
 
+import shapely
 from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+# A west, south, east, north box in WGS84 degrees.
+Bounds = tuple[float, float, float, float]
 
 
 FEATURE_TYPES = (
@@ -36,6 +41,8 @@ _SUPPORTED_GEOMETRIES = {
     "Polygon",
     "MultiPolygon",
 }
+# Levels of lists between "coordinates" and its positions.
+_NESTING = {"Point": 0, "LineString": 1, "MultiLineString": 2, "Polygon": 2, "MultiPolygon": 3}
 
 
 def _finite_coordinates(value: Any) -> bool:
@@ -48,16 +55,75 @@ def _finite_coordinates(value: Any) -> bool:
     return False
 
 
-def validate_geometry_mapping(geometry: Mapping[str, Any]) -> None:
-    """Validate the structural invariants every API geometry must satisfy."""
+def _is_position(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) and len(value) in (2, 3) and not any(
+        isinstance(item, (list, tuple)) for item in value
+    )
+
+
+def _nested_positions(value: Any, depth: int) -> bool:
+    if depth == 0:
+        return _is_position(value)
+    return isinstance(value, (list, tuple)) and all(
+        _nested_positions(item, depth - 1) for item in value
+    )
+
+
+class ValidGeometry(dict):
+    """A GeoJSON geometry that passed validate_geometry_mapping(), parsed once.
+
+    It is still the GeoJSON mapping, so it dumps and serializes unchanged, and
+    it carries the Shapely geometry the checks built. Schemas create it at the
+    request boundary; the type checks, road checks, and the WKB written to
+    PostGIS reuse ``shape`` instead of parsing the coordinates again.
+    """
+
+    def __init__(self, geometry: Mapping[str, Any], parsed: BaseGeometry):
+        super().__init__(geometry)
+        self.shape = parsed
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        return self.shape.bounds
+
+    @property
+    def wkb(self) -> bytes:
+        return self.shape.wkb
+
+
+def check_geometry_structure(geometry: Mapping[str, Any]) -> None:
+    """The checks of validate_geometry_mapping() that need no Shapely parse."""
     if not isinstance(geometry, Mapping):
         raise ValueError("geometry must be a GeoJSON object")
     geometry_type = geometry.get("type")
     if geometry_type not in _SUPPORTED_GEOMETRIES:
         raise ValueError(f"unsupported GeoJSON geometry type: {geometry_type}")
-    coordinates = geometry.get("coordinates")
-    if not _finite_coordinates(coordinates):
+    if not _finite_coordinates(geometry.get("coordinates")):
         raise ValueError("geometry coordinates must contain only finite numbers")
+    if not _nested_positions(geometry["coordinates"], _NESTING[geometry_type]):
+        raise ValueError(
+            f"{geometry_type} coordinates must nest {_NESTING[geometry_type]} list level(s) "
+            "of [longitude, latitude] positions"
+        )
+
+
+def vertex_count(geometry: Mapping[str, Any]) -> int:
+    """Positions in a structurally checked geometry, without parsing it."""
+    if isinstance(geometry, ValidGeometry):
+        return shapely.get_num_coordinates(geometry.shape)
+    if geometry["type"] == "Point":
+        return 1
+    items = [geometry["coordinates"]]
+    for _ in range(_NESTING[geometry["type"]] - 1):
+        items = [child for item in items for child in item]
+    return sum(len(item) for item in items)
+
+
+def validate_geometry_mapping(geometry: Mapping[str, Any]) -> ValidGeometry:
+    """Validate the structural invariants every API geometry must satisfy."""
+    if isinstance(geometry, ValidGeometry):
+        return geometry
+    check_geometry_structure(geometry)
     try:
         parsed = shape(geometry)
     except Exception as error:
@@ -69,11 +135,21 @@ def validate_geometry_mapping(geometry: Mapping[str, Any]) -> None:
     min_x, min_y, max_x, max_y = parsed.bounds
     if min_x < -180 or max_x > 180 or min_y < -90 or max_y > 90:
         raise ValueError("geometry coordinates must use valid longitude and latitude")
+    return ValidGeometry(geometry, parsed)
 
 
-def validate_feature_geometry(feature_type: str | None, geometry: Mapping[str, Any]) -> None:
+def validate_feature_geometry(
+    feature_type: str | None,
+    geometry: Mapping[str, Any],
+) -> ValidGeometry:
     """Ensure a feature category uses a geometry the editor can safely handle."""
-    validate_geometry_mapping(geometry)
+    valid = validate_geometry_mapping(geometry)
+    check_feature_geometry_type(feature_type, valid)
+    return valid
+
+
+def check_feature_geometry_type(feature_type: str | None, geometry: Mapping[str, Any]) -> None:
+    """The category check of validate_feature_geometry() alone."""
     geometry_type = geometry["type"]
     if feature_type in _POINT_FEATURE_TYPES and geometry_type != "Point":
         raise ValueError(f"{feature_type} features require Point geometry")
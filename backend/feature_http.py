@@ -0,0 +1,66 @@
+"""HTTP helpers shared by the feature routers (rule B1): mutation errors
+as statuses, If-Match versions, ETag validators, and bbox parameters.
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Header, HTTPException, Response
+from sqlalchemy import func
+
+import feature_mutations as mutations
+from feature_domain import Bounds
+from feature_reads import validator_headers
+from models import Feature
+
+
+def mutation_http_error(error: mutations.FeatureMutationError) -> HTTPException:
+    if isinstance(error, mutations.FeatureNotFound):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, mutations.PreconditionRequired):
+        return HTTPException(status_code=428, detail=str(error))
+    if isinstance(error, mutations.InvalidFeature):
+        return HTTPException(status_code=422, detail=str(error))
+    if isinstance(error, mutations.StaleFeature):
+        return HTTPException(status_code=409, detail=str(error))
+    if isinstance(error, mutations.PublishedRoadConfirmationRequired):
+        return HTTPException(status_code=409, detail=str(error))
+    if isinstance(error, mutations.FeatureConflict):
+        return HTTPException(status_code=409, detail=str(error))
+    return HTTPException(status_code=500, detail="Feature mutation failed")
+
+
+def expected_updated_at(
+    if_match: Optional[str] = Header(default=None, alias="If-Match"),
+) -> datetime:
+    try:
+        return mutations.parse_version_tag(if_match)
+    except mutations.FeatureMutationError as error:
+        raise mutation_http_error(error) from error
+
+
+def with_validators(result, response: Response, etag: str):
+    """Attach the ETag to a model result or to an already-built Response."""
+    target = result if isinstance(result, Response) else response
+    target.headers.update(validator_headers(etag))
+    return result
+
+
+def parse_bbox(bbox: str) -> Bounds:
+    parts = bbox.split(",")
+    if len(parts) != 4:
+        raise HTTPException(status_code=422, detail="bbox must be 'west,south,east,north'")
+    try:
+        west, south, east, north = (float(part) for part in parts)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail="bbox values must be numbers") from error
+    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+        raise HTTPException(
+            status_code=422,
+            detail="bbox must use valid coordinates with west < east and south < north",
+        )
+    return west, south, east, north
+
+
+def bbox_predicate(bounds: Bounds):
+    envelope = func.ST_MakeEnvelope(*bounds, 4326)
+    return func.ST_Intersects(Feature.geometry, envelope)
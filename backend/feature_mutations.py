@@ -6,22 +6,23 @@ validation, row locking, and transaction ownership stay out of the router.
 from __future__ import annotations
 
 import json
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Mapping, Optional
+from typing import AbstractSet, Any, Mapping, Optional
 
 from geoalchemy2.functions import ST_AsGeoJSON
 from geoalchemy2.shape import from_shape
-from shapely.geometry import shape
-from sqlalchemy import delete, select, text
+from sqlalchemy import Update, delete, select, text, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from feature_domain import validate_feature_geometry
+import geometry_work
+from feature_domain import ValidGeometry, validate_feature_geometry, vertex_count
 from models import Feature, SOURCE_KIND_MANUAL, SOURCE_KIND_OSM_IMPORT, User
 from road_catalog import RoadValueError, validate_road_values
 from road_geometry import RoadGeometryError, validate_road_geometry
-from schemas import FeatureCreate, FeatureUpdate
-from serializers import feature_response
+from schemas import FeatureCreate, FeatureResponse, FeatureUpdate
+from serializers import PROPERTY_COLUMNS, feature_response
 
 
 class FeatureMutationError(Exception):
@@ -52,6 +53,16 @@ class FeatureConflict(FeatureMutationError):
     pass
 
 
+@dataclass(frozen=True)
+class Prefetched:
+    """Validation lookups a batch reads up front, one query each (rule B6),
+    instead of once per operation. The batch updates ``building_types`` as
+    it stages each operation, so later operations see earlier ones."""
+
+    building_types: dict[int, str]
+    published_roads: AbstractSet[int]
+
+
 def parse_version_tag(value: str | None) -> datetime:
     """Parse the quoted updated_at value carried in the If-Match header."""
     if value is None:
@@ -77,11 +88,23 @@ def source_kind_after_user_update(current: str, resulting: Optional[str]) -> Opt
     return resulting
 
 
-def geometry_value(geometry: Mapping[str, Any], feature_type: str | None = None):
+def validated_geometry(feature_type: str | None, geometry: Mapping[str, Any]) -> ValidGeometry:
+    valid = validate_feature_geometry(feature_type, geometry)
+    validate_road_geometry(feature_type, valid)
+    return valid
+
+
+def _parse_cost(geometry: Mapping[str, Any]) -> int:
+    # A ValidGeometry is already parsed; what is left is cheap.
+    return 0 if isinstance(geometry, ValidGeometry) else vertex_count(geometry)
+
+
+async def geometry_value(geometry: Mapping[str, Any], feature_type: str | None = None):
     try:
-        validate_feature_geometry(feature_type, geometry)
-        validate_road_geometry(feature_type, geometry)
-        return from_shape(shape(geometry), srid=4326)
+        valid = await geometry_work.run(
+            validated_geometry, feature_type, geometry, vertices=_parse_cost(geometry),
+        )
+        return from_shape(valid.shape, srid=4326)
     except (RoadGeometryError, ValueError) as error:
         raise InvalidFeature(str(error)) from error
     except Exception as error:
@@ -120,16 +143,20 @@ def validate_road_values_for_feature(
         raise InvalidFeature(str(error)) from error
 
 
-async def locked_feature(
+async def _current_feature(
     db: AsyncSession,
     feature_id: int,
     expected_updated_at: datetime,
+    *,
+    for_update: bool,
 ) -> tuple[Feature, dict[str, Any]]:
-    row = (await db.execute(
+    query = (
         select(Feature, ST_AsGeoJSON(Feature.geometry).label("geometry_json"))
         .where(Feature.id == feature_id)
-        .with_for_update()
-    )).one_or_none()
+    )
+    if for_update:
+        query = query.with_for_update()
+    row = (await db.execute(query)).one_or_none()
     if row is None:
         raise FeatureNotFound("Feature not found")
     feature = row.Feature
@@ -141,16 +168,88 @@ async def locked_feature(
     return feature, geometry
 
 
+async def locked_feature(
+    db: AsyncSession,
+    feature_id: int,
+    expected_updated_at: datetime,
+) -> tuple[Feature, dict[str, Any]]:
+    return await _current_feature(db, feature_id, expected_updated_at, for_update=True)
+
+
+async def feature_snapshot(
+    db: AsyncSession,
+    feature_id: int,
+    expected_updated_at: datetime,
+) -> tuple[Feature, dict[str, Any]]:
+    """The row to validate an edit against, read without a lock.
+
+    The edit itself goes through versioned_update(), which re-checks the
+    version, so a write racing this read is still caught.
+    """
+    return await _current_feature(db, feature_id, expected_updated_at, for_update=False)
+
+
+_RETURNED_COLUMNS = (
+    Feature.id,
+    Feature.properties,
+    Feature.created_at,
+    Feature.updated_at,
+    *(getattr(Feature, column) for column in PROPERTY_COLUMNS),
+    ST_AsGeoJSON(Feature.geometry).label("geometry_json"),
+)
+
+
+def versioned_update(
+    feature_id: int,
+    expected_updated_at: datetime,
+    values: Mapping[str, Any],
+) -> Update:
+    """UPDATE one feature if still at ``expected_updated_at``, RETURNING its
+    response columns, the trigger-set updated_at among them."""
+    return (
+        update(Feature)
+        .where(Feature.id == feature_id, Feature.updated_at == expected_updated_at)
+        .values(dict(values))
+        .returning(*_RETURNED_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def write_feature(
+    db: AsyncSession,
+    feature_id: int,
+    expected_updated_at: datetime,
+    values: Mapping[str, Any],
+) -> FeatureResponse:
+    """Apply a validated edit in one round trip, uncommitted.
+
+    Matching no row means the feature changed or was deleted since it was
+    read. IntegrityError is left to the caller, which owns the transaction.
+    """
+    row = (await db.execute(
+        versioned_update(feature_id, expected_updated_at, values)
+    )).one_or_none()
+    if row is None:
+        raise StaleFeature("feature_changed")
+    return feature_response(row, json.loads(row.geometry_json) if row.geometry_json else None)
+
+
 async def validate_building_link(
     db: AsyncSession,
     feature_type: str | None,
     building_id: int | None,
+    prefetched: Optional[Prefetched] = None,
 ) -> None:
     if building_id is None:
         return
     if feature_type != "business":
         raise InvalidFeature("Only business features can link to a building")
-    parent_type = await db.scalar(select(Feature.feature_type).where(Feature.id == building_id))
+    if prefetched is not None:
+        parent_type = prefetched.building_types.get(building_id)
+    else:
+        parent_type = await db.scalar(
+            select(Feature.feature_type).where(Feature.id == building_id)
+        )
     if parent_type != "building":
         raise InvalidFeature("building_id must reference a building feature")
 
@@ -160,6 +259,7 @@ async def validated_update_data(
     db_feature: Feature,
     feature_update: FeatureUpdate,
     stored_geometry: Mapping[str, Any],
+    prefetched: Optional[Prefetched] = None,
 ) -> dict[str, Any]:
     update_data = feature_update.model_dump(exclude_unset=True)
     resulting_source_kind = update_data.get("source_kind", db_feature.source_kind)
@@ -170,8 +270,19 @@ async def validated_update_data(
     resulting_feature_type = update_data.get("feature_type", db_feature.feature_type)
     resulting_road_type = update_data.get("road_type", db_feature.road_type)
     resulting_properties = update_data.get("properties", db_feature.properties)
+    # The model attribute, unlike its dump, keeps the schema's parsed geometry.
+    if "geometry" in update_data and feature_update.geometry is not None:
+        update_data["geometry"] = feature_update.geometry
     resulting_geometry = update_data.get("geometry", stored_geometry)
-    validate_feature_geometry(resulting_feature_type, resulting_geometry)
+    try:
+        resulting_geometry = await geometry_work.run(
+            validate_feature_geometry, resulting_feature_type, resulting_geometry,
+            vertices=_parse_cost(resulting_geometry),
+        )
+    except ValueError as error:
+        raise InvalidFeature(str(error)) from error
+    if "geometry" in update_data and update_data["geometry"] is not None:
+        update_data["geometry"] = resulting_geometry
     validate_road_values_for_feature(
         resulting_feature_type,
         resulting_road_type,
@@ -189,10 +300,11 @@ async def validated_update_data(
         db,
         resulting_feature_type,
         update_data.get("building_id", db_feature.building_id),
+        prefetched,
     )
     geometry = update_data.pop("geometry", None)
     if geometry is not None:
-        update_data["geometry"] = geometry_value(geometry, resulting_feature_type)
+        update_data["geometry"] = await geometry_value(geometry, resulting_feature_type)
     return update_data
 
 
@@ -202,17 +314,20 @@ def database_conflict(error: IntegrityError) -> FeatureConflict:
     )
 
 
-async def road_in_published_graph(db: AsyncSession, feature_id: int) -> bool:
+async def road_in_published_graph(
+    db: AsyncSession, feature_id: int, prefetched: Optional[Prefetched] = None,
+) -> bool:
+    if prefetched is not None:
+        return feature_id in prefetched.published_roads
     return bool(await db.scalar(text(
         "SELECT EXISTS (SELECT 1 FROM road_network_edges WHERE feature_id = :feature_id)"
     ), {"feature_id": feature_id}))
 
 
-async def create_feature(
-    db: AsyncSession,
-    feature: FeatureCreate,
-    user: User,
-):
+async def new_feature(
+    db: AsyncSession, feature: FeatureCreate, user: User, prefetched: Optional[Prefetched] = None,
+) -> Feature:
+    """A validated, not yet added Feature for a create command."""
     validate_road_values_for_feature(
         feature.feature_type,
         feature.road_type,
@@ -222,13 +337,21 @@ async def create_feature(
         max_speed=feature.max_speed,
         surface=feature.surface,
     )
-    await validate_building_link(db, feature.feature_type, feature.building_id)
-    db_feature = Feature(
-        geometry=geometry_value(feature.geometry, feature.feature_type),
+    await validate_building_link(db, feature.feature_type, feature.building_id, prefetched)
+    return Feature(
+        geometry=await geometry_value(feature.geometry, feature.feature_type),
         created_by=user.id,
         updated_by=user.id,
         **feature.model_dump(exclude={"geometry"}),
     )
+
+
+async def create_feature(
+    db: AsyncSession,
+    feature: FeatureCreate,
+    user: User,
+):
+    db_feature = await new_feature(db, feature, user)
     db.add(db_feature)
     try:
         await db.commit()
@@ -238,51 +361,95 @@ async def create_feature(
     return feature_response(db_feature, feature.geometry)
 
 
-async def update_feature(
+async def update_values(
     db: AsyncSession,
-    feature_id: int,
+    db_feature: Feature,
+    stored_geometry: Mapping[str, Any],
     feature_update: FeatureUpdate,
     user: User,
-    expected_updated_at: datetime,
     *,
     confirm_published: bool = False,
-):
-    db_feature, stored_geometry = await locked_feature(db, feature_id, expected_updated_at)
-    update_data = await validated_update_data(db, db_feature, feature_update, stored_geometry)
+    prefetched: Optional[Prefetched] = None,
+) -> dict[str, Any]:
+    """The validated column values an update writes to ``db_feature``."""
+    update_data = await validated_update_data(
+        db, db_feature, feature_update, stored_geometry, prefetched,
+    )
     if (
         db_feature.feature_type == "road"
         and update_data.get("source_kind") == "base_tombstone"
         and not confirm_published
-        and await road_in_published_graph(db, feature_id)
+        and await road_in_published_graph(db, db_feature.id, prefetched)
     ):
         raise PublishedRoadConfirmationRequired("published_road_confirmation_required")
+    update_data["updated_by"] = user.id
+    return update_data
+
+
+async def apply_update(
+    db: AsyncSession,
+    db_feature: Feature,
+    stored_geometry: Mapping[str, Any],
+    feature_update: FeatureUpdate,
+    user: User,
+    *,
+    confirm_published: bool = False,
+    prefetched: Optional[Prefetched] = None,
+) -> None:
+    """Validate an update against the locked row and stage it, uncommitted."""
+    update_data = await update_values(
+        db, db_feature, stored_geometry, feature_update, user,
+        confirm_published=confirm_published, prefetched=prefetched,
+    )
     for attribute, value in update_data.items():
         setattr(db_feature, attribute, value)
-    db_feature.updated_by = user.id
+
+
+async def update_feature(
+    db: AsyncSession,
+    feature_id: int,
+    feature_update: FeatureUpdate,
+    user: User,
+    expected_updated_at: datetime,
+    *,
+    confirm_published: bool = False,
+):
+    db_feature, stored_geometry = await feature_snapshot(db, feature_id, expected_updated_at)
+    values = await update_values(
+        db, db_feature, stored_geometry, feature_update, user,
+        confirm_published=confirm_published,
+    )
     try:
+        response = await write_feature(db, feature_id, expected_updated_at, values)
         await db.commit()
     except IntegrityError as error:
         raise database_conflict(error) from error
-    await db.refresh(db_feature)
-    geometry_json = await db.scalar(
-        select(ST_AsGeoJSON(Feature.geometry)).where(Feature.id == feature_id)
-    )
-    return feature_response(db_feature, json.loads(geometry_json) if geometry_json else None)
+    return response
 
 
-async def delete_feature(
+async def check_delete(
     db: AsyncSession,
-    feature_id: int,
-    expected_updated_at: datetime,
+    feature: Feature,
     *,
-    confirm_published: bool = False,
+    confirm_published: bool,
+    prefetched: Optional[Prefetched] = None,
 ) -> None:
-    feature, _ = await locked_feature(db, feature_id, expected_updated_at)
     if (
         feature.feature_type == "road"
         and not confirm_published
-        and await road_in_published_graph(db, feature_id)
+        and await road_in_published_graph(db, feature.id, prefetched)
     ):
         raise PublishedRoadConfirmationRequired("published_road_confirmation_required")
+
+
+async def delete_feature(
+    db: AsyncSession,
+    feature_id: int,
+    expected_updated_at: datetime,
+    *,
+    confirm_published: bool = False,
+) -> None:
+    feature, _ = await locked_feature(db, feature_id, expected_updated_at)
+    await check_delete(db, feature, confirm_published=confirm_published)
     await db.execute(delete(Feature).where(Feature.id == feature_id))
     await db.commit()
@@ -0,0 +1,384 @@
+"""Read-side feature query execution shared by the HTTP boundary.
+
+Collection reads run in one of two assembly modes. By default rows are
+serialized in Python (serializers.row_to_geojson); with FEATURE_SQL_ASSEMBLY
+PostgreSQL builds each Feature's final JSON text and the API only joins it.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+from typing import AsyncIterator, NamedTuple, Optional, Sequence
+
+from fastapi import Response
+from sqlalchemy import ARRAY, Integer, Select, any_, bindparam, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    FEATURE_CHANGES_LIMIT,
+    FEATURE_SQL_ASSEMBLY,
+    FEATURE_STREAM_BATCH_SIZE,
+    VIEWPORT_SNAP_DEGREES,
+)
+from database import async_session
+from models import Feature
+from schemas import FeatureChanges, FeatureCount, GeoJSONFeatureCollection
+from serializers import (
+    COLLECTION_PREFIX,
+    COLLECTION_SUFFIX,
+    FEATURE_FIELDS,
+    FLATGEOBUF_MEDIA_TYPE,
+    GEOBUF_MEDIA_TYPE,
+    GEOJSON_MEDIA_TYPE,
+    binary_collection_query,
+    collection_bytes,
+    feature_collection_chunks,
+    geojson_query,
+    geojson_text_collection_query,
+    geojson_text_query,
+    row_to_geojson,
+    row_to_geojson_json,
+)
+
+
+async def feature_revision(db: AsyncSession) -> int:
+    """The feature_stat change stamp (migration 008): one row, O(1)."""
+    return await db.scalar(text("SELECT revision FROM feature_stat WHERE id"))
+
+
+async def feature_counts(db: AsyncSession) -> list[FeatureCount]:
+    """Exact counts per (feature_type, source_kind) from the trigger-kept
+    feature_counts table (migration 018), largest first."""
+    rows = (await db.execute(text(
+        "SELECT feature_type, source_kind, count FROM feature_counts "
+        "WHERE count > 0 ORDER BY count DESC, feature_type, source_kind"
+    ))).all()
+    return [
+        FeatureCount(feature_type=row[0], source_kind=row[1], count=row[2])
+        for row in rows
+    ]
+
+
+def revision_etag(revision: int, *scope: object) -> str:
+    """Weak validator for a read whose content depends only on the revision
+    and its normalized parameters.
+
+    Weak because the streamed, buffered, and SQL-assembled encodings of one
+    read are semantically equal but not always byte-equal.
+    """
+    digest = hashlib.blake2b(repr(scope).encode(), digest_size=8).hexdigest()
+    return f'W/"{revision}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match list against the current ETag."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def validator_headers(etag: str) -> dict[str, str]:
+    # no-cache lets browsers keep the body but revalidate it on every use, so
+    # a changed revision is never served stale.
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag))
+
+
+def snap_bounds(
+    bounds: tuple[float, float, float, float],
+    step: float = VIEWPORT_SNAP_DEGREES,
+) -> tuple[float, float, float, float]:
+    """Grow a viewport outward to the snapping grid so nearby pans share a key.
+
+    Reading a slightly larger area is harmless for a map viewport; rounding
+    keeps the float keys exact so equal cells compare equal.
+    """
+    if step <= 0:
+        return bounds
+    west, south, east, north = bounds
+    return (
+        max(-180.0, round(math.floor(west / step) * step, 9)),
+        max(-90.0, round(math.floor(south / step) * step, 9)),
+        min(180.0, round(math.ceil(east / step) * step, 9)),
+        min(90.0, round(math.ceil(north / step) * step, 9)),
+    )
+
+
+# (highest zoom served, column) for the simplifications migration 016 keeps.
+# Each column's tolerance is about half a pixel at its highest zoom, so the
+# removed vertices are invisible; above the last band reads are exact.
+GENERALIZED_GEOMETRY_LEVELS = ((9, "geometry_z9"), (12, "geometry_z12"))
+
+
+def generalized_geometry(zoom: Optional[int]) -> Optional[str]:
+    """The generalized geometry column for a map zoom, or None for full detail."""
+    if zoom is None:
+        return None
+    for max_zoom, column in GENERALIZED_GEOMETRY_LEVELS:
+        if zoom <= max_zoom:
+            return column
+    return None
+
+
+def parse_fields(value: Optional[str]) -> Optional[tuple[str, ...]]:
+    """A ``fields=`` list as FEATURE_FIELDS names in canonical order, or
+    None (every field) when absent.
+
+    Canonical order keeps ``name,icon`` and ``icon,name`` on one ETag and one
+    cache entry. Raises ValueError for an unknown or empty list.
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("fields must name at least one field")
+    unknown = sorted(requested.difference(FEATURE_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return tuple(name for name in FEATURE_FIELDS if name in requested)
+
+
+def collection_query(
+    generalized: Optional[str] = None,
+    *,
+    fields: Optional[Sequence[str]] = None,
+    precision: Optional[int] = None,
+) -> Select:
+    """The unfiltered row query for a collection read in the configured mode."""
+    if FEATURE_SQL_ASSEMBLY:
+        return geojson_text_query(generalized, fields=fields, precision=precision)
+    return geojson_query(generalized, fields=fields, precision=precision)
+
+
+# ?format= names and the Accept media ranges that select each encoding.
+FEATURE_FORMATS = {
+    "geojson": GEOJSON_MEDIA_TYPE,
+    "flatgeobuf": FLATGEOBUF_MEDIA_TYPE,
+    "geobuf": GEOBUF_MEDIA_TYPE,
+}
+_ACCEPTED_MEDIA_TYPES = {
+    "application/json": GEOJSON_MEDIA_TYPE,
+    "application/geo+json": GEOJSON_MEDIA_TYPE,
+    FLATGEOBUF_MEDIA_TYPE: FLATGEOBUF_MEDIA_TYPE,
+    GEOBUF_MEDIA_TYPE: GEOBUF_MEDIA_TYPE,
+}
+
+
+def header_qualities(value: Optional[str]) -> dict[str, float]:
+    """The lower-cased members of an Accept-style header, in listed order,
+    with their q-values (default 1; unparsable counts as 0). A member listed
+    twice keeps its first q-value."""
+    qualities: dict[str, float] = {}
+    for member in (value or "").split(","):
+        name, *parameters = (part.strip() for part in member.split(";"))
+        if not name:
+            continue
+        quality = 1.0
+        for parameter in parameters:
+            key, _, number = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.0
+        qualities.setdefault(name.lower(), quality)
+    return qualities
+
+
+def negotiate_media_type(accept: Optional[str], format_name: Optional[str] = None) -> str:
+    """The collection encoding: an explicit ?format= wins, otherwise the
+    supported type Accept gives the highest q-value (the first listed on a
+    tie), otherwise GeoJSON. Types with q=0 are never chosen.
+
+    Raises ValueError for an unknown format name.
+    """
+    if format_name is not None:
+        if format_name not in FEATURE_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FEATURE_FORMATS)}")
+        return FEATURE_FORMATS[format_name]
+    best, best_quality = GEOJSON_MEDIA_TYPE, 0.0
+    for media_type, quality in header_qualities(accept).items():
+        if media_type in _ACCEPTED_MEDIA_TYPES and quality > best_quality:
+            best, best_quality = _ACCEPTED_MEDIA_TYPES[media_type], quality
+    return best
+
+
+async def binary_collection(db: AsyncSession, rows: Select, media_type: str) -> bytes:
+    """Encode a filtered binary_rows_query() in PostgreSQL, in one value.
+
+    The encoders aggregate no rows to NULL, returned as ``b""``; answer it
+    with binary_response(), never as an (invalid) empty file.
+    """
+    body = await db.scalar(binary_collection_query(rows, media_type))
+    return bytes(body) if body is not None else b""
+
+
+def binary_response(body: bytes, media_type: str, headers: dict[str, str]) -> Response:
+    """A FlatGeobuf or Geobuf collection, or 204 No Content when no feature
+    matched: neither format has a header-only file to stand for an empty
+    layer."""
+    if not body:
+        return Response(status_code=204, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def _encode_row(row) -> bytes:
+    if FEATURE_SQL_ASSEMBLY:
+        return row.feature_json.encode()
+    return row_to_geojson_json(row)
+
+
+async def feature_collection(db: AsyncSession, query: Select):
+    """Run a collection_query() and return the whole FeatureCollection."""
+    if FEATURE_SQL_ASSEMBLY:
+        return Response(
+            await feature_collection_bytes(db, query),
+            media_type="application/json",
+        )
+    result = await db.execute(query)
+    return GeoJSONFeatureCollection(features=[row_to_geojson(row) for row in result])
+
+
+async def feature_collection_bytes(db: AsyncSession, query: Select) -> bytes:
+    """Run a collection_query() and return the encoded FeatureCollection."""
+    if FEATURE_SQL_ASSEMBLY:
+        return (await db.scalar(geojson_text_collection_query(query))).encode()
+    result = await db.execute(query)
+    return COLLECTION_PREFIX + b",".join(_encode_row(row) for row in result) + COLLECTION_SUFFIX
+
+
+async def feature_batch(db: AsyncSession, ids: Sequence[int]) -> bytes:
+    """Many features in request order from one indexed ``= ANY(:ids)`` read,
+    encoded as a FeatureCollection that also lists the missing ids."""
+    wanted = list(dict.fromkeys(ids))
+    id_array = bindparam("ids", wanted, type_=ARRAY(Integer))
+    query = (
+        collection_query()
+        .add_columns(Feature.id.label("batch_id"))
+        .where(Feature.id == any_(id_array))
+        .order_by(func.array_position(id_array, Feature.id))
+    )
+    rows = (await db.execute(query)).all()
+    found = {row.batch_id for row in rows}
+    return collection_bytes(
+        [_encode_row(row) for row in rows],
+        missing=[feature_id for feature_id in wanted if feature_id not in found],
+    )
+
+
+class PageCursor(NamedTuple):
+    """Where a keyset walk resumes: after ``after_id``, in ``bounds``, for the
+    walk that started at ``revision``."""
+
+    after_id: int
+    revision: int
+    bounds: Optional[tuple[float, float, float, float]] = None
+
+
+def encode_page_cursor(cursor: PageCursor) -> str:
+    payload = json.dumps(
+        [cursor.after_id, cursor.revision, cursor.bounds], separators=(",", ":"),
+    ).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_page_cursor(token: str) -> PageCursor:
+    """Raise ValueError for anything encode_page_cursor did not produce."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        after_id, revision, bounds = json.loads(base64.urlsafe_b64decode(padded))
+        cursor = PageCursor(
+            int(after_id),
+            int(revision),
+            tuple(float(value) for value in bounds) if bounds is not None else None,
+        )
+    except (TypeError, ValueError, binascii.Error) as error:
+        raise ValueError("invalid page cursor") from error
+    if cursor.bounds is not None and len(cursor.bounds) != 4:
+        raise ValueError("invalid page cursor")
+    return cursor
+
+
+def page_query(query: Select, cursor: PageCursor, limit: int) -> Select:
+    """Keyset over the primary key: no OFFSET, so every page costs the same.
+
+    One extra row is read to learn whether another page follows.
+    """
+    return (
+        query.add_columns(Feature.id.label("page_id"))
+        .where(Feature.id > cursor.after_id)
+        .order_by(Feature.id)
+        .limit(limit + 1)
+    )
+
+
+async def feature_page(db: AsyncSession, query: Select, cursor: PageCursor, limit: int) -> bytes:
+    """Run a page_query() and return the page with its continuation cursor."""
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_page_cursor(cursor._replace(after_id=rows[-1].page_id))
+    return collection_bytes(
+        [_encode_row(row) for row in rows],
+        revision=cursor.revision,
+        next_cursor=next_cursor,
+    )
+
+
+# One statement, so the revision, the floor, and the log share a snapshot.
+_CHANGED_IDS_SQL = text(
+    "WITH changed AS ("
+    "  SELECT DISTINCT ON (feature_id) feature_id, deleted FROM feature_changes"
+    "  WHERE revision > :since ORDER BY feature_id, revision DESC LIMIT :cap"
+    ") "
+    "SELECT s.revision, s.change_log_floor, changed.feature_id, changed.deleted "
+    "FROM feature_stat s LEFT JOIN changed ON TRUE WHERE s.id"
+)
+
+
+async def feature_changes(db: AsyncSession, since: int) -> FeatureChanges:
+    """Upserted features and deleted ids committed after revision `since`."""
+    rows = (await db.execute(
+        _CHANGED_IDS_SQL,
+        {"since": since, "cap": FEATURE_CHANGES_LIMIT + 1},
+    )).all()
+    revision, floor = rows[0].revision, rows[0].change_log_floor
+    changed = [row for row in rows if row.feature_id is not None]
+    if since < floor or since > revision or len(changed) > FEATURE_CHANGES_LIMIT:
+        return FeatureChanges(revision=revision, full_reload=True)
+    deleted = {row.feature_id for row in changed if row.deleted}
+    upserted_ids = [row.feature_id for row in changed if not row.deleted]
+    features = []
+    if upserted_ids:
+        result = await db.execute(geojson_query().where(Feature.id.in_(upserted_ids)))
+        features = [row_to_geojson(row) for row in result]
+    # Rows deleted after the log was read are reported as deletions; any later
+    # change is in the next delta anyway.
+    deleted.update(set(upserted_ids) - {feature.id for feature in features})
+    return FeatureChanges(revision=revision, features=features, deleted=sorted(deleted))
+
+
+async def stream_feature_collection(query: Select) -> AsyncIterator[bytes]:
+    """Write a FeatureCollection from a server-side cursor, batch by batch.
+
+    The stream outlives the request handler, so it owns its own session
+    instead of borrowing the request's `get_db` session.
+    """
+    async with async_session() as db:
+        result = await db.stream(
+            query.execution_options(yield_per=FEATURE_STREAM_BATCH_SIZE)
+        )
+        async for chunk in feature_collection_chunks(result.partitions(), _encode_row):
+            yield chunk
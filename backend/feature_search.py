@@ -0,0 +1,85 @@
+"""Feature name search over the rank-ordered indexes of migration 020.
+
+Both modes read matches in rank order straight from an index, so LIMIT
+stops after a handful of rows however many names match:
+
+- ``prefix`` ranges over the C-collated normalized-name b-tree in name
+  order, so an exact match comes first;
+- ``ranked`` walks the GiST trigram index by word-similarity distance, so
+  ``chorsu`` also finds "Chorsu bozori" and tolerates a typo.
+
+``auto`` uses prefix for one- and two-letter queries, which have too few
+trigrams to rank, and ranked otherwise. A viewport re-ranks a bounded set of
+the best text matches so ones inside it come first.
+"""
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+from sqlalchemy import Float, Select, func, select
+
+from feature_domain import Bounds
+from feature_reads import collection_query
+from models import Feature
+
+SearchMode = Literal["auto", "prefix", "ranked"]
+# Shorter queries have no trigram of their own to rank by.
+MIN_RANKED_LENGTH = 3
+# Text matches a viewport may re-rank, per requested result.
+BIASED_CANDIDATES_PER_RESULT = 10
+MAX_BIASED_CANDIDATES = 200
+# Above every other code point, so key < prefix || this bounds a prefix range
+# in the C collation.
+_LAST_CODE_POINT = 0x10FFFF
+
+
+def resolve_mode(query: str, mode: SearchMode) -> Literal["prefix", "ranked"]:
+    if mode != "auto":
+        return mode
+    return "prefix" if len(query) < MIN_RANKED_LENGTH else "ranked"
+
+
+def _search_key(value):
+    return func.feature_search_key(value)
+
+
+def search_query(
+    query: str,
+    mode: Literal["prefix", "ranked"],
+    limit: int,
+    bounds: Optional[Bounds] = None,
+) -> Select:
+    """A collection_query() of the best ``limit`` name matches, in order."""
+    rows = collection_query().where(Feature.name.isnot(None))
+    if mode == "prefix":
+        key = _search_key(Feature.name).collate("C")
+        rows = rows.where(
+            key >= _search_key(query),
+            key < _search_key(query).concat(func.chr(_LAST_CODE_POINT)),
+        )
+        rank = key
+    else:
+        # %> and <->> are the indexed-column-first forms of <% and <<->.
+        rows = rows.where(Feature.name.op("%>", is_comparison=True)(query))
+        rank = Feature.name.op("<->>", return_type=Float)(query)
+    if bounds is None:
+        return rows.order_by(rank).limit(limit)
+
+    candidates = (
+        rows.add_columns(
+            func.ST_Intersects(Feature.geometry, func.ST_MakeEnvelope(*bounds, 4326))
+            .label("in_view"),
+            rank.label("search_rank"),
+        )
+        .order_by(rank)
+        .limit(min(limit * BIASED_CANDIDATES_PER_RESULT, MAX_BIASED_CANDIDATES))
+        .subquery("candidates")
+    )
+    columns = [
+        column for column in candidates.c if column.name not in ("in_view", "search_rank")
+    ]
+    return (
+        select(*columns)
+        .order_by(candidates.c.in_view.desc(), candidates.c.search_rank)
+        .limit(limit)
+    )
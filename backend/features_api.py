@@ -2,18 +2,50 @@
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Query
-from sqlalchemy import delete, func, select, text
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth import require_admin, require_user
+import change_events
 from config import FEATURE_QUERY_LIMIT, FULL_BASE_THRESHOLD
 from database import get_db
+from feature_http import (
+    bbox_predicate,
+    expected_updated_at,
+    mutation_http_error,
+    parse_bbox,
+    with_validators,
+)
 import feature_mutations as mutations
+from feature_reads import (
+    binary_collection,
+    binary_response,
+    collection_query,
+    etag_matches,
+    feature_collection,
+    feature_changes,
+    feature_counts,
+    feature_collection_bytes,
+    feature_revision,
+    generalized_geometry,
+    negotiate_media_type,
+    not_modified,
+    parse_fields,
+    revision_etag,
+    snap_bounds,
+    stream_feature_collection,
+)
+from feature_search import SearchMode, resolve_mode, search_query
+import geometry_work
 from models import Feature, User
+from point_clusters import cluster_cells, parse_cluster_types, point_clusters
+from response_cache import search_cache, viewport_cache
 import road_segment_service as road_segments
 from schemas import (
     AppMeta,
+    FeatureChanges,
     FeatureCreate,
     FeatureResponse,
     FeatureUpdate,
@@ -25,7 +57,7 @@ from schemas import (
     RoadSegmentRestore,
     RoadSegmentUpdate,
 )
-from serializers import geojson_query, row_to_geojson
+from serializers import GEOJSON_MEDIA_TYPE, binary_rows_query, geojson_query, row_to_geojson
 
 
 router = APIRouter()
@@ -34,61 +66,120 @@ router = APIRouter()
 _source_kind_after_user_update = mutations.source_kind_after_user_update
 
 
-def _mutation_http_error(error: mutations.FeatureMutationError) -> HTTPException:
-    if isinstance(error, mutations.FeatureNotFound):
-        return HTTPException(status_code=404, detail=str(error))
-    if isinstance(error, mutations.PreconditionRequired):
-        return HTTPException(status_code=428, detail=str(error))
-    if isinstance(error, mutations.InvalidFeature):
-        return HTTPException(status_code=422, detail=str(error))
-    if isinstance(error, mutations.StaleFeature):
-        return HTTPException(status_code=409, detail=str(error))
-    if isinstance(error, mutations.PublishedRoadConfirmationRequired):
-        return HTTPException(status_code=409, detail=str(error))
-    if isinstance(error, mutations.FeatureConflict):
-        return HTTPException(status_code=409, detail=str(error))
-    return HTTPException(status_code=500, detail="Feature mutation failed")
-
-
-def _expected_updated_at(
-    if_match: Optional[str] = Header(default=None, alias="If-Match"),
-) -> datetime:
-    try:
-        return mutations.parse_version_tag(if_match)
-    except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
-
-
 def _bbox_filter(bbox: str):
     """west,south,east,north → a GIST-indexed ST_Intersects predicate."""
-    parts = bbox.split(",")
-    if len(parts) != 4:
-        raise HTTPException(status_code=422, detail="bbox must be 'west,south,east,north'")
-    try:
-        west, south, east, north = (float(part) for part in parts)
-    except ValueError as error:
-        raise HTTPException(status_code=422, detail="bbox values must be numbers") from error
-    if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
-        raise HTTPException(
-            status_code=422,
-            detail="bbox must use valid coordinates with west < east and south < north",
-        )
-    envelope = func.ST_MakeEnvelope(west, south, east, north, 4326)
-    return func.ST_Intersects(Feature.geometry, envelope)
+    return bbox_predicate(parse_bbox(bbox))
 
 
 @router.get("/features", response_model=GeoJSONFeatureCollection)
 async def get_features(
+    response: Response,
     bbox: Optional[str] = Query(default=None, description="west,south,east,north viewport filter"),
     limit: Optional[int] = Query(default=None, ge=1, le=FEATURE_QUERY_LIMIT),
+    stream: bool = Query(
+        default=False,
+        description="write the collection incrementally from a server-side cursor",
+    ),
+    zoom: Optional[int] = Query(
+        default=None,
+        ge=0,
+        le=24,
+        description="map zoom; below 13 geometry is simplified for display (never edit it)",
+    ),
+    format_name: Optional[str] = Query(
+        default=None,
+        alias="format",
+        description="geojson, flatgeobuf, or geobuf; overrides the Accept header",
+    ),
+    fields: Optional[str] = Query(
+        default=None,
+        description="comma-separated property names to return; properties selects the JSONB extras",
+    ),
+    precision: Optional[int] = Query(
+        default=None,
+        ge=0,
+        le=15,
+        description="GeoJSON coordinate decimal digits (6 is about 0.1 m)",
+    ),
+    accept: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
     db: AsyncSession = Depends(get_db),
 ):
-    query = geojson_query()
-    if bbox is not None:
-        query = query.where(_bbox_filter(bbox))
-    query = query.limit(limit or FULL_BASE_THRESHOLD)
-    result = await db.execute(query)
-    return GeoJSONFeatureCollection(features=[row_to_geojson(row) for row in result])
+    try:
+        media_type = negotiate_media_type(accept, format_name)
+        projection = parse_fields(fields)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from error
+    binary = media_type != GEOJSON_MEDIA_TYPE
+    # The binary encodings carry full-precision geometry.
+    digits = None if binary else precision
+    response.headers["Vary"] = "Accept"
+    bounds = snap_bounds(parse_bbox(bbox)) if bbox is not None else None
+    row_limit = limit or FULL_BASE_THRESHOLD
+    # Keyed by band, not raw zoom, so every zoom in a band shares entries.
+    generalized = generalized_geometry(zoom)
+    # The revision is read before the rows, so the ETag can only be older than
+    # the content it labels: a later request then refetches, never misses.
+    revision = await feature_revision(db)
+    shape = (generalized, projection, digits, media_type)
+    etag = revision_etag(revision, "features", bounds, row_limit, *shape)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if binary:
+        query = binary_rows_query(generalized, fields=projection)
+    else:
+        query = collection_query(generalized, fields=projection, precision=digits)
+    if bounds is not None:
+        query = query.where(bbox_predicate(bounds))
+    query = query.limit(row_limit)
+    if stream and not binary:
+        # Full-dataset reloads would otherwise hold every row and its model in
+        # memory before the first byte is sent.
+        return with_validators(
+            StreamingResponse(
+                stream_feature_collection(query),
+                media_type="application/json",
+                headers={"Vary": "Accept"},
+            ),
+            response,
+            etag,
+        )
+    if bounds is None:
+        if binary:
+            collection = binary_response(
+                await binary_collection(db, query, media_type),
+                media_type,
+                {"Vary": "Accept"},
+            )
+            return with_validators(collection, response, etag)
+        return with_validators(await feature_collection(db, query), response, etag)
+    cache_key = (bounds, row_limit, *shape)
+    body = viewport_cache.get(cache_key, revision)
+    cache_status = "HIT" if body is not None else "MISS"
+    if body is None:
+        if binary:
+            body = await binary_collection(db, query, media_type)
+        else:
+            body = await feature_collection_bytes(db, query)
+        viewport_cache.put(cache_key, revision, body)
+    headers = {"X-Cache": cache_status, "Vary": "Accept"}
+    if binary:
+        viewport = binary_response(body, media_type, headers)
+    else:
+        viewport = Response(body, media_type=media_type, headers=headers)
+    return with_validators(viewport, response, etag)
+
+
+@router.get("/features/viewport-cache")
+async def get_viewport_cache_stats(_: User = Depends(require_admin)):
+    """This worker's viewport cache counters; each uvicorn worker has its own."""
+    return viewport_cache.stats()
+
+
+@router.get("/features/geometry-work")
+async def get_geometry_work_stats(_: User = Depends(require_admin)):
+    """This worker's geometry validation/splitting timings and pool settings."""
+    return geometry_work.stats()
 
 
 @router.get("/features/version", response_model=FeatureVersion)
@@ -100,26 +191,105 @@ async def get_features_version(db: AsyncSession = Depends(get_db)):
     return FeatureVersion(revision=revision, updated_at=updated_at)
 
 
+@router.get("/features/events")
+async def get_feature_events():
+    """Server-Sent Events: ``features`` carries the revision, ``road_network``
+    the rebuild state. Holds no pooled connection while open."""
+    return StreamingResponse(
+        change_events.event_stream(change_events.broadcaster),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/features/changes", response_model=FeatureChanges)
+async def get_feature_changes(
+    since: int = Query(ge=0, description="feature_stat revision the client already has"),
+    db: AsyncSession = Depends(get_db),
+):
+    return await feature_changes(db, since)
+
+
+@router.get("/features/clusters", response_model=GeoJSONFeatureCollection)
+async def get_feature_clusters(
+    response: Response,
+    bbox: str = Query(description="west,south,east,north viewport"),
+    zoom: int = Query(ge=0, le=24, description="map zoom; picks the grid level"),
+    types: Optional[str] = Query(
+        default=None,
+        description="comma-separated point feature types; all clustered types when omitted",
+    ),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Point features counted per grid cell, for overviews below the edit zoom."""
+    try:
+        feature_types = parse_cluster_types(types)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error)) from error
+    cells = cluster_cells(parse_bbox(bbox), zoom)
+    revision = await feature_revision(db)
+    etag = revision_etag(revision, "clusters", cells, feature_types)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    cache_key = ("clusters", cells, feature_types)
+    body = viewport_cache.get(cache_key, revision)
+    cache_status = "HIT" if body is not None else "MISS"
+    if body is None:
+        body = await point_clusters(db, cells, feature_types)
+        viewport_cache.put(cache_key, revision, body)
+    clusters = Response(body, media_type="application/json", headers={"X-Cache": cache_status})
+    return with_validators(clusters, response, etag)
+
+
 @router.get("/features/search", response_model=GeoJSONFeatureCollection)
 async def search_features(
+    response: Response,
     q: str = Query(min_length=1, max_length=255),
     limit: int = Query(default=20, ge=1, le=50),
+    mode: SearchMode = Query(
+        default="auto",
+        description="prefix (name starts with q), ranked (trigram similarity), or auto",
+    ),
+    bbox: Optional[str] = Query(
+        default=None,
+        description="west,south,east,north; matches inside it rank first",
+    ),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
     db: AsyncSession = Depends(get_db),
 ):
-    query = (
-        geojson_query()
-        .where(Feature.name.ilike(f"%{q}%"))
-        .order_by(func.length(Feature.name))
-        .limit(limit)
-    )
-    result = await db.execute(query)
-    return GeoJSONFeatureCollection(features=[row_to_geojson(row) for row in result])
+    query = q.strip()
+    if not query:
+        raise HTTPException(status_code=422, detail="q must not be blank")
+    resolved = resolve_mode(query, mode)
+    bounds = snap_bounds(parse_bbox(bbox)) if bbox is not None else None
+    revision = await feature_revision(db)
+    cache_key = (query, resolved, limit, bounds)
+    etag = revision_etag(revision, "search", *cache_key)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    body = search_cache.get(cache_key, revision)
+    cache_status = "HIT" if body is not None else "MISS"
+    if body is None:
+        body = await feature_collection_bytes(db, search_query(query, resolved, limit, bounds))
+        search_cache.put(cache_key, revision, body)
+    results = Response(body, media_type="application/json", headers={"X-Cache": cache_status})
+    return with_validators(results, response, etag)
 
 
 @router.get("/meta", response_model=AppMeta)
-async def get_meta(db: AsyncSession = Depends(get_db)):
-    count = await db.scalar(select(func.count(Feature.id)))
-    return AppMeta(feature_count=count, full_base=count >= FULL_BASE_THRESHOLD)
+async def get_meta(
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_db),
+):
+    etag = revision_etag(await feature_revision(db), "meta", FULL_BASE_THRESHOLD)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    counts = await feature_counts(db)
+    count = sum(entry.count for entry in counts)
+    meta = AppMeta(feature_count=count, full_base=count >= FULL_BASE_THRESHOLD, counts=counts)
+    return with_validators(meta, response, etag)
 
 
 @router.get(
@@ -137,22 +307,27 @@ async def get_building_businesses(
         raise HTTPException(status_code=404, detail="Feature not found")
     if parent_type != "building":
         raise HTTPException(status_code=422, detail="Feature is not a building")
-    result = await db.execute(
-        geojson_query().where(Feature.building_id == feature_id)
+    return await feature_collection(
+        db,
+        collection_query().where(Feature.building_id == feature_id),
     )
-    return GeoJSONFeatureCollection(features=[row_to_geojson(row) for row in result])
 
 
 @router.get("/features/{feature_id}", response_model=GeoJSONFeature)
 async def get_feature(
     feature_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
     db: AsyncSession = Depends(get_db),
 ):
+    etag = revision_etag(await feature_revision(db), "feature", feature_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     result = await db.execute(geojson_query().where(Feature.id == feature_id))
     row = result.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Feature not found")
-    return row_to_geojson(row)
+    return with_validators(row_to_geojson(row), response, etag)
 
 
 @router.post("/features", response_model=FeatureResponse, status_code=201)
@@ -164,7 +339,7 @@ async def create_feature(
     try:
         return await mutations.create_feature(db, feature, user)
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
 
 
 @router.put("/features/{feature_id}", response_model=FeatureResponse)
@@ -173,7 +348,7 @@ async def update_feature(
     feature_update: FeatureUpdate,
     confirm_published: bool = Query(default=False),
     user: User = Depends(require_user),
-    expected_updated_at: datetime = Depends(_expected_updated_at),
+    expected_updated_at: datetime = Depends(expected_updated_at),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -186,7 +361,7 @@ async def update_feature(
             confirm_published=confirm_published,
         )
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
 
 
 @router.put(
@@ -197,7 +372,7 @@ async def update_road_segment(
     feature_id: int,
     segment_update: RoadSegmentUpdate,
     user: User = Depends(require_user),
-    expected_updated_at: datetime = Depends(_expected_updated_at),
+    expected_updated_at: datetime = Depends(expected_updated_at),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -209,7 +384,7 @@ async def update_road_segment(
             expected_updated_at,
         )
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
 
 
 @router.post(
@@ -221,7 +396,7 @@ async def delete_road_segment(
     segment_delete: RoadSegmentDelete,
     confirm_published: bool = Query(default=False),
     user: User = Depends(require_user),
-    expected_updated_at: datetime = Depends(_expected_updated_at),
+    expected_updated_at: datetime = Depends(expected_updated_at),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -234,7 +409,7 @@ async def delete_road_segment(
             confirm_published=confirm_published,
         )
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
 
 
 @router.post(
@@ -245,7 +420,7 @@ async def restore_road_segment(
     feature_id: int,
     restore: RoadSegmentRestore,
     user: User = Depends(require_user),
-    expected_updated_at: datetime = Depends(_expected_updated_at),
+    expected_updated_at: datetime = Depends(expected_updated_at),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -257,7 +432,7 @@ async def restore_road_segment(
             expected_updated_at,
         )
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
 
 
 @router.delete("/features/clear-all")
@@ -279,7 +454,7 @@ async def delete_feature(
     feature_id: int,
     confirm_published: bool = Query(default=False),
     _: User = Depends(require_user),
-    expected_updated_at: datetime = Depends(_expected_updated_at),
+    expected_updated_at: datetime = Depends(expected_updated_at),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -290,5 +465,5 @@ async def delete_feature(
             confirm_published=confirm_published,
         )
     except mutations.FeatureMutationError as error:
-        raise _mutation_http_error(error) from error
+        raise mutation_http_error(error) from error
     return {"message": "Feature deleted successfully"}
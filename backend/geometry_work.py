@@ -0,0 +1,114 @@
+"""CPU-heavy pure geometry work kept off the event loop.
+
+Shapely validity checks and road substring operations grow with vertex
+count; a multi-thousand-vertex polygon takes long enough to stall every
+concurrent request on the worker. Geometries at or above
+GEOMETRY_OFFLOAD_MIN_VERTICES run on a bounded pool; smaller ones run
+inline. Every call is timed per function for the admin stats endpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Mapping, Optional, TypeVar
+
+from config import GEOMETRY_EXECUTOR, GEOMETRY_OFFLOAD_MIN_VERTICES, GEOMETRY_WORKERS
+from feature_domain import check_geometry_structure, validate_geometry_mapping, vertex_count
+
+Result = TypeVar("Result")
+
+_executor: Optional[Executor] = None
+
+
+class GeometryTimings:
+    """Per-function call counts and wall time, queueing included."""
+
+    def __init__(self):
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float, *, offloaded: bool) -> None:
+        timing = self._timings.setdefault(
+            name, {"calls": 0, "offloaded": 0, "seconds": 0.0, "max_seconds": 0.0},
+        )
+        timing["calls"] += 1
+        timing["offloaded"] += int(offloaded)
+        timing["seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {name: dict(timing) for name, timing in self._timings.items()}
+
+
+timings = GeometryTimings()
+
+
+def offloads(vertices: int) -> bool:
+    return GEOMETRY_WORKERS > 0 and vertices >= GEOMETRY_OFFLOAD_MIN_VERTICES
+
+
+def _pool() -> Executor:
+    global _executor
+    if _executor is None:
+        if GEOMETRY_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=GEOMETRY_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=GEOMETRY_WORKERS, thread_name_prefix="geometry",
+            )
+    return _executor
+
+
+def measured(function: Callable[..., Result], *args: Any) -> Result:
+    """Run ``function`` inline, timed."""
+    started = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        timings.record(function.__name__, time.perf_counter() - started, offloaded=False)
+
+
+async def run(function: Callable[..., Result], *args: Any, vertices: int) -> Result:
+    """Run a pure, module-level geometry function, on the pool when large.
+
+    ``function`` and its arguments must pickle for GEOMETRY_EXECUTOR=process.
+    """
+    if not offloads(vertices):
+        return measured(function, *args)
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _pool(), partial(function, *args),
+        )
+    finally:
+        timings.record(function.__name__, time.perf_counter() - started, offloaded=True)
+
+
+def boundary_geometry(geometry: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Request-boundary validation for schemas, which run on the event loop.
+
+    Small geometries are fully validated into a ValidGeometry here. Large
+    ones only get the structural checks; the write path finishes validating
+    them on the pool (see feature_mutations.geometry_value).
+    """
+    check_geometry_structure(geometry)
+    if offloads(vertex_count(geometry)):
+        return geometry
+    return measured(validate_geometry_mapping, geometry)
+
+
+def stats() -> dict[str, Any]:
+    return {
+        "executor": GEOMETRY_EXECUTOR if GEOMETRY_WORKERS > 0 else "inline",
+        "workers": GEOMETRY_WORKERS,
+        "offload_min_vertices": GEOMETRY_OFFLOAD_MIN_VERTICES,
+        "functions": timings.stats(),
+    }
+
+
+def close() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,13 +1,21 @@
 """Bounded OSM import endpoints; the pipeline itself lives in osm_import (rule B7)."""
+import json
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from auth import require_user
-from database import get_db
+from auth import require_admin, require_user
+from database import async_session, get_db
 from models import User
 from osm_import import IMPORT_KINDS, link_businesses_to_buildings, run_import
-from overpass import OverpassUnavailable
-from schemas import BoundsRequest
+from overpass import OverpassUnavailable, mirror_stats
+import overpass_cache
+from schemas import AreaImportRequest, BoundsRequest
+from tiled_import import run_tiled_import, tile_grid
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -70,3 +78,63 @@ async def load_osm_businesses(
     result = await _run_import(IMPORT_KINDS["businesses"], bounds, db)
     result["linked_to_buildings"] = await link_businesses_to_buildings(db)
     return result
+
+
+async def _area_import_lines(kind: str, tiles: list[BoundsRequest]):
+    progress = {}
+    # The stream outlives the handler, so it owns its session.
+    async with async_session() as db:
+        try:
+            async for progress in run_tiled_import(IMPORT_KINDS[kind], tiles, db):
+                if progress.get("done") and kind == "businesses":
+                    progress["linked_to_buildings"] = await link_businesses_to_buildings(db)
+                yield json.dumps(progress) + "\n"
+        except OverpassUnavailable as error:
+            yield json.dumps({**progress, "error": str(error)}) + "\n"
+        except Exception:
+            # The status line went out long ago; a terminal line is the only
+            # way to tell the client this was not a dropped connection.
+            logger.exception("Area import of %s failed", kind)
+            yield json.dumps({
+                **progress,
+                "error": "The area import failed; rows already counted are kept, "
+                "and running it again completes it.",
+            }) + "\n"
+
+
+@router.post("/load-osm-{kind}/area")
+async def load_osm_area(
+    kind: str,
+    area: AreaImportRequest,
+    _: User = Depends(require_admin),
+):
+    """Import an oblast-sized area as a grid of Overpass tiles (admin only).
+
+    The response is NDJSON: one progress object per finished tile or upserted
+    chunk (and periodically while a tile is slow), then a final one with
+    ``done`` or ``error``. Chunks commit as they
+    go, so a failed import keeps the rows its last report counted; running it
+    again completes the area.
+    """
+    if kind not in IMPORT_KINDS:
+        raise HTTPException(status_code=404, detail="Unknown import kind")
+    # Built before the response starts, so a bad grid is still an HTTP error.
+    tiles = tile_grid(area)
+    return StreamingResponse(
+        _area_import_lines(kind, tiles),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/overpass-mirrors")
+async def get_overpass_mirror_stats(_: User = Depends(require_admin)):
+    """This worker's per-mirror latency and failure-rate estimates."""
+    return mirror_stats.stats()
+
+
+@router.get("/overpass-cache")
+async def get_overpass_cache_stats(_: User = Depends(require_admin)):
+    """Overpass disk cache counters of this worker; null when disabled."""
+    cache = overpass_cache.disk_cache
+    return cache.stats() if cache is not None else None
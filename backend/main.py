@@ -9,13 +9,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 import auth_api
 import bulk_api
+import feature_batch_api
 import features_api
+import geometry_work
 import imports_api
 import road_network_api
-from auth import ensure_bootstrap_admin
+import tiles_api
+import vector_tiles
+from auth import ensure_bootstrap_admin, password_hasher
+from change_events import broadcaster
 from config import CORS_ORIGINS
 from database import engine, get_db
 from overpass import close_client
+from session_cache import session_cache
 
 
 logger = logging.getLogger(__name__)
@@ -26,8 +32,15 @@ async def lifespan(app: FastAPI):
     # Seed the first admin (if configured) before serving, so a fresh install is
     # never left with editing unprotected.
     await ensure_bootstrap_admin()
+    # Session caching is only safe while auth changes are heard, so this
+    # worker listens from startup, whether or not any SSE client is open.
+    broadcaster.watch("user_auth", session_cache.on_notification, session_cache.on_listening)
     yield
+    await broadcaster.close()
     await close_client()
+    vector_tiles.close()
+    geometry_work.close()
+    password_hasher.close()
     await engine.dispose()
 
 
@@ -44,9 +57,12 @@ app.add_middleware(
 
 app.include_router(auth_api.router)
 app.include_router(bulk_api.router)
+# Before features_api: /features/page must not match /features/{feature_id}.
+app.include_router(feature_batch_api.router)
 app.include_router(features_api.router)
 app.include_router(imports_api.router)
 app.include_router(road_network_api.router)
+app.include_router(tiles_api.router)
 
 
 @app.get("/")
@@ -1,5 +1,6 @@
 from geoalchemy2 import Geometry
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
@@ -11,6 +12,7 @@ from sqlalchemy import (
     func,
 )
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 
 from database import Base
 
@@ -30,6 +32,11 @@ class Feature(Base):
     description = Column(Text)
     geometry = Column(Geometry("GEOMETRY", srid=4326))
     properties = Column(JSONB, default=dict)
+    # Display-only simplifications for low-zoom reads, written by the
+    # features_generalize_geometry trigger (016); NULL means "use geometry".
+    # Deferred so ORM loads for editing never carry them.
+    geometry_z9 = deferred(Column(Geometry("GEOMETRY", srid=4326)))
+    geometry_z12 = deferred(Column(Geometry("GEOMETRY", srid=4326)))
     # Building-specific columns
     building_number = Column(String(50))
     building_type = Column(String(100))
@@ -68,3 +75,5 @@ class User(Base):
     is_admin = Column(Boolean, nullable=False, default=False)
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by trigger on every authorization-relevant change (022).
+    auth_revision = Column(BigInteger, nullable=False, server_default="0")
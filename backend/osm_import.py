@@ -1,4 +1,5 @@
 """One fetch → parse → upsert pipeline shared by every OSM import kind (rule B7)."""
+from collections.abc import AsyncIterator, Iterable
 from dataclasses import dataclass
 from typing import Callable, Optional
 
@@ -13,14 +14,18 @@ from models import (
 )
 from overpass import (
     QUERY_TIMEOUT_S,
-    fetch_overpass,
     parse_direction,
     parse_height,
     parse_int,
     parse_max_speed,
+    stream_overpass,
 )
 from schemas import BoundsRequest
 
+# Candidates built, looked up, and flushed together while the response is
+# still arriving; bounds the ORM objects alive at once.
+UPSERT_CHUNK_SIZE = 500
+
 # Attributes refreshed on re-import; the application feature id never changes.
 # "name" is deliberately absent: it is the user-facing title, so a re-import
 # (viewport roads auto-import while editing) must never overwrite one that is
@@ -320,17 +325,37 @@ async def link_businesses_to_buildings(db: AsyncSession) -> int:
     return result.rowcount or 0
 
 
-def _build_candidates(kind: ImportKind, elements: list) -> list:
-    candidates = []
-    for element in elements:
-        try:
-            feature = kind.build(element)
-        except (KeyError, ValueError, TypeError):
-            # One malformed element must not fail the whole import.
+def build_candidate(kind: ImportKind, element: dict) -> Optional[Feature]:
+    try:
+        return kind.build(element)
+    except (KeyError, ValueError, TypeError):
+        # One malformed element must not fail the whole import.
+        return None
+
+
+def _build_candidates(kind: ImportKind, elements: Iterable[dict]) -> list:
+    return [
+        feature for feature in (build_candidate(kind, element) for element in elements)
+        if feature is not None
+    ]
+
+
+async def _candidate_chunks(
+    kind: ImportKind,
+    elements: AsyncIterator[dict],
+    size: int = UPSERT_CHUNK_SIZE,
+) -> AsyncIterator[list[Feature]]:
+    chunk = []
+    async for element in elements:
+        feature = build_candidate(kind, element)
+        if feature is None:
             continue
-        if feature is not None:
-            candidates.append(feature)
-    return candidates
+        chunk.append(feature)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def _can_refresh_from_osm(feature: Feature) -> bool:
@@ -343,26 +368,17 @@ def _can_refresh_from_osm(feature: Feature) -> bool:
     return feature.source_kind == SOURCE_KIND_OSM_IMPORT
 
 
-async def run_import(kind: ImportKind, bounds: BoundsRequest, db: AsyncSession) -> dict:
-    osm_data = await fetch_overpass(kind.query(bounds))
-    candidates = _build_candidates(kind, osm_data.get("elements", []))
-
-    # Serialize imports at the database boundary. Two workers importing the
-    # same new OSM identity must not both prefetch "missing" and race to insert.
-    await db.execute(text(
-        "SELECT pg_advisory_xact_lock(hashtext('maptile_osm_import'))"
-    ))
-
-    # One IN query instead of a SELECT per element (rule B6).
-    existing_by_osm_id = {}
-    osm_ids = [candidate.osm_id for candidate in candidates]
-    if osm_ids:
-        result = await db.execute(
-            select(Feature)
-            .where(Feature.osm_type == kind.osm_type, Feature.osm_id.in_(osm_ids))
-            .with_for_update()
+async def upsert_chunk(kind: ImportKind, candidates: list[Feature], db: AsyncSession) -> int:
+    # One IN query per chunk instead of a SELECT per element (rule B6).
+    result = await db.execute(
+        select(Feature)
+        .where(
+            Feature.osm_type == kind.osm_type,
+            Feature.osm_id.in_([candidate.osm_id for candidate in candidates]),
         )
-        existing_by_osm_id = {feature.osm_id: feature for feature in result.scalars()}
+        .with_for_update()
+    )
+    existing_by_osm_id = {feature.osm_id: feature for feature in result.scalars()}
 
     imported = 0
     for candidate in candidates:
@@ -379,8 +395,50 @@ async def run_import(kind: ImportKind, bounds: BoundsRequest, db: AsyncSession)
         else:
             db.add(candidate)
         imported += 1
+    # Written rows stay in the transaction; their objects can go.
+    await db.flush()
+    db.expunge_all()
+    return imported
+
 
+async def run_import(kind: ImportKind, bounds: BoundsRequest, db: AsyncSession) -> dict:
+    """Stream one Overpass response into chunked upserts.
+
+    Elements are built and upserted as they arrive, so memory stays flat
+    however large the response. Each chunk commits on its own (see
+    commit_chunk), so no database lock waits on the network; a response cut
+    off midway keeps the chunks already written, and since the upsert is
+    idempotent, re-running the import completes it.
+    """
+    imported = 0
+    elements = stream_overpass(kind.query(bounds), bypass_cache=bounds.bypass_cache)
+    async for candidates in _candidate_chunks(kind, elements):
+        imported += await commit_chunk(kind, candidates, db)
+    return import_result(kind, imported)
+
+
+async def commit_chunk(kind: ImportKind, candidates: list[Feature], db: AsyncSession) -> int:
+    """Upsert one chunk in its own transaction, under the import lock.
+
+    The advisory lock and the prefetch's row locks are held only for the
+    chunk's database work, never while the next chunk is still downloading.
+    """
+    await lock_imports(db)
+    imported = await upsert_chunk(kind, candidates, db)
     await db.commit()
+    return imported
+
+
+async def lock_imports(db: AsyncSession) -> None:
+    """Serialize imports at the database boundary, until the transaction ends.
+
+    Two workers importing the same new OSM identity must not both prefetch
+    "missing" and race to insert.
+    """
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext('maptile_osm_import'))"))
+
+
+def import_result(kind: ImportKind, imported: int) -> dict:
     return {
         "message": f"Loaded {imported} {kind.label} from OpenStreetMap",
         kind.count_key: imported,
@@ -1,9 +1,19 @@
 """Overpass API access and OSM tag parsing (rule B8)."""
+import asyncio
+import codecs
+import json
+import logging
+import re
 import time
+import zlib
+from collections.abc import AsyncIterator, Sequence
 from typing import Optional
 
 import httpx
 
+from config import OVERPASS_HEDGE_DELAY_S
+import overpass_cache
+
 # Ordered by observed reliability: the main instance fails fast when
 # overloaded, the VK mirror is a healthy full-planet instance close to
 # Central Asia, and the last two hang under load, so they go last.
@@ -28,6 +38,18 @@ _TIMEOUT = httpx.Timeout(50.0, connect=10.0)
 # proxy window (rule X5: budget + one in-flight request < 180s).
 _ATTEMPT_ROUNDS = 2
 _OVERALL_BUDGET_S = 100.0
+# Mirror ordering: assumed time to first byte of an unmeasured mirror, and
+# the seconds a 100% failure rate adds to a mirror's expected latency.
+_DEFAULT_LATENCY_S = 5.0
+_FAILURE_PENALTY_S = 60.0
+
+# Decompressed bytes read per thread hop when replaying a cached response.
+_REPLAY_CHUNK_BYTES = 1 << 20
+
+# url, streaming response, first body chunk, remaining body chunks.
+_OpenedMirror = tuple[str, httpx.Response, bytes, AsyncIterator[bytes]]
+
+logger = logging.getLogger(__name__)
 
 _client: Optional[httpx.AsyncClient] = None
 
@@ -56,21 +78,340 @@ def describe_failure(url: str, error: Exception) -> str:
     return f"{url}: {str(error) or type(error).__name__}"
 
 
-async def fetch_overpass(query: str) -> dict:
-    """Fetch one Overpass response, trying a small set of public instances."""
-    failures = []
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+_SEPARATOR = re.compile(r"[\s,]*")
+# A body this far in without an "elements" array is not an Overpass result.
+_MAX_HEADER_CHARS = 1 << 20
+# Retry an incomplete element once this many more characters arrived, so a
+# huge way is re-parsed O(log n) times rather than once per network chunk.
+_MIN_RETRY_CHARS = 1 << 16
+
+
+class ElementStream:
+    """Incremental parser of the ``elements`` array of an Overpass JSON body.
+
+    ``feed`` takes bytes as they arrive and returns the elements they
+    completed; only the unparsed tail is buffered, so memory follows the
+    largest element rather than the response. Members after the array
+    (``remark``) are ignored, as the whole-body parse ignored them.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._in_array = False
+        self._done = False
+        self._retry_at = 0
+
+    def feed(self, data: bytes) -> list[dict]:
+        self._buffer += self._decoder.decode(data)
+        return self._drain(final=False)
+
+    def close(self) -> list[dict]:
+        self._buffer += self._decoder.decode(b"", final=True)
+        elements = self._drain(final=True)
+        if not self._done:
+            raise ValueError("Overpass response ended inside its elements array")
+        return elements
+
+    @property
+    def has_remark(self) -> bool:
+        """Whether a ``remark`` followed the array: Overpass reports a query
+        that hit its timeout or memory limit there, with partial elements."""
+        return self._done and '"remark"' in self._buffer
+
+    def _drain(self, *, final: bool) -> list[dict]:
+        if self._done:
+            return []
+        buffer, position = self._buffer, 0
+        if not self._in_array:
+            start = _ELEMENTS_START.search(buffer)
+            if start is None:
+                if final or len(buffer) > _MAX_HEADER_CHARS:
+                    raise ValueError("Overpass response has no elements array")
+                return []
+            self._in_array = True
+            position = start.end()
+        elements = []
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if buffer[position] == "]":
+                self._done = True
+                position += 1
+                break
+            if not final and len(buffer) < self._retry_at:
+                break
+            try:
+                element, position = self._json.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                self._retry_at = len(buffer) + max(len(buffer) - position, _MIN_RETRY_CHARS)
+                break
+            self._retry_at = 0
+            elements.append(element)
+        self._buffer = buffer[position:]
+        return elements
+
+
+class MirrorStats:
+    """Per-mirror time to first byte and failure rate, as moving averages.
+
+    Mirrors are tried fastest-expected first: the latency estimate plus a
+    penalty per unit of failure rate, with unmeasured mirrors assumed
+    average and ties kept in OVERPASS_URLS order. A mirror that starts
+    failing sinks, and one that recovers rises again when hedging reaches it.
+    """
+
+    def __init__(self, weight: float = 0.3):
+        self.weight = weight
+        self._mirrors: dict[str, dict[str, float]] = {}
+
+    def _mirror(self, url: str) -> dict[str, float]:
+        return self._mirrors.setdefault(
+            url, {"requests": 0, "failures": 0, "latency_s": None, "failure_rate": 0.0},
+        )
+
+    def _average(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.weight * (sample - current)
+
+    def record_success(self, url: str, latency_s: float) -> None:
+        mirror = self._mirror(url)
+        mirror["requests"] += 1
+        mirror["latency_s"] = self._average(mirror["latency_s"], latency_s)
+        mirror["failure_rate"] = self._average(mirror["failure_rate"], 0.0)
+
+    def record_failure(self, url: str) -> None:
+        mirror = self._mirror(url)
+        mirror["requests"] += 1
+        mirror["failures"] += 1
+        mirror["failure_rate"] = self._average(mirror["failure_rate"], 1.0)
+
+    def ordered(self, urls: Sequence[str]) -> list[str]:
+        def score(url: str) -> float:
+            mirror = self._mirrors.get(url)
+            if mirror is None:
+                return _DEFAULT_LATENCY_S
+            latency = mirror["latency_s"]
+            return (
+                (_DEFAULT_LATENCY_S if latency is None else latency)
+                + mirror["failure_rate"] * _FAILURE_PENALTY_S
+            )
+
+        return sorted(urls, key=score)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {url: dict(mirror) for url, mirror in self._mirrors.items()}
+
+
+mirror_stats = MirrorStats()
+
+
+async def _open_mirror(client: httpx.AsyncClient, url: str, query: str) -> _OpenedMirror:
+    """POST the query and wait for the first body bytes of a 2xx answer."""
+    response = await client.send(
+        client.build_request("POST", url, content=query, headers=OVERPASS_HEADERS),
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        chunks = response.aiter_bytes()
+        first = b""
+        while not first:
+            first = await anext(chunks)
+    except BaseException as error:
+        await response.aclose()
+        if isinstance(error, StopAsyncIteration):
+            raise ValueError("empty Overpass response") from None
+        raise
+    return url, response, first, chunks
+
+
+async def _first_mirror(
+    client: httpx.AsyncClient,
+    query: str,
+    queue: list[str],
+    failures: list[str],
+    deadline: float,
+) -> Optional[_OpenedMirror]:
+    """Race mirrors from ``queue`` for the first one that starts answering.
+
+    The next mirror starts when the previous ones fail, or when none has
+    sent a byte within OVERPASS_HEDGE_DELAY_S. The winner is returned open;
+    every other request is cancelled.
+    """
+    pending: dict[asyncio.Task, tuple[str, float]] = {}
+
+    def launch() -> None:
+        if queue and time.monotonic() < deadline:
+            url = queue.pop(0)
+            task = asyncio.create_task(_open_mirror(client, url, query))
+            pending[task] = (url, time.monotonic())
+
+    launch()
+    hedge_delay = OVERPASS_HEDGE_DELAY_S if OVERPASS_HEDGE_DELAY_S > 0 else None
+    try:
+        while pending:
+            done, _ = await asyncio.wait(
+                pending, timeout=hedge_delay if queue else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                launch()
+                continue
+            winner = None
+            for task in done:
+                url, started = pending.pop(task)
+                try:
+                    opened = task.result()
+                except (httpx.HTTPError, ValueError) as error:
+                    mirror_stats.record_failure(url)
+                    failures.append(describe_failure(url, error))
+                    continue
+                mirror_stats.record_success(url, time.monotonic() - started)
+                if winner is None:
+                    winner = opened
+                else:
+                    await opened[1].aclose()
+            if winner is not None:
+                return winner
+            if not pending:
+                launch()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, tuple):
+                await result[1].aclose()
+
+
+class _ResponseRecorder:
+    """Gzip-compresses a response as it streams, for the disk cache, and
+    gives up once it outgrows what the cache would keep."""
+
+    def __init__(self, max_bytes: int):
+        # Fastest level: JSON still shrinks several-fold, at little loop time.
+        self._compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+        self._parts: Optional[list[bytes]] = []
+        self._size = 0
+        self._max_bytes = max_bytes
+
+    def add(self, data: bytes) -> None:
+        if self._parts is None:
+            return
+        part = self._compressor.compress(data)
+        self._size += len(part)
+        if self._size > self._max_bytes:
+            self._parts = None
+        else:
+            self._parts.append(part)
+
+    def body(self) -> Optional[bytes]:
+        if self._parts is None:
+            return None
+        return b"".join(self._parts) + self._compressor.flush()
+
+
+async def _store(
+    cache: overpass_cache.OverpassCache, key: str, recorder: _ResponseRecorder,
+    elements: ElementStream,
+) -> None:
+    body = recorder.body()
+    if body is None or elements.has_remark:
+        return
+    try:
+        await asyncio.to_thread(cache.put, key, body)
+    except OSError:
+        # The import itself succeeded; a full or read-only disk only costs
+        # the next import a mirror request.
+        logger.warning("Could not cache an Overpass response in %s", cache.directory, exc_info=True)
+
+
+async def _replay(
+    cache: overpass_cache.OverpassCache, key: str, reader,
+) -> AsyncIterator[dict]:
+    try:
+        elements = ElementStream()
+        while data := await asyncio.to_thread(reader.read, _REPLAY_CHUNK_BYTES):
+            for element in elements.feed(data):
+                yield element
+        for element in elements.close():
+            yield element
+    except (OSError, EOFError, zlib.error, ValueError) as error:
+        await asyncio.to_thread(cache.discard, key)
+        raise OverpassUnavailable(
+            "The cached Overpass response is unreadable and was dropped; retry the import."
+        ) from error
+    finally:
+        reader.close()
+
+
+async def stream_overpass(query: str, *, bypass_cache: bool = False) -> AsyncIterator[dict]:
+    """Yield the elements of one Overpass response as they arrive.
+
+    A fresh copy in the disk cache (overpass_cache) is replayed instead of
+    asking a mirror; ``bypass_cache`` skips the lookup, and the new answer
+    replaces the cached one. Mirrors race with hedging (see _first_mirror)
+    in the order MirrorStats currently expects to be fastest. A winner that
+    fails before its first element hands over to the remaining mirrors; a
+    response cut off after that raises OverpassUnavailable rather than
+    continuing from another mirror; the caller keeps what it already wrote,
+    and re-running the import completes it.
+    """
+    cache = overpass_cache.disk_cache
+    key = overpass_cache.query_key(query) if cache is not None else ""
+    if cache is not None and not bypass_cache:
+        reader = await asyncio.to_thread(cache.open, key)
+        if reader is not None:
+            async for element in _replay(cache, key, reader):
+                yield element
+            return
+
+    failures: list[str] = []
     client = _get_client()
-    started = time.monotonic()
+    deadline = time.monotonic() + _OVERALL_BUDGET_S
     for _ in range(_ATTEMPT_ROUNDS):
-        for url in OVERPASS_URLS:
-            if time.monotonic() - started > _OVERALL_BUDGET_S:
+        queue = mirror_stats.ordered(OVERPASS_URLS)
+        while queue:
+            opened = await _first_mirror(client, query, queue, failures, deadline)
+            if opened is None:
                 break
+            url, response, first, chunks = opened
+            yielded = False
+            recorder = _ResponseRecorder(cache.max_entry_bytes) if cache is not None else None
             try:
-                response = await client.post(url, content=query, headers=OVERPASS_HEADERS)
-                response.raise_for_status()
-                return response.json()
+                elements = ElementStream()
+                if recorder is not None:
+                    recorder.add(first)
+                for element in elements.feed(first):
+                    yielded = True
+                    yield element
+                async for data in chunks:
+                    if recorder is not None:
+                        recorder.add(data)
+                    for element in elements.feed(data):
+                        yielded = True
+                        yield element
+                for element in elements.close():
+                    yielded = True
+                    yield element
+                if recorder is not None:
+                    await _store(cache, key, recorder, elements)
+                return
             except (httpx.HTTPError, ValueError) as error:
+                mirror_stats.record_failure(url)
+                if yielded:
+                    raise OverpassUnavailable(
+                        "The Overpass response was cut off; retry the import. "
+                        + describe_failure(url, error)
+                    ) from error
                 failures.append(describe_failure(url, error))
+            finally:
+                await response.aclose()
 
     raise OverpassUnavailable(
         "All Overpass mirrors are busy or unreachable; retry in a minute "
@@ -0,0 +1,157 @@
+"""On-disk cache of raw Overpass responses, shared by every worker.
+
+Entries are gzip files named by the SHA-256 of the normalized query text;
+the bbox is part of the query, so the same import of the same area hits.
+An entry's mtime is when it was fetched and its atime when it was last
+used: entries expire OVERPASS_CACHE_TTL_S after fetching, and when the
+directory grows past its byte budget the least recently used go first.
+Writes land under a temporary name and are renamed into place, so a reader
+never sees half an entry. Methods block; call them from a thread.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Optional
+
+from config import OVERPASS_CACHE_DIR, OVERPASS_CACHE_MAX_BYTES, OVERPASS_CACHE_TTL_S
+
+_SUFFIX = ".json.gz"
+# Quoted strings are kept verbatim; whitespace between tokens is not
+# significant to Overpass QL.
+_QUERY_TOKENS = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|\s+')
+
+
+def normalize_query(query: str) -> str:
+    return _QUERY_TOKENS.sub(lambda match: match.group(1) or " ", query).strip()
+
+
+def query_key(query: str) -> str:
+    return hashlib.sha256(normalize_query(query).encode()).hexdigest()
+
+
+class OverpassCache:
+    """Compressed Overpass responses under ``directory``, bounded by age and
+    total size. One entry may use at most ``max_entry_fraction`` of the
+    budget, so a single huge import cannot flush everything else."""
+
+    def __init__(
+        self, directory: str, max_bytes: int, ttl_s: float, *, max_entry_fraction: float = 0.25,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """The decompressing reader of a fresh entry, marked as just used,
+        or None."""
+        path = self._path(key)
+        try:
+            fetched_at = os.stat(path).st_mtime
+            if time.time() - fetched_at > self.ttl_s:
+                os.remove(path)
+                with self._lock:
+                    self.expirations += 1
+                    self.misses += 1
+                return None
+            # Keep the fetch time in mtime; atime records the use for LRU.
+            os.utime(path, (time.time(), fetched_at))
+            reader = gzip.open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return reader
+
+    def put(self, key: str, compressed: bytes) -> None:
+        """Store one gzip-compressed response, then evict down to budget."""
+        if len(compressed) > self.max_entry_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(compressed)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        with self._lock:
+            self.stores += 1
+        self._evict()
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self) -> list[tuple[float, float, int, str]]:
+        """``(last used, fetched, size, path)`` of every entry, least recently
+        used first."""
+        entries = []
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    status = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((status.st_atime, status.st_mtime, status.st_size, path))
+        return sorted(entries)
+
+    def _evict(self) -> None:
+        """Drop expired entries, then the least recently used until the
+        directory fits its budget."""
+        entries = self._entries()
+        total = sum(size for _, _, size, _ in entries)
+        expired_before = time.time() - self.ttl_s
+        for _, fetched_at, size, path in entries:
+            if total <= self.max_bytes and fetched_at >= expired_before:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int | float | str]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+disk_cache: Optional[OverpassCache] = (
+    OverpassCache(OVERPASS_CACHE_DIR, OVERPASS_CACHE_MAX_BYTES, OVERPASS_CACHE_TTL_S)
+    if OVERPASS_CACHE_DIR and OVERPASS_CACHE_MAX_BYTES > 0 else None
+)
@@ -0,0 +1,87 @@
+"""Low-zoom point clusters read from the grid summary of migration 019.
+
+Point features are counted per Web Mercator grid cell at every even level
+2..16 (a level-L cell is the XYZ tile z=L) and kept current by triggers, so a
+country-wide overview reads a few thousand summary rows at most, whatever
+the number of points behind them.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import CLUSTER_MAX_CELLS
+from feature_domain import Bounds
+from serializers import cluster_to_geojson_json, collection_bytes
+from tile_cache import tile_range
+
+# The feature types migration 019 summarizes.
+CLUSTER_FEATURE_TYPES = ("point", "poi", "business", "streetlight", "traffic_light")
+CELL_LEVELS = tuple(range(2, 17, 2))
+# Cells two levels below the map zoom are 64 px wide on screen.
+_CELL_ZOOM_OFFSET = 2
+
+CellRange = tuple[int, int, int, int, int]
+
+_CLUSTERS_SQL = text(
+    "SELECT cell_y::bigint * :scale + cell_x AS id, sum(count)::bigint AS count, "
+    "sum(sum_lon) / sum(count)::float8 AS lon, sum(sum_lat) / sum(count)::float8 AS lat, "
+    "array_agg(feature_type ORDER BY feature_type) AS feature_types, "
+    "array_agg(count ORDER BY feature_type) AS counts "
+    "FROM feature_point_cells "
+    "WHERE level = :level AND cell_x BETWEEN :x_min AND :x_max "
+    "AND cell_y BETWEEN :y_min AND :y_max AND count > 0 "
+    "AND feature_type = ANY(:feature_types) "
+    "GROUP BY cell_x, cell_y"
+)
+
+
+def parse_cluster_types(value: Optional[str]) -> tuple[str, ...]:
+    """A ``types=`` list as CLUSTER_FEATURE_TYPES in canonical order; every
+    clustered type when absent. Raises ValueError for other names."""
+    if value is None:
+        return CLUSTER_FEATURE_TYPES
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("types must name at least one feature type")
+    unknown = sorted(requested.difference(CLUSTER_FEATURE_TYPES))
+    if unknown:
+        raise ValueError(
+            f"types must be among {', '.join(CLUSTER_FEATURE_TYPES)}; got {', '.join(unknown)}"
+        )
+    return tuple(name for name in CLUSTER_FEATURE_TYPES if name in requested)
+
+
+def cluster_cells(bounds: Bounds, zoom: int, max_cells: int = CLUSTER_MAX_CELLS) -> CellRange:
+    """``(level, x_min, x_max, y_min, y_max)`` of the grid cells to read.
+
+    The level follows the map zoom, coarsened until the viewport covers at
+    most ``max_cells`` cells. Equal ranges share an ETag and a cache entry,
+    so small pans within one cell row are free.
+    """
+    level = max(CELL_LEVELS[0], min(CELL_LEVELS[-1], (zoom + _CELL_ZOOM_OFFSET) // 2 * 2))
+    while True:
+        x_min, x_max, y_min, y_max = tile_range(bounds, level, margin=0)
+        cells = (x_max - x_min + 1) * (y_max - y_min + 1)
+        if cells <= max_cells or level == CELL_LEVELS[0]:
+            return level, x_min, x_max, y_min, y_max
+        level -= 2
+
+
+async def point_clusters(
+    db: AsyncSession, cells: CellRange, feature_types: tuple[str, ...],
+) -> bytes:
+    """The non-empty cells of a range as an encoded FeatureCollection."""
+    level, x_min, x_max, y_min, y_max = cells
+    rows = (await db.execute(_CLUSTERS_SQL, {
+        "level": level,
+        "scale": 2 ** level,
+        "x_min": x_min,
+        "x_max": x_max,
+        "y_min": y_min,
+        "y_max": y_max,
+        "feature_types": list(feature_types),
+    })).all()
+    return collection_bytes([cluster_to_geojson_json(row) for row in rows])
@@ -0,0 +1,76 @@
+"""Bounded in-process caches of serialized read responses.
+
+Entries are keyed by the feature_stat revision they were read at. The first
+lookup at a newer revision drops every older entry, so any committed write
+invalidates the cache without a notification channel. Each uvicorn worker
+keeps its own cache; workers converge because they all observe the same
+database revision.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from config import SEARCH_CACHE_MAX_BYTES, VIEWPORT_CACHE_MAX_BYTES
+
+
+class RevisionLRU:
+    """A byte-budgeted LRU of response bodies valid for one revision."""
+
+    def __init__(self, max_bytes: int, *, max_entry_fraction: float = 0.25):
+        self.max_bytes = max_bytes
+        # One huge viewport must not evict everything else for a single hit.
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.revision: Optional[int] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+
+    def _observe(self, revision: int) -> None:
+        if self.revision is None or revision > self.revision:
+            self._entries.clear()
+            self.size = 0
+            self.revision = revision
+
+    def get(self, key: Hashable, revision: int) -> Optional[bytes]:
+        self._observe(revision)
+        body = self._entries.get(key) if revision == self.revision else None
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: Hashable, revision: int, body: bytes) -> None:
+        self._observe(revision)
+        # A request that read an older revision than another request already
+        # observed holds outdated rows; never cache them.
+        if revision != self.revision or len(body) > self.max_entry_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int | None]:
+        return {
+            "revision": self.revision,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+viewport_cache = RevisionLRU(VIEWPORT_CACHE_MAX_BYTES)
+search_cache = RevisionLRU(SEARCH_CACHE_MAX_BYTES)
@@ -7,6 +7,8 @@ from typing import Any, Mapping, Sequence
 from shapely.geometry import Point, shape
 from shapely.ops import substring
 
+from feature_domain import ValidGeometry
+
 
 class RoadGeometryError(ValueError):
     """A road geometry cannot safely be used by the routing builder."""
@@ -55,15 +57,20 @@ def validate_road_geometry(feature_type: str | None, geometry: Mapping[str, Any]
     ):
         raise RoadGeometryError("A road needs at least two points")
 
-    positions = [_position(value) for value in coordinates]
+    if isinstance(geometry, ValidGeometry):
+        # Already parsed, valid, finite, and within lon/lat limits.
+        line = geometry.shape
+        positions = [tuple(position[:2]) for position in line.coords]
+    else:
+        positions = [_position(value) for value in coordinates]
+        line = shape({"type": "LineString", "coordinates": positions})
+        if not line.is_valid:
+            raise RoadGeometryError("Road geometry is not a valid LineString")
     if any(current == previous for previous, current in zip(positions, positions[1:])):
         raise RoadGeometryError("A road cannot contain duplicate consecutive points")
 
-    line = shape({"type": "LineString", "coordinates": positions})
     if line.is_empty or line.length == 0:
         raise RoadGeometryError("A road must have non-zero length")
-    if not line.is_valid:
-        raise RoadGeometryError("Road geometry is not a valid LineString")
 
 
 def split_road_span_geometry(
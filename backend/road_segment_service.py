@@ -1,40 +1,40 @@
 """Atomic node-to-node road-span mutation services."""
 from __future__ import annotations
 
-import json
 from datetime import datetime
 from typing import Any
 
-from geoalchemy2.functions import ST_AsGeoJSON
-from sqlalchemy import delete, select
+from sqlalchemy import delete
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import geometry_work
+from feature_domain import vertex_count
 from feature_mutations import (
     FeatureNotFound,
     InvalidFeature,
     PublishedRoadConfirmationRequired,
     database_conflict,
+    feature_snapshot,
     geometry_value,
-    locked_feature,
     road_in_published_graph,
     source_kind_after_user_update,
     validate_road_values_for_feature,
     validated_update_data,
+    write_feature,
 )
 from models import Feature, SOURCE_KIND_MANUAL, User
 from road_geometry import RoadGeometryError, split_road_span_geometry
 from schemas import RoadSegmentDelete, RoadSegmentRestore, RoadSegmentUpdate
-from serializers import feature_response
 
 
-def _road_sibling(source: Feature, geometry: dict[str, Any], user: User) -> Feature:
+async def _road_sibling(source: Feature, geometry: dict[str, Any], user: User) -> Feature:
     properties = dict(source.properties or {})
     properties["split_parent_id"] = source.id
     return Feature(
         name=source.name,
         description=source.description,
-        geometry=geometry_value(geometry, "road"),
+        geometry=await geometry_value(geometry, "road"),
         properties=properties,
         osm_id=None,
         osm_type=None,
@@ -50,9 +50,12 @@ def _road_sibling(source: Feature, geometry: dict[str, Any], user: User) -> Feat
     )
 
 
-def _road_parts(stored_geometry: dict[str, Any], start: list[float], end: list[float]):
+async def _road_parts(stored_geometry: dict[str, Any], start: list[float], end: list[float]):
     try:
-        return split_road_span_geometry(stored_geometry, start, end)
+        return await geometry_work.run(
+            split_road_span_geometry, stored_geometry, start, end,
+            vertices=vertex_count(stored_geometry),
+        )
     except RoadGeometryError as error:
         raise InvalidFeature(str(error)) from error
 
@@ -62,15 +65,24 @@ def _require_road(feature: Feature) -> None:
         raise InvalidFeature("Only roads support segment editing")
 
 
-async def _mutation_response(db: AsyncSession, feature: Feature, sibling_ids: list[int]):
-    await db.refresh(feature)
-    geometry_json = await db.scalar(
-        select(ST_AsGeoJSON(Feature.geometry)).where(Feature.id == feature.id)
-    )
-    return {
-        "feature": feature_response(feature, json.loads(geometry_json)),
-        "sibling_ids": sibling_ids,
-    }
+async def _write_with_siblings(
+    db: AsyncSession,
+    feature_id: int,
+    expected_updated_at: datetime,
+    values: dict[str, Any],
+    siblings: list[Feature],
+):
+    # The versioned UPDATE goes first: it takes the row lock and rejects a
+    # stale edit before any sibling is inserted.
+    try:
+        response = await write_feature(db, feature_id, expected_updated_at, values)
+        db.add_all(siblings)
+        await db.flush()
+        sibling_ids = [sibling.id for sibling in siblings]
+        await db.commit()
+    except IntegrityError as error:
+        raise database_conflict(error) from error
+    return {"feature": response, "sibling_ids": sibling_ids}
 
 
 async def update_road_segment(
@@ -80,33 +92,24 @@ async def update_road_segment(
     user: User,
     expected_updated_at: datetime,
 ):
-    db_feature, stored_geometry = await locked_feature(db, feature_id, expected_updated_at)
+    db_feature, stored_geometry = await feature_snapshot(db, feature_id, expected_updated_at)
     _require_road(db_feature)
     if segment_update.feature.geometry is None:
         raise InvalidFeature("Edited road segment geometry is required")
-    parts = _road_parts(stored_geometry, segment_update.start, segment_update.end)
+    parts = await _road_parts(stored_geometry, segment_update.start, segment_update.end)
     siblings = [
-        _road_sibling(db_feature, geometry, user)
+        await _road_sibling(db_feature, geometry, user)
         for geometry in (parts["prefix"], parts["suffix"])
         if geometry is not None
     ]
-    db.add_all(siblings)
     update_data = await validated_update_data(
         db,
         db_feature,
         segment_update.feature,
         stored_geometry,
     )
-    for attribute, value in update_data.items():
-        setattr(db_feature, attribute, value)
-    db_feature.updated_by = user.id
-    try:
-        await db.flush()
-        sibling_ids = [sibling.id for sibling in siblings]
-        await db.commit()
-    except IntegrityError as error:
-        raise database_conflict(error) from error
-    return await _mutation_response(db, db_feature, sibling_ids)
+    update_data["updated_by"] = user.id
+    return await _write_with_siblings(db, feature_id, expected_updated_at, update_data, siblings)
 
 
 async def delete_road_segment(
@@ -118,11 +121,11 @@ async def delete_road_segment(
     *,
     confirm_published: bool = False,
 ):
-    db_feature, stored_geometry = await locked_feature(db, feature_id, expected_updated_at)
+    db_feature, stored_geometry = await feature_snapshot(db, feature_id, expected_updated_at)
     _require_road(db_feature)
     if not confirm_published and await road_in_published_graph(db, feature_id):
         raise PublishedRoadConfirmationRequired("published_road_confirmation_required")
-    parts = _road_parts(stored_geometry, segment_delete.start, segment_delete.end)
+    parts = await _road_parts(stored_geometry, segment_delete.start, segment_delete.end)
     remainders = [
         geometry
         for geometry in (parts["prefix"], parts["suffix"])
@@ -130,21 +133,16 @@ async def delete_road_segment(
     ]
     if not remainders:
         raise InvalidFeature("Full roads use the standard delete operation")
-    db_feature.geometry = geometry_value(remainders[0], "road")
-    db_feature.source_kind = source_kind_after_user_update(
-        db_feature.source_kind,
-        db_feature.source_kind,
-    )
-    db_feature.updated_by = user.id
-    siblings = [_road_sibling(db_feature, geometry, user) for geometry in remainders[1:]]
-    db.add_all(siblings)
-    try:
-        await db.flush()
-        sibling_ids = [sibling.id for sibling in siblings]
-        await db.commit()
-    except IntegrityError as error:
-        raise database_conflict(error) from error
-    return await _mutation_response(db, db_feature, sibling_ids)
+    values = {
+        "geometry": await geometry_value(remainders[0], "road"),
+        "source_kind": source_kind_after_user_update(
+            db_feature.source_kind,
+            db_feature.source_kind,
+        ),
+        "updated_by": user.id,
+    }
+    siblings = [await _road_sibling(db_feature, geometry, user) for geometry in remainders[1:]]
+    return await _write_with_siblings(db, feature_id, expected_updated_at, values, siblings)
 
 
 async def restore_road_segment(
@@ -154,7 +152,7 @@ async def restore_road_segment(
     user: User,
     expected_updated_at: datetime,
 ):
-    db_feature, _ = await locked_feature(db, feature_id, expected_updated_at)
+    db_feature, _ = await feature_snapshot(db, feature_id, expected_updated_at)
     _require_road(db_feature)
     if restore.feature.feature_type != "road":
         raise InvalidFeature("Only roads support segment restore")
@@ -172,26 +170,21 @@ async def restore_road_segment(
         previous_surface=db_feature.surface,
     )
     restored_data = restore.feature.model_dump(exclude={"geometry"})
-    restored_data["geometry"] = geometry_value(
+    restored_data["geometry"] = await geometry_value(
         restore.feature.geometry,
         restore.feature.feature_type,
     )
-    for attribute, value in restored_data.items():
-        setattr(db_feature, attribute, value)
-    db_feature.updated_by = user.id
+    restored_data["updated_by"] = user.id
     sibling_ids = [sibling_id for sibling_id in restore.sibling_ids if sibling_id != feature_id]
-    if sibling_ids:
-        await db.execute(delete(Feature).where(
-            Feature.id.in_(sibling_ids),
-            Feature.feature_type == "road",
-            Feature.properties["split_parent_id"].astext == str(feature_id),
-        ))
     try:
+        response = await write_feature(db, feature_id, expected_updated_at, restored_data)
+        if sibling_ids:
+            await db.execute(delete(Feature).where(
+                Feature.id.in_(sibling_ids),
+                Feature.feature_type == "road",
+                Feature.properties["split_parent_id"].astext == str(feature_id),
+            ))
         await db.commit()
     except IntegrityError as error:
         raise database_conflict(error) from error
-    await db.refresh(db_feature)
-    geometry_json = await db.scalar(
-        select(ST_AsGeoJSON(Feature.geometry)).where(Feature.id == feature_id)
-    )
-    return feature_response(db_feature, json.loads(geometry_json))
+    return response
@@ -1,10 +1,12 @@
 import math
 from datetime import datetime
-from typing import Any, Dict, Literal, Optional
+from typing import Annotated, Any, Dict, Literal, Optional, Union
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
-from feature_domain import validate_feature_geometry, validate_geometry_mapping
+from config import FEATURE_BATCH_LIMIT, TILED_IMPORT_MAX_AREA_DEG2
+from feature_domain import check_feature_geometry_type
+from geometry_work import boundary_geometry
 
 # Mirrors the features_source_kind_check DB constraint so bad values fail with
 # 422 at the boundary instead of a database error (rule B5).
@@ -53,12 +55,11 @@ class FeatureBase(BaseModel):
     @field_validator("geometry")
     @classmethod
     def validate_geometry(cls, value):
-        validate_geometry_mapping(value)
-        return value
+        return boundary_geometry(value)
 
     @model_validator(mode="after")
     def validate_feature_geometry_type(self):
-        validate_feature_geometry(self.feature_type, self.geometry)
+        check_feature_geometry_type(self.feature_type, self.geometry)
         if self.building_id is not None and self.feature_type != "business":
             raise ValueError("Only business features can link to a building")
         return self
@@ -94,14 +95,12 @@ class FeatureUpdate(BaseModel):
     @field_validator("geometry")
     @classmethod
     def validate_optional_geometry(cls, value):
-        if value is not None:
-            validate_geometry_mapping(value)
-        return value
+        return None if value is None else boundary_geometry(value)
 
     @model_validator(mode="after")
     def validate_supplied_geometry_type(self):
         if self.geometry is not None and self.feature_type is not None:
-            validate_feature_geometry(self.feature_type, self.geometry)
+            check_feature_geometry_type(self.feature_type, self.geometry)
         if self.building_id is not None and self.feature_type not in (None, "business"):
             raise ValueError("Only business features can link to a building")
         return self
@@ -129,6 +128,10 @@ class RoadSegmentRestore(BaseModel):
     sibling_ids: list[int] = Field(default_factory=list)
 
 
+class FeatureIds(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=FEATURE_BATCH_LIMIT)
+
+
 class FeatureResponse(FeatureBase):
     model_config = ConfigDict(from_attributes=True)
 
@@ -137,6 +140,57 @@ class FeatureResponse(FeatureBase):
     updated_at: datetime
 
 
+class FeatureBatchCreate(BaseModel):
+    op: Literal["create"]
+    feature: FeatureCreate
+
+
+class FeatureBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    # The If-Match value a single PUT would send: the quoted updated_at.
+    if_match: str
+    feature: FeatureUpdate
+    confirm_published: bool = False
+
+
+class FeatureBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+    if_match: str
+    confirm_published: bool = False
+
+
+FeatureBatchOperation = Annotated[
+    Union[FeatureBatchCreate, FeatureBatchUpdate, FeatureBatchDelete],
+    Field(discriminator="op"),
+]
+
+
+class FeatureBatch(BaseModel):
+    operations: list[FeatureBatchOperation] = Field(min_length=1, max_length=FEATURE_BATCH_LIMIT)
+
+
+class FeatureBatchResult(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None
+    # failed marks the operation that stopped the batch; not_applied the
+    # others, which were rolled back with it.
+    status: Literal["created", "updated", "deleted", "failed", "not_applied"]
+    feature: Optional[FeatureResponse] = None
+    detail: Optional[str] = None
+
+
+class FeatureBatchResponse(BaseModel):
+    """Per-operation results, in request order. The batch commits entirely or
+    not at all."""
+
+    committed: bool
+    results: list[FeatureBatchResult]
+    # Why an uncommitted batch was rejected: the failed operation's detail.
+    detail: Optional[str] = None
+
+
 class RoadSegmentMutationResponse(BaseModel):
     feature: FeatureResponse
     sibling_ids: list[int]
@@ -154,6 +208,23 @@ class GeoJSONFeatureCollection(BaseModel):
     features: list[GeoJSONFeature]
 
 
+class GeoJSONFeaturePage(GeoJSONFeatureCollection):
+    """One id-ordered page of a /features/page walk."""
+
+    # feature_stat revision when the walk started. Rows written later may or
+    # may not appear; /features/changes?since=revision catches up afterwards.
+    revision: int
+    # Opaque token for the next page; null on the last page.
+    next_cursor: Optional[str] = None
+
+
+class GeoJSONFeatureBatch(GeoJSONFeatureCollection):
+    """The features of a /features/batch-get, in request order."""
+
+    # Requested ids with no feature, e.g. deleted since the client saw them.
+    missing: list[int]
+
+
 class FeatureVersion(BaseModel):
     """Cheap change stamp: clients poll this instead of the full collection.
 
@@ -165,6 +236,23 @@ class FeatureVersion(BaseModel):
     updated_at: Optional[datetime]
 
 
+class FeatureChanges(BaseModel):
+    """Rows changed after a client's revision, from the feature_changes log
+    (migration 014). full_reload means the log no longer covers that revision
+    or the delta is too large; the client refetches the collection instead."""
+
+    revision: int
+    full_reload: bool = False
+    features: list[GeoJSONFeature] = Field(default_factory=list)
+    deleted: list[int] = Field(default_factory=list)
+
+
+class FeatureCount(BaseModel):
+    feature_type: Optional[str] = None
+    source_kind: str
+    count: int
+
+
 class AppMeta(BaseModel):
     """One-shot mode hint read by the client at load."""
 
@@ -172,6 +260,8 @@ class AppMeta(BaseModel):
     # True once the dataset is large enough to render the whole map from
     # editor tiles instead of the small-data basemap overlay.
     full_base: bool
+    # Exact rows per (feature_type, source_kind), maintained by triggers.
+    counts: list[FeatureCount] = []
 
 
 class BulkLoadRequest(BaseModel):
@@ -208,21 +298,31 @@ class UpdateUserRequest(BaseModel):
     is_active: Optional[bool] = None
 
 
+# One viewport import is one Overpass query of at most this many deg².
+VIEWPORT_IMPORT_MAX_AREA_DEG2 = 0.25
+
+
+def _check_bounds(bounds) -> None:
+    if not (-180 <= bounds.west < bounds.east <= 180):
+        raise ValueError("bounds must use west < east within longitude limits")
+    if not (-90 <= bounds.south < bounds.north <= 90):
+        raise ValueError("bounds must use south < north within latitude limits")
+
+
 class BoundsRequest(BaseModel):
     west: float
     south: float
     east: float
     north: float
+    # Ask the mirrors even when the Overpass disk cache has this query.
+    bypass_cache: bool = False
 
     @model_validator(mode="after")
     def validate_bounds(self):
-        if not (-180 <= self.west < self.east <= 180):
-            raise ValueError("bounds must use west < east within longitude limits")
-        if not (-90 <= self.south < self.north <= 90):
-            raise ValueError("bounds must use south < north within latitude limits")
+        _check_bounds(self)
         # Per-viewport imports are intentionally bounded so they cannot become a
         # substitute for an OSM basemap ingestion pipeline.
-        if (self.east - self.west) * (self.north - self.south) > 0.25:
+        if (self.east - self.west) * (self.north - self.south) > VIEWPORT_IMPORT_MAX_AREA_DEG2:
             raise ValueError("requested bounds are too large; zoom in before importing")
         return self
 
@@ -230,3 +330,23 @@ class BoundsRequest(BaseModel):
     def bbox(self) -> str:
         """Overpass bounding-box clause: south,west,north,east."""
         return f"{self.south},{self.west},{self.north},{self.east}"
+
+
+class AreaImportRequest(BaseModel):
+    """A large-area import (oblast scale), fetched as a grid of viewport-sized
+    tiles; see tiled_import."""
+    west: float
+    south: float
+    east: float
+    north: float
+    bypass_cache: bool = False
+
+    @model_validator(mode="after")
+    def validate_bounds(self):
+        _check_bounds(self)
+        if (self.east - self.west) * (self.north - self.south) > TILED_IMPORT_MAX_AREA_DEG2:
+            raise ValueError(
+                f"area imports cover at most {TILED_IMPORT_MAX_AREA_DEG2:g} deg²; "
+                "split the area"
+            )
+        return self
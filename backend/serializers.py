@@ -1,9 +1,10 @@
 """The single place Feature rows become API shapes (rule B2)."""
 import json
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
 
 from geoalchemy2.functions import ST_AsGeoJSON
-from sqlalchemy import Select, select
+from pydantic_core import to_json
+from sqlalchemy import Select, Text, cast, func, literal_column, select
 
 from models import Feature
 from schemas import FeatureResponse, GeoJSONFeature
@@ -18,29 +19,307 @@ PROPERTY_COLUMNS = (
     "business_type", "building_id", "created_by", "updated_by",
 )
 AUDIT_COLUMNS = ("created_at", "updated_at")
+# Float columns, which pydantic writes with a ".0" when whole.
+_FLOAT_COLUMNS = ("height_m",)
+# Selects the JSONB extras (osm_tags, base_* linkage) in a fields= projection.
+EXTRA_PROPERTIES_FIELD = "properties"
+FEATURE_FIELDS = (*PROPERTY_COLUMNS, *AUDIT_COLUMNS, EXTRA_PROPERTIES_FIELD)
 
+GEOJSON_MEDIA_TYPE = "application/json"
+FLATGEOBUF_MEDIA_TYPE = "application/flatgeobuf"
+GEOBUF_MEDIA_TYPE = "application/geobuf"
+_BINARY_ENCODERS = {
+    FLATGEOBUF_MEDIA_TYPE: "ST_AsFlatGeobuf(layer, true, 'geom')",
+    GEOBUF_MEDIA_TYPE: "ST_AsGeobuf(layer, 'geom')",
+}
 
-def geojson_query() -> Select:
+# Streamed and database-assembled collections are written as these fixed
+# brackets around comma-separated Feature objects, matching the output of
+# GeoJSONFeatureCollection.
+COLLECTION_PREFIX = b'{"type":"FeatureCollection","features":['
+COLLECTION_SUFFIX = b"]}"
+
+
+def _output_geometry(generalized: Optional[str]):
+    if generalized is None:
+        return Feature.geometry
+    return func.coalesce(getattr(Feature, generalized), Feature.geometry)
+
+
+def _projected(fields: Optional[Sequence[str]]) -> tuple[tuple[str, ...], tuple[str, ...], bool]:
+    """(property columns, audit columns, JSONB extras?) a read carries."""
+    if fields is None:
+        return PROPERTY_COLUMNS, AUDIT_COLUMNS, True
+    return (
+        tuple(column for column in PROPERTY_COLUMNS if column in fields),
+        tuple(column for column in AUDIT_COLUMNS if column in fields),
+        EXTRA_PROPERTIES_FIELD in fields,
+    )
+
+
+def _geometry_json(generalized: Optional[str], precision: Optional[int]):
+    geometry = _output_geometry(generalized)
+    if precision is None:
+        return ST_AsGeoJSON(geometry)
+    return ST_AsGeoJSON(geometry, precision)
+
+
+def geojson_query(
+    generalized: Optional[str] = None,
+    *,
+    fields: Optional[Sequence[str]] = None,
+    precision: Optional[int] = None,
+) -> Select:
+    """Feature rows for GeoJSON.
+
+    ``generalized`` swaps in a simplified geometry column
+    (``geometry_z9``/``geometry_z12``), ``fields`` limits the properties to
+    FEATURE_FIELDS names (unselected columns are never read, so the JSONB
+    blob is not detoasted unless asked for), and ``precision`` caps the
+    coordinate decimal digits.
+    """
+    columns, audit, extras = _projected(fields)
     # No ORDER BY: a bbox viewport read must use the geometry GIST index, and
     # an ORDER BY id would force the planner to sort by primary key instead.
     # Change detection uses the /features/version stamp, not list ordering.
     return select(
         Feature.id,
-        Feature.properties,
-        *(getattr(Feature, column) for column in PROPERTY_COLUMNS),
-        *(getattr(Feature, column) for column in AUDIT_COLUMNS),
-        ST_AsGeoJSON(Feature.geometry).label("geometry_json"),
+        *((Feature.properties,) if extras else ()),
+        *(getattr(Feature, column) for column in columns),
+        *(getattr(Feature, column) for column in audit),
+        _geometry_json(generalized, precision).label("geometry_json"),
     )
 
 
-def row_to_geojson(row) -> GeoJSONFeature:
-    properties: Dict[str, Any] = dict(row.properties or {})
-    properties.update({column: getattr(row, column) for column in PROPERTY_COLUMNS})
+def _geojson_properties(row) -> Dict[str, Any]:
+    # Projected rows (geojson_query fields=) lack the unselected columns.
+    properties: Dict[str, Any] = dict(getattr(row, "properties", None) or {})
+    properties.update({column: getattr(row, column, None) for column in PROPERTY_COLUMNS})
     properties.update({column: getattr(row, column, None) for column in AUDIT_COLUMNS})
     # Drop nulls to keep the collection payload small.
-    properties = {key: value for key, value in properties.items() if value is not None}
+    return {key: value for key, value in properties.items() if value is not None}
+
+
+def _sql_json_timestamp(column: str) -> str:
+    # Pydantic's JSON form of an aware datetime: UTC with a Z suffix, and
+    # microseconds only when the value has them.
+    utc = f"timezone('UTC', features.{column})"
+    return (
+        f"CASE WHEN date_trunc('second', {utc}) = {utc} "
+        f"THEN to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS\"Z\"') "
+        f"ELSE to_char({utc}, 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"Z\"') END"
+    )
+
+
+def _sql_column_json(column: str) -> str:
+    if column in AUDIT_COLUMNS:
+        return f"to_json({_sql_json_timestamp(column)})"
+    if column in _FLOAT_COLUMNS:
+        value = f"features.{column}"
+        return (
+            f"CASE WHEN {value} = trunc({value}) AND abs({value}) < 1e15 "
+            f"THEN ({value}::text || '.0')::json "
+            f"ELSE to_json({value}) END"
+        )
+    return f"to_json(features.{column})"
+
+
+def _sql_feature_json(
+    generalized: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+    precision: Optional[int] = None,
+) -> str:
+    """SQL text of one Feature's JSON, byte-identical to row_to_geojson_json.
+
+    Properties follow _geojson_properties: the JSONB extras in their stored
+    order, then the columns in PROPERTY_COLUMNS and AUDIT_COLUMNS order, with
+    top-level nulls dropped. json_strip_nulls writes the object compactly,
+    as pydantic does. The bytes differ only when an extra shares a column's
+    name (the column's value is written at the column's position) or an
+    extra's nested object holds a null (json_strip_nulls drops it as well).
+    """
+    columns, audit, extras = _projected(fields)
+    # Columns always override JSONB duplicates, even unselected (null) ones.
+    shadowed = ", ".join(f"'{column}'" for column in (*PROPERTY_COLUMNS, *AUDIT_COLUMNS))
+    parts = []
+    if extras:
+        parts.append(
+            "SELECT 0 AS part, extra.ordinal, extra.key, extra.value::json AS value "
+            "FROM jsonb_each(features.properties) WITH ORDINALITY "
+            "AS extra(key, value, ordinal) "
+            f"WHERE extra.key <> ALL (ARRAY[{shadowed}])"
+        )
+    if columns or audit:
+        rows = ", ".join(
+            f"({ordinal}, '{column}', {_sql_column_json(column)})"
+            for ordinal, column in enumerate((*columns, *audit))
+        )
+        parts.append(
+            "SELECT 1 AS part, property_column.ordinal, property_column.key, "
+            "property_column.value "
+            f"FROM (VALUES {rows}) AS property_column(ordinal, key, value)"
+        )
+    properties = (
+        "(SELECT coalesce(json_strip_nulls("
+        "json_object_agg(key, value ORDER BY part, ordinal)), '{}'::json) "
+        f"FROM ({' UNION ALL '.join(parts)}) AS property "
+        "WHERE json_typeof(value) <> 'null')"
+    )
+    geometry = (
+        "features.geometry" if generalized is None
+        else f"coalesce(features.{generalized}, features.geometry)"
+    )
+    digits = "" if precision is None else f", {int(precision)}"
+    return (
+        "'{\"type\":\"Feature\",\"id\":' || features.id "
+        f"|| ',\"geometry\":' || coalesce(ST_AsGeoJSON({geometry}{digits}), 'null') "
+        f"|| ',\"properties\":' || {properties}::text || '}}'"
+    )
+
+
+def geojson_text_query(
+    generalized: Optional[str] = None,
+    *,
+    fields: Optional[Sequence[str]] = None,
+    precision: Optional[int] = None,
+) -> Select:
+    """geojson_query's Feature, assembled as final JSON text by PostgreSQL.
+
+    The text is the bytes row_to_geojson_json writes for the same row (see
+    _sql_feature_json), so callers can return it unchanged.
+    """
+    return select(
+        literal_column(_sql_feature_json(generalized, fields, precision)).label("feature_json")
+    ).select_from(Feature.__table__)
+
+
+def geojson_text_collection_query(rows: Select) -> Select:
+    """One FeatureCollection text for all of a filtered and limited
+    geojson_text_query(), joined in PostgreSQL in the rows' order.
+
+    string_agg, not json_agg: json_agg separates elements with ", ", and
+    the collection must match GeoJSONFeatureCollection byte for byte.
+    """
+    prefix = COLLECTION_PREFIX.decode()
+    suffix = COLLECTION_SUFFIX.decode()
+    return select(literal_column(
+        f"'{prefix}' || coalesce(string_agg(layer.feature_json, ','), '') || '{suffix}'"
+    )).select_from(rows.subquery("layer"))
+
+
+def mvt_tile_sql(generalized: Optional[str] = None) -> str:
+    """One Mapbox Vector Tile of the ``features`` layer for :z/:x/:y.
+
+    Attributes are the scalar property columns plus ``id`` (the style promotes
+    it to the feature id) and the audit timestamps in their API form. The
+    geometry filter reads the tile plus its rendering buffer through the
+    GIST index on the full-resolution column.
+    """
+    geometry = (
+        "features.geometry" if generalized is None
+        else f"coalesce(features.{generalized}, features.geometry)"
+    )
+    attributes = ", ".join(
+        ["features.id"]
+        + [f"features.{column}" for column in PROPERTY_COLUMNS]
+        + [f"{_sql_json_timestamp(column)} AS {column}" for column in AUDIT_COLUMNS]
+    )
+    return (
+        "WITH envelope AS (SELECT ST_TileEnvelope(:z, :x, :y) AS tile, "
+        "ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => :margin), 4326) AS query) "
+        "SELECT ST_AsMVT(layer, 'features', :extent, 'geom') FROM ("
+        f"SELECT ST_AsMVTGeom(ST_Transform({geometry}, 3857), envelope.tile, "
+        f":extent, :buffer, true) AS geom, {attributes} "
+        "FROM features, envelope WHERE features.geometry && envelope.query"
+        ") AS layer WHERE layer.geom IS NOT NULL"
+    )
+
+
+def binary_rows_query(
+    generalized: Optional[str] = None,
+    *,
+    fields: Optional[Sequence[str]] = None,
+) -> Select:
+    """geojson_query's content as flat columns for PostGIS's binary encoders.
+
+    Scalar columns and API-form timestamps become attributes; the JSONB
+    extras travel as one JSON-text ``extra_properties`` attribute because
+    the binary formats have no nested values.
+    """
+    columns, audit, extras = _projected(fields)
+    return select(
+        Feature.id,
+        *(getattr(Feature, column) for column in columns),
+        *(literal_column(_sql_json_timestamp(column)).label(column) for column in audit),
+        *((cast(Feature.properties, Text).label("extra_properties"),) if extras else ()),
+        _output_geometry(generalized).label("geom"),
+    )
+
+
+def binary_collection_query(rows: Select, media_type: str) -> Select:
+    """One FlatGeobuf (with its packed R-tree index) or Geobuf value for all
+    of a filtered and limited binary_rows_query()."""
+    return select(literal_column(_BINARY_ENCODERS[media_type])).select_from(
+        rows.subquery("layer")
+    )
+
+
+def row_to_geojson(row) -> GeoJSONFeature:
+    geometry = json.loads(row.geometry_json) if row.geometry_json else None
+    return GeoJSONFeature(id=row.id, geometry=geometry, properties=_geojson_properties(row))
+
+
+def row_to_geojson_json(row) -> bytes:
+    """Encode the same Feature as row_to_geojson without building a model.
+
+    pydantic_core's encoder is the one the response model uses, so datetimes
+    and non-ASCII text come out byte-identical to the non-streamed response.
+    """
     geometry = json.loads(row.geometry_json) if row.geometry_json else None
-    return GeoJSONFeature(id=row.id, geometry=geometry, properties=properties)
+    return to_json({
+        "type": "Feature",
+        "id": row.id,
+        "geometry": geometry,
+        "properties": _geojson_properties(row),
+    })
+
+
+async def feature_collection_chunks(
+    partitions: AsyncIterator[Sequence[Any]],
+    encode: Callable[[Any], bytes] = row_to_geojson_json,
+) -> AsyncIterator[bytes]:
+    """Yield a FeatureCollection one row partition at a time."""
+    yield COLLECTION_PREFIX
+    separator = b""
+    async for rows in partitions:
+        if not rows:
+            continue
+        yield separator + b",".join(encode(row) for row in rows)
+        separator = b","
+    yield COLLECTION_SUFFIX
+
+
+def cluster_to_geojson_json(row) -> bytes:
+    """One feature_point_cells grid cell (migration 019) as a Point Feature
+    at the mean of its points, carrying the total and per-type counts."""
+    return to_json({
+        "type": "Feature",
+        "id": row.id,
+        "geometry": {"type": "Point", "coordinates": [row.lon, row.lat]},
+        "properties": {
+            "count": row.count,
+            "counts": dict(zip(row.feature_types, row.counts)),
+        },
+    })
+
+
+def collection_bytes(features: Sequence[bytes], **members: Any) -> bytes:
+    """A FeatureCollection around encoded Features, plus foreign members
+    (RFC 7946 §6.1) such as a page's continuation cursor."""
+    body = COLLECTION_PREFIX + b",".join(features)
+    if not members:
+        return body + COLLECTION_SUFFIX
+    return body + b"]," + to_json(members)[1:]
 
 
 def feature_response(feature: Feature, geometry: Optional[Dict[str, Any]]) -> FeatureResponse:
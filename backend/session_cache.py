@@ -0,0 +1,116 @@
+"""Per-worker cache of session tokens resolved to active-user snapshots.
+
+Every authenticated request used to decode its JWT and read its users row.
+A cached entry skips both for AUTH_SESSION_CACHE_TTL_S at most, and never
+beyond the token's own expiry. Invalidation is keyed by the users
+``auth_revision`` stamp of migration 022: an update evicts the user's
+sessions in the worker that made it right away, and in every other worker
+when the 'user_auth' notification arrives. Sessions are cached only while
+that notification can arrive, i.e. while the change-event connection
+LISTENs. A lookup that read a revision older than one already announced is
+not cached, so a lookup racing a deactivation cannot re-insert the old state.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from config import AUTH_SESSION_CACHE_MAX_ENTRIES, AUTH_SESSION_CACHE_TTL_S
+from models import User
+
+# Columns copied into a snapshot; never the password hash.
+SNAPSHOT_COLUMNS = ("id", "username", "is_admin", "is_active", "created_at", "auth_revision")
+
+
+@dataclass
+class _Session:
+    user: User
+    expires_at: float
+
+
+def user_snapshot(user: User) -> User:
+    """A detached, transient copy of ``user`` safe to share across requests."""
+    return User(**{column: getattr(user, column) for column in SNAPSHOT_COLUMNS})
+
+
+class SessionCache:
+    def __init__(
+        self,
+        max_entries: int = AUTH_SESSION_CACHE_MAX_ENTRIES,
+        ttl_s: float = AUTH_SESSION_CACHE_TTL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        # Newest auth_revision announced per user id.
+        self._revisions: dict[int, int] = {}
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[User]:
+        session = self._sessions.get(token)
+        if session is None or session.expires_at <= self._clock():
+            if session is not None:
+                del self._sessions[token]
+            self.misses += 1
+            return None
+        self._sessions.move_to_end(token)
+        self.hits += 1
+        return session.user
+
+    def put(self, token: str, user: User, token_expires_in_s: float) -> None:
+        if not self.listening or self.max_entries <= 0 or self.ttl_s <= 0:
+            return
+        if user.auth_revision < self._revisions.get(user.id, 0):
+            return
+        self._sessions[token] = _Session(
+            user_snapshot(user),
+            self._clock() + min(self.ttl_s, token_expires_in_s),
+        )
+        self._sessions.move_to_end(token)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def invalidate_user(self, user_id: int, revision: Optional[int] = None) -> None:
+        if revision is not None:
+            self._revisions[user_id] = max(revision, self._revisions.get(user_id, 0))
+        stale = [
+            token for token, session in self._sessions.items()
+            if session.user.id == user_id
+            and (revision is None or session.user.auth_revision < revision)
+        ]
+        for token in stale:
+            del self._sessions[token]
+        self.invalidations += 1
+
+    def on_notification(self, payload: str) -> None:
+        """Handle a 'user_auth' NOTIFY payload, ``"<user id>:<auth_revision>"``."""
+        user_id, revision = (int(part) for part in payload.split(":"))
+        self.invalidate_user(user_id, revision)
+
+    def on_listening(self, listening: bool) -> None:
+        """Notifications started or stopped reaching this worker; anything
+        cached before may have missed one."""
+        self.listening = listening
+        self._sessions.clear()
+        self._revisions.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "listening": self.listening,
+            "entries": len(self._sessions),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+session_cache = SessionCache()
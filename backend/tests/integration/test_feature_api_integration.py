@@ -4,6 +4,7 @@ The normal unit suite skips this module. scripts/test-backend-integration.sh
 creates an isolated migrated database and enables it explicitly.
 """
 import asyncio
+import json
 import os
 
 import httpx
@@ -24,7 +25,7 @@ async def _create_user():
     async with async_session() as db:
         user = User(
             username="integration-editor",
-            password_hash=hash_password("integration-password"),
+            password_hash=await hash_password("integration-password"),
             is_admin=True,
         )
         db.add(user)
@@ -179,6 +180,232 @@ async def _exercise_road_span_transaction(client):
     assert restored["geometry"] == full_geometry
 
 
+async def _exercise_feature_batch(client):
+    kept = (await client.post("/features", json=_point_payload("Batch kept"))).json()
+    doomed = (await client.post("/features", json=_point_payload("Batch doomed"))).json()
+    before = (await client.get("/features/version")).json()["revision"]
+
+    stale = await client.post("/features/batch", json={"operations": [
+        {"op": "create", "feature": _point_payload("Never created")},
+        {"op": "delete", "id": doomed["id"], "if_match": '"2000-01-01T00:00:00+00:00"'},
+    ]})
+    assert stale.status_code == 409, stale.text
+    assert [result["status"] for result in stale.json()["results"]] == ["not_applied", "failed"]
+    assert stale.json()["detail"] == "feature_changed"
+    assert (await client.get("/features/version")).json()["revision"] == before
+
+    applied = await client.post("/features/batch", json={"operations": [
+        {"op": "create", "feature": _point_payload("Batch created")},
+        {
+            "op": "update",
+            "id": kept["id"],
+            "if_match": f'"{kept["updated_at"]}"',
+            "feature": {"name": "Batch renamed"},
+        },
+        {"op": "delete", "id": doomed["id"], "if_match": f'"{doomed["updated_at"]}"'},
+    ]})
+    assert applied.status_code == 200, applied.text
+    body = applied.json()
+    assert body["committed"]
+    assert [result["status"] for result in body["results"]] == ["created", "updated", "deleted"]
+    assert body["results"][1]["feature"]["name"] == "Batch renamed"
+    assert body["results"][1]["feature"]["updated_at"] != kept["updated_at"]
+    # Three statements, one transaction: one revision (migration 021).
+    after = (await client.get("/features/version")).json()["revision"]
+    assert after == before + 1
+    delta = (await client.get("/features/changes", params={"since": before})).json()
+    assert delta["deleted"] == [doomed["id"]]
+    assert {feature["id"] for feature in delta["features"]} == {
+        kept["id"], body["results"][0]["id"],
+    }
+    for result in body["results"][:2]:
+        await client.delete(
+            f"/features/{result['id']}",
+            headers={"If-Match": f'"{result["feature"]["updated_at"]}"'},
+        )
+
+
+async def _exercise_feature_reads(client):
+    created_response = await client.post("/features", json=_point_payload("Read point"))
+    assert created_response.status_code == 201, created_response.text
+
+    buffered = await client.get("/features")
+    streamed = await client.get("/features", params={"stream": "true"})
+    assert streamed.status_code == 200, streamed.text
+    assert streamed.content == buffered.content
+
+    walked, cursor = [], None
+    while True:
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/features/page", params=params)).json()
+        walked.extend(feature["id"] for feature in page["features"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert walked == sorted(feature["id"] for feature in buffered.json()["features"])
+    assert (await client.get("/features/page", params={"cursor": "bogus"})).status_code == 422
+
+    flatgeobuf = await client.get("/features", headers={"Accept": "application/flatgeobuf"})
+    assert flatgeobuf.headers["content-type"] == "application/flatgeobuf"
+    assert flatgeobuf.content[:3] == b"fgb"
+    geobuf = await client.get("/features", params={"format": "geobuf", "bbox": "69.1,41.2,69.3,41.4"})
+    assert geobuf.headers["content-type"] == "application/geobuf"
+    assert geobuf.content and geobuf.headers["ETag"] != flatgeobuf.headers["ETag"]
+    assert (await client.get("/features", params={"format": "kml"})).status_code == 422
+
+    projected = await client.get("/features", params={"fields": "name", "precision": 3})
+    assert projected.status_code == 200, projected.text
+    projected_feature = next(
+        feature for feature in projected.json()["features"]
+        if feature["id"] == created_response.json()["id"]
+    )
+    assert projected_feature["properties"] == {"name": "Read point"}
+    assert all(
+        len(str(coordinate).split(".")[-1]) <= 3
+        for coordinate in projected_feature["geometry"]["coordinates"]
+    )
+    assert (await client.get("/features", params={"fields": "geometry"})).status_code == 422
+
+    batch = await client.post(
+        "/features/batch-get", json={"ids": [2**31 - 1, created_response.json()["id"]]},
+    )
+    assert batch.status_code == 200, batch.text
+    assert [feature["id"] for feature in batch.json()["features"]] == [created_response.json()["id"]]
+    assert batch.json()["missing"] == [2**31 - 1]
+    assert (await client.post("/features/batch-get", json={"ids": []})).status_code == 422
+
+    for params in ({"q": "re"}, {"q": "REad  po", "mode": "prefix"}, {"q": "read pont"}):
+        found = (await client.get("/features/search", params=params)).json()["features"]
+        assert created_response.json()["id"] in [feature["id"] for feature in found], params
+    biased = {"q": "read point", "bbox": "69.1,41.2,69.3,41.4"}
+    assert (await client.get("/features/search", params=biased)).headers["X-Cache"] == "MISS"
+    assert (await client.get("/features/search", params=biased)).headers["X-Cache"] == "HIT"
+    assert (await client.get("/features/search", params={"q": "x", "mode": "fuzzy"})).status_code == 422
+
+    from database import async_session
+    from serializers import (
+        collection_bytes,
+        geojson_query,
+        geojson_text_collection_query,
+        geojson_text_query,
+        row_to_geojson_json,
+    )
+    from sqlalchemy import text
+
+    for shape in (
+        {},
+        {"fields": ("name", "updated_at", "properties"), "precision": 5},
+        {"generalized": "geometry_z9"},
+    ):
+        async with async_session() as db:
+            python_rows = (await db.execute(geojson_query(**shape))).all()
+            sql_rows = (await db.execute(geojson_text_query(**shape))).all()
+        python_features = {row.id: row_to_geojson_json(row) for row in python_rows}
+        sql_features = [row.feature_json.encode() for row in sql_rows]
+        assert {
+            json.loads(feature)["id"]: feature for feature in sql_features
+        } == python_features, shape
+        async with async_session() as db:
+            collection = await db.scalar(
+                geojson_text_collection_query(geojson_text_query(**shape))
+            )
+        assert collection.encode() == collection_bytes(sql_features), shape
+
+    etag = buffered.headers["ETag"]
+    unchanged = await client.get("/features", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+    viewport = await client.get(
+        "/features",
+        params={"bbox": "69.1,41.2,69.3,41.4"},
+        headers={"If-None-Match": etag},
+    )
+    assert viewport.status_code == 200
+    assert viewport.headers["ETag"] != etag
+    cached_viewport = await client.get("/features", params={"bbox": "69.1,41.2,69.3,41.4"})
+    assert cached_viewport.headers["X-Cache"] == "HIT"
+    assert cached_viewport.content == viewport.content
+
+    road = (await client.post("/features", json=_road_payload())).json()
+    road_bbox = {"bbox": "69.19,41.29,69.21,41.31"}
+
+    def road_coordinates(response):
+        features = {feature["id"]: feature for feature in response.json()["features"]}
+        return features[road["id"]]["geometry"]["coordinates"]
+
+    low_zoom = await client.get("/features", params={**road_bbox, "zoom": 5})
+    full = await client.get("/features", params={**road_bbox, "zoom": 15})
+    assert road_coordinates(low_zoom) == [[69.2, 41.3], [69.202, 41.3]]
+    assert len(road_coordinates(full)) == 3
+    assert low_zoom.headers["ETag"] != full.headers["ETag"]
+
+    meta = await client.get("/meta")
+    assert (await client.get(
+        "/meta", headers={"If-None-Match": meta.headers["ETag"]},
+    )).status_code == 304
+    from tile_cache import tile_range
+
+    x, _, y, _ = tile_range((69.20, 41.30, 69.20, 41.30), 14, margin=0)
+    edited_tile, far_tile = f"/tiles/editor/14/{x}/{y}", "/tiles/editor/14/0/0"
+    assert (await client.get(edited_tile)).headers["X-Cache"] == "MISS"
+    assert (await client.get(far_tile)).status_code == 204
+    tile = await client.get(edited_tile)
+    assert tile.status_code == 200
+    assert tile.headers["X-Cache"] == "HIT"
+
+    before = (await client.get("/features/version")).json()["revision"]
+    second = (await client.post("/features", json=_point_payload("Second read point"))).json()
+    assert (await client.get(edited_tile)).headers["X-Cache"] == "MISS"
+    assert (await client.get(far_tile)).headers["X-Cache"] == "HIT"
+    changed = await client.get("/features", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    delta = (await client.get("/features/changes", params={"since": before})).json()
+    assert not delta["full_reload"]
+    assert [feature["id"] for feature in delta["features"]] == [second["id"]]
+    await client.delete(
+        f"/features/{second['id']}",
+        headers={"If-Match": f'"{second["updated_at"]}"'},
+    )
+    delta = (await client.get("/features/changes", params={"since": before})).json()
+    assert delta["features"] == []
+    assert delta["deleted"] == [second["id"]]
+    ahead = await client.get("/features/changes", params={"since": delta["revision"] + 1})
+    assert ahead.json()["full_reload"]
+
+    async with async_session() as db:
+        scanned = {
+            (row[0], row[1]): row[2]
+            for row in (await db.execute(text(
+                "SELECT feature_type, source_kind, count(*) FROM features GROUP BY 1, 2"
+            ))).all()
+        }
+    meta = (await client.get("/meta")).json()
+    maintained = {
+        (entry["feature_type"], entry["source_kind"]): entry["count"]
+        for entry in meta["counts"]
+    }
+    assert maintained == scanned
+    assert meta["feature_count"] == sum(scanned.values())
+
+    clusters_params = {"bbox": "69.1,41.2,69.3,41.4", "zoom": 6, "types": "point"}
+    clusters = (await client.get("/features/clusters", params=clusters_params)).json()
+    assert sum(cell["properties"]["count"] for cell in clusters["features"]) >= 1
+    moved = await client.put(
+        f"/features/{created_response.json()['id']}",
+        json={"geometry": {"type": "Point", "coordinates": [60.0, 40.0]}},
+        headers={"If-Match": f'"{created_response.json()["updated_at"]}"'},
+    )
+    assert moved.status_code == 200, moved.text
+    after = (await client.get("/features/clusters", params=clusters_params)).json()
+    assert sum(cell["properties"]["count"] for cell in after["features"]) == (
+        sum(cell["properties"]["count"] for cell in clusters["features"]) - 1
+    )
+    wrong_type = await client.get("/features/clusters", params={**clusters_params, "types": "road"})
+    assert wrong_type.status_code == 422
+
+
 async def _exercise_job_ownership():
     import bulk_load
     import road_network_builder
@@ -225,6 +452,8 @@ async def _run_scenarios():
         assert health.json()["database"] == "ready"
         await _exercise_feature_concurrency(client)
         await _exercise_road_span_transaction(client)
+        await _exercise_feature_batch(client)
+        await _exercise_feature_reads(client)
         await _exercise_job_ownership()
 
 
@@ -0,0 +1,22 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import bulk_load
+from schemas import FeatureCount
+
+
+def test_summary_counts_keep_untyped_imports_under_their_own_key(monkeypatch):
+    @asynccontextmanager
+    async def session():
+        yield None
+
+    async def counts(_db):
+        return [
+            FeatureCount(feature_type="building", source_kind="osm_import", count=7),
+            FeatureCount(feature_type=None, source_kind="osm_import", count=2),
+            FeatureCount(feature_type="road", source_kind="manual", count=4),
+        ]
+
+    monkeypatch.setattr(bulk_load, "async_session", session)
+    monkeypatch.setattr(bulk_load, "feature_counts", counts)
+    assert asyncio.run(bulk_load._counts()) == {"building": 7, "untyped": 2}
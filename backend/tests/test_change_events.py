@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+from change_events import (
+    KEEPALIVE,
+    RETRY,
+    ChangeBroadcaster,
+    decode_notification,
+    event_stream,
+    sse_message,
+)
+from session_cache import SessionCache
+from test_session_cache import _user
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.listeners = {}
+        self.closed = False
+        self.on_terminate = None
+
+    def add_termination_listener(self, callback):
+        self.on_terminate = callback
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    def notify(self, channel, payload):
+        self.listeners[channel](self, 1, channel, payload)
+
+    def is_closed(self):
+        return self.closed
+
+    async def fetchval(self, _sql):
+        return 1
+
+    async def close(self):
+        self.closed = True
+        if self.on_terminate:
+            self.on_terminate(self)
+
+
+def _broadcaster(connections, revision=7):
+    async def connect():
+        connection = _FakeConnection()
+        connections.append(connection)
+        return connection
+
+    async def snapshot(_connection):
+        return {"features": {"revision": revision}}
+
+    return ChangeBroadcaster(
+        connect=connect, snapshot=snapshot, health_interval=60, min_backoff=0.01,
+    )
+
+
+def test_sse_message_is_one_compact_event_block():
+    assert sse_message("features", {"revision": 3}) == (
+        b'event: features\ndata: {"revision":3}\n\n'
+    )
+
+
+def test_decode_notification_maps_channels_to_events():
+    assert decode_notification("feature_stat", "12") == ("features", {"revision": 12})
+    payload = json.dumps({"status": "running", "progress": 40})
+    assert decode_notification("road_network_state", payload) == (
+        "road_network", {"status": "running", "progress": 40},
+    )
+    assert decode_notification("other", "x") is None
+
+
+def test_one_connection_fans_out_and_coalesces_to_latest():
+    async def scenario():
+        connections = []
+        broadcaster = _broadcaster(connections)
+        first = broadcaster.subscribe()
+        second = broadcaster.subscribe()
+        assert await first.next(1) == [("features", {"revision": 7})]
+        assert await second.next(1) == [("features", {"revision": 7})]
+
+        connections[0].notify("feature_stat", "8")
+        connections[0].notify("feature_stat", "9")
+        connections[0].notify("feature_stat", "not-a-number")
+        assert await first.next(1) == [("features", {"revision": 9})]
+        assert await second.next(1) == [("features", {"revision": 9})]
+        assert len(connections) == 1
+
+        late = broadcaster.subscribe()
+        assert await late.next(1) == [("features", {"revision": 9})]
+        await broadcaster.close()
+
+    asyncio.run(scenario())
+
+
+def test_last_unsubscribe_closes_and_lost_connection_reconnects():
+    async def scenario():
+        connections = []
+        broadcaster = _broadcaster(connections)
+        subscription = broadcaster.subscribe()
+        await subscription.next(1)
+
+        await connections[0].close()
+        await subscription.next(0.1)
+        assert len(connections) == 2
+
+        broadcaster.unsubscribe(subscription)
+        for _ in range(20):
+            if connections[1].closed:
+                break
+            await asyncio.sleep(0)
+        assert connections[1].closed
+        assert broadcaster.subscriber_count == 0
+        await broadcaster.close()
+
+    asyncio.run(scenario())
+
+
+def test_flapping_connection_backs_off_between_reconnects():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        connected_at = []
+
+        async def connect():
+            connected_at.append(loop.time())
+            return _FakeConnection()
+
+        async def snapshot(connection):
+            # The database drops the connection as soon as LISTEN is set up.
+            await connection.close()
+            return {}
+
+        broadcaster = ChangeBroadcaster(
+            connect=connect, snapshot=snapshot, health_interval=60, min_backoff=0.05,
+        )
+        broadcaster.subscribe()
+        while len(connected_at) < 4:
+            await asyncio.sleep(0.01)
+        await broadcaster.close()
+
+        gaps = [later - earlier for earlier, later in zip(connected_at, connected_at[1:])]
+        assert all(gap >= expected * 0.9 for gap, expected in zip(gaps, (0.05, 0.1, 0.2)))
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_sends_state_then_keepalive_and_unsubscribes():
+    async def scenario():
+        broadcaster = _broadcaster([])
+        stream = event_stream(broadcaster, keepalive=0.01)
+        assert await stream.__anext__() == RETRY
+        assert await stream.__anext__() == sse_message("features", {"revision": 7})
+        assert await stream.__anext__() == KEEPALIVE
+        await stream.aclose()
+        assert broadcaster.subscriber_count == 0
+        await broadcaster.close()
+
+    asyncio.run(scenario())
+
+
+def test_watched_channels_reach_their_handler_instead_of_subscribers():
+    async def scenario():
+        connections = []
+        payloads = []
+        listening = []
+        broadcaster = _broadcaster(connections)
+        broadcaster.watch("user_auth", payloads.append, listening.append)
+        subscription = broadcaster.subscribe()
+        await subscription.next(1)
+        assert listening == [True]
+
+        connections[0].notify("user_auth", "4:2")
+        assert payloads == ["4:2"]
+        assert await subscription.next(0.01) == []
+
+        await connections[0].close()
+        await subscription.next(0.1)
+        assert listening == [True, False, True]
+        await broadcaster.close()
+
+    asyncio.run(scenario())
+
+
+def test_watcher_listens_without_any_sse_subscriber():
+    async def scenario():
+        connections = []
+        broadcaster = _broadcaster(connections)
+        cache = SessionCache(ttl_s=30, max_entries=10)
+        broadcaster.watch("user_auth", cache.on_notification, cache.on_listening)
+        for _ in range(20):
+            if cache.listening:
+                break
+            await asyncio.sleep(0)
+        assert broadcaster.subscriber_count == 0
+        assert cache.listening and "user_auth" in connections[0].listeners
+
+        cache.put("token", _user(user_id=4, revision=1), token_expires_in_s=60)
+        assert cache.get("token") is not None
+
+        # The last SSE subscriber leaving does not stop the watcher.
+        subscription = broadcaster.subscribe()
+        broadcaster.unsubscribe(subscription)
+        await asyncio.sleep(0)
+        assert not connections[0].closed and len(connections) == 1
+
+        connections[0].notify("user_auth", "4:2")
+        assert cache.get("token") is None
+        await broadcaster.close()
+        assert not cache.listening
+
+    asyncio.run(scenario())
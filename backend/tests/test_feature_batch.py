@@ -0,0 +1,197 @@
+import asyncio
+import contextlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+import feature_batch_service as batches
+import feature_mutations as mutations
+from schemas import FeatureBatch
+
+VERSION = '"2026-07-23T10:00:00+00:00"'
+POINT = {"type": "Point", "coordinates": [69.2, 41.3]}
+
+
+class _UntouchedDatabase:
+    """Fails the test if the batch reads or writes before rejecting it."""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"database used: {name}")
+
+
+def _batch(*operations):
+    return FeatureBatch(operations=list(operations)).operations
+
+
+def test_operations_are_discriminated_by_op():
+    create, update, delete = _batch(
+        {"op": "create", "feature": {"geometry": POINT, "feature_type": "point"}},
+        {"op": "update", "id": 4, "if_match": VERSION, "feature": {"name": "Renamed"}},
+        {"op": "delete", "id": 5, "if_match": VERSION},
+    )
+    assert create.feature.feature_type == "point"
+    assert update.feature.model_dump(exclude_unset=True) == {"name": "Renamed"}
+    assert delete.confirm_published is False
+    with pytest.raises(ValidationError):
+        FeatureBatch(operations=[])
+    with pytest.raises(ValidationError):
+        FeatureBatch(operations=[{"op": "move", "id": 4}])
+
+
+def test_versions_and_duplicate_targets_fail_before_any_database_work():
+    duplicate = _batch(
+        {"op": "update", "id": 4, "if_match": VERSION, "feature": {"name": "A"}},
+        {"op": "delete", "id": 4, "if_match": VERSION},
+    )
+    with pytest.raises(batches.BatchOperationFailed) as failure:
+        asyncio.run(batches.apply_feature_batch(_UntouchedDatabase(), duplicate, None))
+    assert failure.value.index == 1
+    assert isinstance(failure.value.error, mutations.InvalidFeature)
+
+    unversioned = _batch({"op": "delete", "id": 4, "if_match": "yesterday"})
+    with pytest.raises(batches.BatchOperationFailed) as failure:
+        asyncio.run(batches.apply_feature_batch(_UntouchedDatabase(), unversioned, None))
+    assert failure.value.index == 0
+
+
+def test_failure_results_mark_the_failed_operation_and_roll_back_the_rest():
+    operations = _batch(
+        {"op": "create", "feature": {"geometry": POINT, "feature_type": "point"}},
+        {"op": "delete", "id": 5, "if_match": VERSION},
+    )
+    failure = batches.BatchOperationFailed(1, mutations.StaleFeature("feature_changed"))
+    results = batches.batch_failure_results(operations, failure)
+    assert [(result.id, result.status, result.detail) for result in results] == [
+        (None, "not_applied", None),
+        (5, "failed", "feature_changed"),
+    ]
+
+
+class _RecordingDatabase:
+    """Answers every read with ``rows`` and records each statement."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+        return _Rows(self.rows)
+
+    async def scalars(self, statement):
+        self.statements.append(str(statement))
+        return _Rows([row[0] for row in self.rows])
+
+
+class _Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+def test_batch_validation_lookups_are_prefetched_with_one_query_each():
+    operations = _batch(
+        {"op": "create", "feature": {"geometry": POINT, "feature_type": "business", "building_id": 7}},
+        {"op": "create", "feature": {"geometry": POINT, "feature_type": "business", "building_id": 8}},
+        {"op": "delete", "id": 5, "if_match": VERSION},
+        {"op": "delete", "id": 6, "if_match": VERSION},
+    )
+    locked = {
+        5: (mutations.Feature(id=5, feature_type="road"), None),
+        6: (mutations.Feature(id=6, feature_type="road"), None),
+    }
+    database = _RecordingDatabase([(7, "building"), (8, "point")])
+    prefetched = asyncio.run(batches._prefetch(database, operations, locked))
+    assert len(database.statements) == 2
+    assert all("ANY" in statement for statement in database.statements)
+    assert prefetched.building_types == {7: "building", 8: "point"}
+
+    prefetched = mutations.Prefetched({7: "building", 8: "point"}, {5})
+    user = mutations.User(id=1)
+    created = asyncio.run(mutations.new_feature(
+        _UntouchedDatabase(), operations[0].feature, user, prefetched,
+    ))
+    assert created.building_id == 7
+    with pytest.raises(mutations.InvalidFeature):
+        asyncio.run(mutations.new_feature(_UntouchedDatabase(), operations[1].feature, user, prefetched))
+    with pytest.raises(mutations.PublishedRoadConfirmationRequired):
+        asyncio.run(mutations.check_delete(
+            _UntouchedDatabase(), locked[5][0], confirm_published=False, prefetched=prefetched,
+        ))
+    asyncio.run(mutations.check_delete(
+        _UntouchedDatabase(), locked[6][0], confirm_published=False, prefetched=prefetched,
+    ))
+
+
+class _ScriptedDatabase:
+    """Answers reads with ``results`` in order and records every call."""
+
+    no_autoflush = contextlib.nullcontext()
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    async def execute(self, statement):
+        self.calls.append(str(statement).split()[0])
+        return _Rows(self.results.pop(0)) if self.calls[-1] == "SELECT" else None
+
+    def add(self, _feature):
+        self.calls.append("add")
+
+    def expunge(self, _feature):
+        self.calls.append("expunge")
+
+    async def flush(self):
+        self.calls.append("flush")
+
+    async def commit(self):
+        self.calls.append("commit")
+
+    async def rollback(self):
+        self.calls.append("rollback")
+
+
+def _locked_row(feature_id, feature_type, building_id=None):
+    version = mutations.parse_version_tag(VERSION)
+    feature = mutations.Feature(
+        id=feature_id, feature_type=feature_type, building_id=building_id,
+        source_kind="manual", properties={}, created_at=version, updated_at=version,
+    )
+    return SimpleNamespace(Feature=feature, geometry_json=json.dumps(POINT))
+
+
+def test_later_operations_see_a_building_deleted_earlier_in_the_batch():
+    operations = _batch(
+        {"op": "delete", "id": 7, "if_match": VERSION},
+        {"op": "create", "feature": {"geometry": POINT, "feature_type": "business", "building_id": 7}},
+    )
+    database = _ScriptedDatabase([_locked_row(7, "building")], [(7, "building")])
+    with pytest.raises(batches.BatchOperationFailed) as failure:
+        asyncio.run(batches.apply_feature_batch(database, operations, mutations.User(id=1)))
+    assert failure.value.index == 1
+    assert isinstance(failure.value.error, mutations.InvalidFeature)
+    assert database.calls == ["SELECT", "SELECT", "rollback"]
+
+
+def test_written_rows_are_read_back_before_the_commit():
+    operations = _batch(
+        {"op": "delete", "id": 7, "if_match": VERSION},
+        {"op": "update", "id": 9, "if_match": VERSION, "feature": {"name": "Renamed"}},
+    )
+    business = _locked_row(9, "business", building_id=7)
+    database = _ScriptedDatabase(
+        [_locked_row(7, "building"), business], [(7, "building")], [business],
+    )
+    results = asyncio.run(batches.apply_feature_batch(database, operations, mutations.User(id=1)))
+    assert database.calls == [
+        "SELECT", "SELECT", "flush", "expunge", "DELETE", "SELECT", "commit",
+    ]
+    assert [(result.id, result.status) for result in results] == [(7, "deleted"), (9, "updated")]
+    # As if the delete ran first: the link it clears does not fail the update.
+    assert results[1].feature.name == "Renamed"
+    assert results[1].feature.building_id is None
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import feature_mutations as mutations
+
+VERSION = datetime(2026, 7, 23, 10, 0, tzinfo=timezone.utc)
+
+
+class _NoRowsDatabase:
+    """An UPDATE whose version predicate matched nothing."""
+
+    async def execute(self, statement):
+        return self
+
+    def one_or_none(self):
+        return None
+
+
+def test_versioned_update_checks_the_version_and_returns_the_response_row():
+    sql = str(
+        mutations.versioned_update(7, VERSION, {"name": "Renamed", "updated_by": 3})
+        .compile(dialect=postgresql.dialect())
+    )
+    where = sql[sql.index(" WHERE "):sql.index(" RETURNING ")]
+    assert "features.id = " in where
+    assert "features.updated_at = " in where
+    returning = sql[sql.index(" RETURNING "):]
+    assert "ST_AsGeoJSON(features.geometry) AS geometry_json" in returning
+    assert "features.updated_at" in returning
+    # Generalized copies are trigger-maintained and never sent back.
+    assert "geometry_z9" not in returning
+
+
+def test_write_matching_no_row_is_a_stale_edit():
+    with pytest.raises(mutations.StaleFeature):
+        asyncio.run(mutations.write_feature(_NoRowsDatabase(), 7, VERSION, {"name": "Renamed"}))
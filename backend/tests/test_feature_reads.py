@@ -0,0 +1,282 @@
+from feature_reads import etag_matches, generalized_geometry, revision_etag
+
+
+def test_etag_depends_on_revision_and_normalized_scope():
+    etag = revision_etag(7, "features", (69.2, 41.29, 69.22, 41.31), 2000)
+    assert etag.startswith('W/"7-')
+    assert etag == revision_etag(7, "features", (69.2, 41.29, 69.22, 41.31), 2000)
+    assert etag != revision_etag(8, "features", (69.2, 41.29, 69.22, 41.31), 2000)
+    assert etag != revision_etag(7, "features", (69.2, 41.29, 69.22, 41.31), 4000)
+    assert etag != revision_etag(7, "features", None, 2000)
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = revision_etag(3, "meta", 50000)
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+
+
+def test_missing_or_different_validators_do_not_match():
+    etag = revision_etag(3, "meta", 50000)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+    assert not etag_matches(revision_etag(4, "meta", 50000), etag)
+
+
+def test_zoom_bands_select_generalized_geometry():
+    assert generalized_geometry(None) is None
+    assert generalized_geometry(0) == "geometry_z9"
+    assert generalized_geometry(9) == "geometry_z9"
+    assert generalized_geometry(10) == "geometry_z12"
+    assert generalized_geometry(12) == "geometry_z12"
+    assert generalized_geometry(13) is None
+
+
+def test_viewports_snap_outward_to_a_shared_grid():
+    from feature_reads import snap_bounds
+
+    first = snap_bounds((69.2011, 41.2903, 69.2189, 41.3097), 0.01)
+    second = snap_bounds((69.2049, 41.2951, 69.2151, 41.3049), 0.01)
+    assert first == second == (69.2, 41.29, 69.22, 41.31)
+
+
+def test_snapped_viewports_stay_within_coordinate_limits():
+    from feature_reads import snap_bounds
+
+    assert snap_bounds((-179.999, -89.999, 179.999, 89.999), 0.01) == (-180.0, -90.0, 180.0, 90.0)
+    assert snap_bounds((1.0, 2.0, 3.0, 4.0), 0) == (1.0, 2.0, 3.0, 4.0)
+
+
+class _Result(list):
+    def all(self):
+        return list(self)
+
+
+class _ScriptedDatabase:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    async def execute(self, statement, parameters=None):
+        self.calls.append((str(statement), parameters))
+        return _Result(self.results.pop(0))
+
+
+def _log_row(feature_id, deleted, revision=9, floor=2):
+    from types import SimpleNamespace
+
+    return SimpleNamespace(
+        revision=revision, change_log_floor=floor, feature_id=feature_id, deleted=deleted,
+    )
+
+
+def _feature_row(feature_id):
+    from types import SimpleNamespace
+
+    from serializers import AUDIT_COLUMNS, PROPERTY_COLUMNS
+
+    values = {column: None for column in (*PROPERTY_COLUMNS, *AUDIT_COLUMNS)}
+    return SimpleNamespace(
+        id=feature_id,
+        properties={},
+        geometry_json='{"type": "Point", "coordinates": [69.2, 41.3]}',
+        **values,
+    )
+
+
+def test_changes_return_upserted_rows_and_deleted_ids():
+    import asyncio
+
+    from feature_reads import feature_changes
+
+    database = _ScriptedDatabase(
+        [_log_row(4, False), _log_row(5, True), _log_row(6, False)],
+        [_feature_row(4)],
+    )
+    changes = asyncio.run(feature_changes(database, 5))
+    assert changes.revision == 9
+    assert not changes.full_reload
+    assert [feature.id for feature in changes.features] == [4]
+    # 6 was logged as upserted but is gone now: report it as deleted.
+    assert changes.deleted == [5, 6]
+    assert database.calls[0][1]["since"] == 5
+
+
+def test_changes_behind_the_compacted_floor_require_a_full_reload():
+    import asyncio
+
+    from feature_reads import feature_changes
+
+    database = _ScriptedDatabase([_log_row(4, False, floor=7)])
+    changes = asyncio.run(feature_changes(database, 5))
+    assert changes.full_reload
+    assert changes.features == [] and changes.deleted == []
+    assert len(database.calls) == 1
+
+
+def test_changes_at_the_current_revision_are_empty():
+    import asyncio
+
+    from feature_reads import feature_changes
+
+    database = _ScriptedDatabase([_log_row(None, None, revision=9)])
+    changes = asyncio.run(feature_changes(database, 9))
+    assert not changes.full_reload
+    assert changes.features == [] and changes.deleted == []
+
+
+def test_counts_come_from_the_maintained_table():
+    import asyncio
+
+    from feature_reads import feature_counts
+
+    database = _ScriptedDatabase([("building", "osm_import", 120), (None, "manual", 3)])
+    counts = asyncio.run(feature_counts(database))
+
+    assert [(entry.feature_type, entry.source_kind, entry.count) for entry in counts] == [
+        ("building", "osm_import", 120),
+        (None, "manual", 3),
+    ]
+    sql = database.calls[0][0]
+    assert "FROM feature_counts" in sql
+    assert "FROM features" not in sql
+
+
+def test_page_cursors_round_trip_and_reject_tampering():
+    import pytest
+
+    from feature_reads import PageCursor, decode_page_cursor, encode_page_cursor
+
+    cursor = PageCursor(after_id=120, revision=7, bounds=(69.1, 41.2, 69.3, 41.4))
+    assert decode_page_cursor(encode_page_cursor(cursor)) == cursor
+    unbounded = PageCursor(after_id=5, revision=2)
+    assert decode_page_cursor(encode_page_cursor(unbounded)) == unbounded
+    for token in ("", "not-a-cursor", encode_page_cursor(cursor)[:-3]):
+        with pytest.raises(ValueError):
+            decode_page_cursor(token)
+
+
+def test_pages_are_keyset_ordered_without_offset():
+    from feature_reads import PageCursor, page_query
+    from serializers import geojson_query
+
+    sql = str(page_query(geojson_query(), PageCursor(after_id=10, revision=1), 50)).upper()
+    assert "FEATURES.ID > " in sql
+    assert "ORDER BY FEATURES.ID" in sql
+    assert "OFFSET" not in sql
+
+
+def test_a_full_page_links_to_the_next_one():
+    import asyncio
+    import json
+    from types import SimpleNamespace
+
+    from feature_reads import PageCursor, decode_page_cursor, feature_page
+
+    def page_row(feature_id):
+        return SimpleNamespace(**vars(_feature_row(feature_id)), page_id=feature_id)
+
+    cursor = PageCursor(after_id=0, revision=4)
+    database = _ScriptedDatabase([page_row(1), page_row(2), page_row(3)])
+    page = json.loads(asyncio.run(feature_page(database, None, cursor, 2)))
+    assert [feature["id"] for feature in page["features"]] == [1, 2]
+    assert page["revision"] == 4
+    assert decode_page_cursor(page["next_cursor"]) == PageCursor(after_id=2, revision=4)
+
+    database = _ScriptedDatabase([page_row(3)])
+    last = json.loads(asyncio.run(feature_page(database, None, cursor, 2)))
+    assert last["next_cursor"] is None
+    assert last["type"] == "FeatureCollection"
+
+
+def test_collection_encoding_is_negotiated_from_accept_or_format():
+    import pytest
+
+    from feature_reads import negotiate_media_type
+
+    assert negotiate_media_type(None) == "application/json"
+    assert negotiate_media_type("*/*") == "application/json"
+    assert negotiate_media_type("application/flatgeobuf") == "application/flatgeobuf"
+    assert negotiate_media_type(
+        "text/html, application/geobuf;q=0.9, application/json;q=0.5"
+    ) == "application/geobuf"
+    assert negotiate_media_type("application/geo+json") == "application/json"
+    assert negotiate_media_type("application/json", "flatgeobuf") == "application/flatgeobuf"
+    # q-values decide, not listing order, and q=0 refuses a type.
+    assert negotiate_media_type("application/flatgeobuf;q=0, application/json") == "application/json"
+    assert negotiate_media_type(
+        "application/geobuf;q=0.1, application/flatgeobuf"
+    ) == "application/flatgeobuf"
+    assert negotiate_media_type("application/geobuf; q=0.5, application/flatgeobuf;q=0.5") == (
+        "application/geobuf"
+    )
+    assert negotiate_media_type("application/flatgeobuf;q=0") == "application/json"
+    with pytest.raises(ValueError):
+        negotiate_media_type(None, "shapefile")
+
+
+def test_fields_parse_to_canonical_order_and_reject_unknown_names():
+    import pytest
+
+    from feature_reads import parse_fields
+
+    assert parse_fields(None) is None
+    assert parse_fields("icon, name") == parse_fields("name,icon") == ("name", "icon")
+    assert parse_fields("properties,updated_at") == ("updated_at", "properties")
+    for value in ("", " , ", "name,geometry"):
+        with pytest.raises(ValueError):
+            parse_fields(value)
+
+
+def test_batch_reads_use_one_array_parameter_in_request_order():
+    import asyncio
+    import json
+
+    from feature_reads import feature_batch
+
+    rows = [_feature_row(5), _feature_row(3)]
+    for row in rows:
+        row.batch_id = row.id
+    database = _ScriptedDatabase(rows)
+    body = json.loads(asyncio.run(feature_batch(database, [5, 3, 5, 9])))
+    assert "= ANY (" in database.calls[0][0]
+    assert "array_position(" in database.calls[0][0]
+    assert [feature["id"] for feature in body["features"]] == [5, 3]
+    assert body["missing"] == [9]
+
+
+def test_an_empty_binary_viewport_is_204_not_an_empty_file(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import features_api
+    from database import get_db
+    from response_cache import RevisionLRU
+
+    class EmptyLayer:
+        """Answers the revision read, then encodes no rows (NULL)."""
+
+        def __init__(self):
+            self.values = iter([987_654, None])
+
+        async def scalar(self, _statement):
+            return next(self.values)
+
+    async def empty_layer():
+        yield EmptyLayer()
+
+    app = FastAPI()
+    app.include_router(features_api.router)
+    app.dependency_overrides[get_db] = empty_layer
+    monkeypatch.setattr(features_api, "viewport_cache", RevisionLRU(1 << 20))
+    client = TestClient(app)
+    for media_type in ("application/flatgeobuf", "application/geobuf"):
+        empty = client.get(
+            "/features", params={"bbox": "69.2,41.29,69.22,41.31"}, headers={"Accept": media_type},
+        )
+        assert empty.status_code == 204
+        assert empty.content == b""
+        assert empty.headers["Vary"] == "Accept"
+        assert empty.headers["ETag"].startswith('W/"987654-')
@@ -0,0 +1,32 @@
+from feature_search import MAX_BIASED_CANDIDATES, resolve_mode, search_query
+
+
+def test_auto_mode_uses_prefix_below_trigram_length():
+    assert resolve_mode("ch", "auto") == "prefix"
+    assert resolve_mode("cho", "auto") == "ranked"
+    assert resolve_mode("ch", "ranked") == "ranked"
+    assert resolve_mode("chorsu", "prefix") == "prefix"
+
+
+def test_prefix_search_is_an_ordered_range_over_the_normalized_key():
+    sql = str(search_query("Ch", "prefix", 8))
+    key = 'feature_search_key(features.name) COLLATE "C"'
+    assert f"({key}) >= feature_search_key(" in sql
+    assert f"({key}) < (feature_search_key(" in sql
+    assert f"ORDER BY {key}" in sql
+    assert "ILIKE" not in sql.upper() and "length(" not in sql
+
+
+def test_ranked_search_orders_by_indexed_word_similarity_distance():
+    sql = str(search_query("Chorsu", "ranked", 8))
+    assert "features.name %> " in sql
+    assert "ORDER BY features.name <->> " in sql
+
+
+def test_viewport_bias_reranks_a_bounded_candidate_set():
+    sql = str(search_query("Chorsu", "ranked", 50, (69.1, 41.2, 69.3, 41.4))).upper()
+    # The window over every match would defeat the index-ordered LIMIT.
+    assert "OVER" not in sql
+    assert "ORDER BY CANDIDATES.IN_VIEW DESC, CANDIDATES.SEARCH_RANK" in sql
+    compiled = search_query("Chorsu", "ranked", 50, (69.1, 41.2, 69.3, 41.4)).compile()
+    assert MAX_BIASED_CANDIDATES in compiled.params.values()
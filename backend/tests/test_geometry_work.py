@@ -0,0 +1,62 @@
+import asyncio
+import pickle
+import threading
+
+import pytest
+
+import feature_mutations
+import geometry_work
+from feature_domain import ValidGeometry, validate_geometry_mapping
+from schemas import FeatureCreate
+
+
+def _ring(vertices):
+    step = 1.0 / vertices
+    points = [[69.0 + index * step, 41.0] for index in range(vertices)]
+    return points + [[69.5, 41.5], [69.0, 41.0]]
+
+
+POLYGON = {"type": "Polygon", "coordinates": [_ring(100)]}
+
+
+def _thread_name(geometry):
+    return threading.current_thread().name
+
+
+@pytest.fixture
+def offload_above_50(monkeypatch):
+    monkeypatch.setattr(geometry_work, "GEOMETRY_OFFLOAD_MIN_VERTICES", 50)
+    monkeypatch.setattr(geometry_work, "timings", geometry_work.GeometryTimings())
+    yield
+    geometry_work.close()
+
+
+def test_small_geometries_run_inline_and_large_ones_on_the_pool(offload_above_50):
+    small = {"type": "Point", "coordinates": [69.2, 41.3]}
+    assert asyncio.run(geometry_work.run(_thread_name, small, vertices=1)) == (
+        threading.current_thread().name
+    )
+    assert asyncio.run(geometry_work.run(_thread_name, POLYGON, vertices=102)).startswith("geometry")
+    timing = geometry_work.stats()["functions"]["_thread_name"]
+    assert (timing["calls"], timing["offloaded"]) == (2, 1)
+
+
+def test_schemas_defer_large_geometries_to_the_write_path(offload_above_50):
+    feature = FeatureCreate(geometry=POLYGON, feature_type="building")
+    assert not isinstance(feature.geometry, ValidGeometry)
+    asyncio.run(feature_mutations.geometry_value(feature.geometry, feature.feature_type))
+    assert geometry_work.stats()["functions"]["validated_geometry"]["offloaded"] == 1
+
+    invalid = {"type": "Polygon", "coordinates": [_ring(100)[:-1] + [[69.0, 41.0]]]}
+    invalid["coordinates"][0].insert(50, [69.9, 40.0])
+    invalid["coordinates"][0].insert(51, [69.1, 42.0])
+    deferred = FeatureCreate(geometry=invalid, feature_type="building")
+    with pytest.raises(feature_mutations.InvalidFeature, match="valid"):
+        asyncio.run(feature_mutations.geometry_value(deferred.geometry, deferred.feature_type))
+
+
+def test_parsed_geometries_survive_a_process_pool_round_trip():
+    valid = pickle.loads(pickle.dumps(validate_geometry_mapping(POLYGON)))
+    assert isinstance(valid, ValidGeometry)
+    assert valid == POLYGON
+    assert valid.bounds == (69.0, 41.0, 69.99, 41.5)
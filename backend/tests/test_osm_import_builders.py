@@ -3,6 +3,7 @@ from types import SimpleNamespace
 
 from osm_import import (
     IMPORT_KINDS,
+    UPSERT_CHUNK_SIZE,
     _REPLACEABLE_ATTRIBUTES,
     _build_candidates,
     _can_refresh_from_osm,
@@ -100,13 +101,21 @@ def test_run_import_preserves_a_manual_osm_road(monkeypatch):
         def add(_feature):
             raise AssertionError("the existing local override must not be inserted again")
 
+        @staticmethod
+        async def flush():
+            pass
+
+        @staticmethod
+        def expunge_all():
+            pass
+
         async def commit(self):
             self.committed = True
 
-    async def fetched(_query):
-        return {"elements": [way({"highway": "pedestrian"})]}
+    async def streamed(_query, bypass_cache=False):
+        yield way({"highway": "pedestrian"})
 
-    monkeypatch.setattr("osm_import.fetch_overpass", fetched)
+    monkeypatch.setattr("osm_import.stream_overpass", streamed)
     database = Database()
     result = asyncio.run(run_import(IMPORT_KINDS["roads"], BOUNDS, database))
 
@@ -140,3 +149,49 @@ def test_malformed_element_is_skipped_not_fatal():
 def test_queries_embed_bounds():
     for kind in IMPORT_KINDS.values():
         assert BOUNDS.bbox in kind.query(BOUNDS)
+
+
+def test_run_import_holds_no_lock_while_the_response_downloads(monkeypatch):
+    events = []
+
+    class Result:
+        @staticmethod
+        def scalars():
+            return []
+
+    class Database:
+        @staticmethod
+        async def execute(query):
+            events.append("lock" if "advisory" in str(query) else "select")
+            return Result()
+
+        @staticmethod
+        def add(_feature):
+            pass
+
+        @staticmethod
+        async def flush():
+            pass
+
+        @staticmethod
+        def expunge_all():
+            pass
+
+        @staticmethod
+        async def commit():
+            events.append("commit")
+
+    async def streamed(_query, bypass_cache=False):
+        for osm_id in range(UPSERT_CHUNK_SIZE + 10):
+            events.append("read")
+            yield way({"highway": "residential"}, osm_id=osm_id)
+
+    monkeypatch.setattr("osm_import.stream_overpass", streamed)
+    result = asyncio.run(run_import(IMPORT_KINDS["roads"], BOUNDS, Database()))
+
+    assert result["roads_loaded"] == UPSERT_CHUNK_SIZE + 10
+    transactions = [event for event in events if event != "read"]
+    assert transactions == ["lock", "select", "commit"] * 2
+    # Every lock is released before the next element is read.
+    assert "read" not in events[events.index("lock"):events.index("commit")]
+    assert events[-3:] == ["lock", "select", "commit"]
@@ -0,0 +1,54 @@
+import gzip
+import os
+import time
+
+from overpass_cache import OverpassCache, normalize_query, query_key
+
+
+def _body(text: str) -> bytes:
+    return gzip.compress(text.encode())
+
+
+def test_query_key_ignores_whitespace_outside_strings():
+    assert normalize_query(' [out:json];\n(way["highway"]( 1,2 ,3,4 );\n);out geom; ') == (
+        '[out:json]; (way["highway"]( 1,2 ,3,4 ); );out geom;'
+    )
+    assert query_key("way(1,2,3,4);  out;") == query_key("way(1,2,3,4);\nout;")
+    assert query_key('way["name"="a  b"];') != query_key('way["name"="a b"];')
+    assert query_key("way(1,2,3,4);") != query_key("way(1,2,3,5);")
+
+
+def test_entries_round_trip_until_they_expire(tmp_path):
+    cache = OverpassCache(str(tmp_path), 1 << 20, ttl_s=60)
+    cache.put("ab12", _body('{"elements": []}'))
+    with cache.open("ab12") as reader:
+        assert reader.read() == b'{"elements": []}'
+
+    path = cache._path("ab12")
+    stale = time.time() - 120
+    os.utime(path, (stale, stale))
+    assert cache.open("ab12") is None
+    assert not os.path.exists(path)
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_past_the_budget(tmp_path):
+    body = os.urandom(300)  # incompressible, so each entry is ~300 bytes
+    cache = OverpassCache(str(tmp_path), 1000, ttl_s=3600, max_entry_fraction=0.5)
+    now = time.time()
+    for age, key in ((30, "aa01"), (20, "bb02"), (10, "cc03")):
+        cache.put(key, body)
+        os.utime(cache._path(key), (now - age, now - age))
+    cache.open("aa01").close()  # now the most recently used
+
+    cache.put("dd04", body)
+    assert cache.open("bb02") is None
+    assert all(cache.open(key) is not None for key in ("aa01", "cc03", "dd04"))
+    assert cache.evictions == 1
+
+
+def test_oversized_entries_are_not_stored(tmp_path):
+    cache = OverpassCache(str(tmp_path), 1000, ttl_s=3600)
+    cache.put("ee05", os.urandom(400))
+    assert cache.open("ee05") is None
+    assert cache.stores == 0
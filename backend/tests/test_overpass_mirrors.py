@@ -0,0 +1,182 @@
+"""stream_overpass against stub mirrors served over real local HTTP."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import overpass
+import overpass_cache
+from overpass import MirrorStats, OverpassUnavailable, stream_overpass
+from overpass_cache import OverpassCache
+
+ELEMENTS = [{"type": "node", "id": index, "lat": 41.3, "lon": 69.2} for index in range(20)]
+BODY = json.dumps({"version": 0.6, "elements": ELEMENTS}).encode()
+
+
+class StubMirror:
+    """One Overpass mirror: answers ``status`` with ``body`` after ``delay``
+    seconds; ``cut_off`` closes the connection halfway through the body."""
+
+    def __init__(self, status=200, delay=0.0, body=BODY, cut_off=False):
+        self.status, self.delay, self.body, self.cut_off = status, delay, body, cut_off
+        self.requests = 0
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                mirror.requests += 1
+                time.sleep(mirror.delay)
+                try:
+                    self.send_response(mirror.status)
+                    self.send_header("Content-Length", str(len(mirror.body)))
+                    self.end_headers()
+                    if mirror.cut_off:
+                        self.wfile.write(mirror.body[: len(mirror.body) // 2])
+                        self.wfile.flush()
+                        self.close_connection = True
+                    else:
+                        self.wfile.write(mirror.body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *_args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/interpreter"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mirrors(monkeypatch):
+    """Install stub mirrors, in preference order, with fresh statistics."""
+    started = []
+
+    def install(*stubs, hedge_delay=0.2):
+        started.extend(stubs)
+        monkeypatch.setattr(overpass, "OVERPASS_URLS", tuple(stub.url for stub in stubs))
+        monkeypatch.setattr(overpass, "OVERPASS_HEDGE_DELAY_S", hedge_delay)
+        return stubs
+
+    monkeypatch.setattr(overpass, "mirror_stats", MirrorStats())
+    monkeypatch.setattr(overpass_cache, "disk_cache", None)
+    monkeypatch.setattr(overpass, "_client", None)
+    yield install
+    for stub in started:
+        stub.close()
+
+
+def _collect(query="[out:json];", **options):
+    async def collect():
+        try:
+            return [element async for element in stream_overpass(query, **options)]
+        finally:
+            await overpass.close_client()
+
+    return asyncio.run(collect())
+
+
+def test_failed_mirror_hands_over_to_the_next_at_once(mirrors):
+    failing, healthy = mirrors(StubMirror(status=504), StubMirror(), hedge_delay=30)
+    started = time.monotonic()
+    assert _collect() == ELEMENTS
+    assert time.monotonic() - started < 5
+    assert (failing.requests, healthy.requests) == (1, 1)
+
+
+def test_hanging_mirror_is_hedged_and_the_first_answer_wins(mirrors):
+    hanging, healthy = mirrors(StubMirror(delay=3), StubMirror(), hedge_delay=0.2)
+    started = time.monotonic()
+    assert _collect() == ELEMENTS
+    assert time.monotonic() - started < 2
+    assert (hanging.requests, healthy.requests) == (1, 1)
+    stats = overpass.mirror_stats.stats()
+    assert stats[healthy.url]["latency_s"] < 1
+    assert hanging.url not in stats  # cancelled, neither success nor failure
+
+
+def test_no_hedge_is_sent_while_the_preferred_mirror_answers_in_time(mirrors):
+    healthy, spare = mirrors(StubMirror(delay=0.05), StubMirror(), hedge_delay=2)
+    assert _collect() == ELEMENTS
+    assert (healthy.requests, spare.requests) == (1, 0)
+
+
+def test_ordering_adapts_to_failures_and_latency():
+    stats = MirrorStats()
+    urls = ("http://a", "http://b", "http://c")
+    assert stats.ordered(urls) == list(urls)
+    stats.record_failure("http://a")
+    stats.record_success("http://b", 8.0)
+    stats.record_success("http://c", 0.5)
+    assert stats.ordered(urls) == ["http://c", "http://b", "http://a"]
+
+
+def test_cut_off_response_fails_instead_of_mixing_mirrors(mirrors):
+    cut_off, spare = mirrors(StubMirror(cut_off=True), StubMirror(), hedge_delay=30)
+    with pytest.raises(OverpassUnavailable, match="cut off"):
+        _collect()
+    assert spare.requests == 0
+
+
+def test_every_mirror_failing_reports_each_failure(mirrors):
+    first, second = mirrors(StubMirror(status=504), StubMirror(status=429))
+    with pytest.raises(OverpassUnavailable) as failure:
+        _collect()
+    assert first.url in str(failure.value) and second.url in str(failure.value)
+    assert (first.requests, second.requests) == (2, 2)
+
+
+@pytest.fixture
+def disk_cache(monkeypatch, tmp_path):
+    cache = OverpassCache(str(tmp_path), 1 << 20, ttl_s=3600)
+    monkeypatch.setattr(overpass_cache, "disk_cache", cache)
+    return cache
+
+
+def test_repeat_query_is_replayed_from_the_disk_cache(mirrors, disk_cache):
+    (mirror,) = mirrors(StubMirror())
+    assert _collect("[out:json];  way(1,2,3,4);") == ELEMENTS
+    assert _collect("[out:json]; way(1,2,3,4);") == ELEMENTS
+    assert mirror.requests == 1
+    assert (disk_cache.stores, disk_cache.hits) == (1, 1)
+
+
+def test_bypass_asks_the_mirrors_and_refreshes_the_entry(mirrors, disk_cache):
+    (mirror,) = mirrors(StubMirror())
+    _collect()
+    changed = ELEMENTS[:3]
+    mirror.body = json.dumps({"elements": changed}).encode()
+    assert _collect(bypass_cache=True) == changed
+    assert _collect() == changed
+    assert mirror.requests == 2
+
+
+def test_responses_with_a_remark_are_not_cached(mirrors, disk_cache):
+    body = json.dumps({"elements": ELEMENTS[:2], "remark": "runtime error: timeout"})
+    (mirror,) = mirrors(StubMirror(body=body.encode()))
+    _collect()
+    _collect()
+    assert mirror.requests == 2
+    assert disk_cache.stores == 0
+
+
+def test_unreadable_entry_is_dropped(mirrors, disk_cache):
+    (mirror,) = mirrors(StubMirror())
+    _collect()
+    key = overpass_cache.query_key("[out:json];")
+    path = disk_cache._path(key)
+    with open(path, "r+b") as file:
+        file.truncate(40)
+    with pytest.raises(OverpassUnavailable, match="cached"):
+        _collect()
+    assert _collect() == ELEMENTS
+    assert mirror.requests == 2
@@ -1,4 +1,20 @@
-from overpass import parse_direction, parse_height, parse_int, parse_max_speed
+import json
+
+import pytest
+
+from overpass import ElementStream, parse_direction, parse_height, parse_int, parse_max_speed
+
+ELEMENTS = [
+    {"type": "way", "id": index, "tags": {"name": "Чорсу", "highway": "primary"},
+     "geometry": [{"lat": 41.3, "lon": 69.2}, {"lat": 41.31, "lon": 69.21}]}
+    for index in range(40)
+]
+BODY = json.dumps({
+    "version": 0.6,
+    "osm3s": {"copyright": "The data included in this document is from www.openstreetmap.org."},
+    "elements": ELEMENTS,
+    "remark": "ignored",
+}, ensure_ascii=False).encode()
 
 
 def test_parse_height_accepts_common_osm_forms():
@@ -55,3 +71,26 @@ def test_queries_embed_the_shared_timeout():
     bounds = BoundsRequest(west=69.2, south=41.3, east=69.3, north=41.4)
     for kind in IMPORT_KINDS.values():
         assert f"[timeout:{QUERY_TIMEOUT_S}]" in kind.query(bounds)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 4096, len(BODY)])
+def test_element_stream_yields_every_element_whatever_the_chunking(chunk_size):
+    elements = ElementStream()
+    parsed = []
+    for start in range(0, len(BODY), chunk_size):
+        parsed.extend(elements.feed(BODY[start:start + chunk_size]))
+    parsed.extend(elements.close())
+    assert parsed == ELEMENTS
+
+
+def test_element_stream_rejects_truncated_and_foreign_bodies():
+    truncated = ElementStream()
+    truncated.feed(BODY[: len(BODY) // 2])
+    with pytest.raises(ValueError):
+        truncated.close()
+    foreign = ElementStream()
+    foreign.feed(b"<html>rate limited</html>")
+    with pytest.raises(ValueError):
+        foreign.close()
+    empty = ElementStream()
+    assert empty.feed(b'{"elements": []}') == [] and empty.close() == []
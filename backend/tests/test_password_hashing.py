@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+
+import auth
+
+# A lower cost than production keeps the run short.
+PASSWORD_HASH = bcrypt.hashpw(b"editor-password", bcrypt.gensalt(rounds=10)).decode()
+
+
+class _GatedCheck:
+    """A stand-in for bcrypt that blocks its thread until released.
+
+    Counts how many calls run at once, so the tests assert on the pool bound
+    rather than on wall-clock timings.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.release.wait(10)
+        with self._lock:
+            self.running -= 1
+        return True
+
+
+def test_hashes_run_off_the_loop_and_at_most_workers_at_once():
+    hasher = auth.PasswordHasher(workers=2, max_waiting=3)
+    check = _GatedCheck()
+
+    async def scenario():
+        logins = [asyncio.create_task(hasher.run(check)) for _ in range(5)]
+        # The loop keeps running while every worker is blocked in a hash.
+        for _ in range(500):
+            if check.running == 2:
+                break
+            await asyncio.sleep(0.01)
+        stats = hasher.stats()
+        assert (check.running, stats["in_flight"], stats["waiting"]) == (2, 2, 3)
+
+        with pytest.raises(HTTPException) as refused:
+            await hasher.run(check)
+        assert refused.value.status_code == 503
+
+        check.release.set()
+        assert await asyncio.gather(*logins) == [True] * 5
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        hasher.close()
+    assert check.peak == 2
+    stats = hasher.stats()
+    assert (stats["calls"], stats["peak_pending"], stats["waiting"], stats["rejected"]) == (5, 5, 0, 1)
+
+
+def test_calls_beyond_the_queue_limit_are_refused():
+    hasher = auth.PasswordHasher(workers=1, max_waiting=0)
+
+    async def two_logins():
+        return await asyncio.gather(
+            hasher.run(auth._check, "editor-password", PASSWORD_HASH),
+            hasher.run(auth._check, "editor-password", PASSWORD_HASH),
+            return_exceptions=True,
+        )
+
+    try:
+        first, second = asyncio.run(two_logins())
+    finally:
+        hasher.close()
+    assert first is True
+    assert isinstance(second, HTTPException) and second.status_code == 503
+    assert hasher.stats()["rejected"] == 1
+
+
+def test_malformed_stored_hash_never_verifies():
+    assert asyncio.run(auth.verify_password("editor-password", "not-a-bcrypt-hash")) is False
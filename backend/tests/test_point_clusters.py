@@ -0,0 +1,50 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from point_clusters import CLUSTER_FEATURE_TYPES, cluster_cells, parse_cluster_types
+from serializers import cluster_to_geojson_json
+from tile_cache import tile_range
+
+TASHKENT = (69.15, 41.25, 69.35, 41.35)
+UZBEKISTAN = (55.9, 37.1, 73.2, 45.6)
+
+
+def test_types_default_to_every_clustered_type_in_canonical_order():
+    assert parse_cluster_types(None) == CLUSTER_FEATURE_TYPES
+    assert parse_cluster_types("streetlight, business") == ("business", "streetlight")
+    for value in ("", "road", "business,building"):
+        with pytest.raises(ValueError):
+            parse_cluster_types(value)
+
+
+def test_cells_are_two_levels_finer_than_the_map_zoom():
+    level, x_min, x_max, y_min, y_max = cluster_cells(TASHKENT, 11)
+    assert level == 12
+    assert (x_min, x_max, y_min, y_max) == tile_range(TASHKENT, 12, margin=0)
+    assert cluster_cells(TASHKENT, 12)[0] == 14
+    assert cluster_cells(TASHKENT, 0)[0] == 2
+    assert cluster_cells(TASHKENT, 20)[0] == 16
+
+
+def test_wide_viewports_coarsen_until_the_cell_budget_fits():
+    level, x_min, x_max, y_min, y_max = cluster_cells(UZBEKISTAN, 10, max_cells=4096)
+    assert level < 12
+    assert (x_max - x_min + 1) * (y_max - y_min + 1) <= 4096
+    finer = tile_range(UZBEKISTAN, level + 2, margin=0)
+    assert (finer[1] - finer[0] + 1) * (finer[3] - finer[2] + 1) > 4096
+
+
+def test_a_cell_is_a_point_feature_with_total_and_per_type_counts():
+    row = SimpleNamespace(
+        id=1531 * 4096 + 2836, count=5, lon=69.26, lat=41.31,
+        feature_types=["business", "streetlight"], counts=[2, 3],
+    )
+    feature = json.loads(cluster_to_geojson_json(row))
+    assert feature == {
+        "type": "Feature",
+        "id": 1531 * 4096 + 2836,
+        "geometry": {"type": "Point", "coordinates": [69.26, 41.31]},
+        "properties": {"count": 5, "counts": {"business": 2, "streetlight": 3}},
+    }
@@ -0,0 +1,50 @@
+from response_cache import RevisionLRU
+
+
+def test_hits_and_misses_are_counted():
+    cache = RevisionLRU(1000)
+    assert cache.get("a", 1) is None
+    cache.put("a", 1, b"body")
+    assert cache.get("a", 1) == b"body"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_newer_revision_invalidates_every_entry():
+    cache = RevisionLRU(1000)
+    cache.put("a", 1, b"old")
+    assert cache.get("a", 2) is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_bodies_read_at_an_older_revision_are_not_stored():
+    cache = RevisionLRU(1000)
+    assert cache.get("a", 5) is None
+    cache.put("a", 4, b"outdated")
+    assert cache.get("a", 5) is None
+
+
+def test_least_recently_used_entries_are_evicted_by_byte_budget():
+    cache = RevisionLRU(40, max_entry_fraction=0.5)
+    cache.put("a", 1, b"x" * 15)
+    cache.put("b", 1, b"y" * 15)
+    assert cache.get("a", 1) is not None  # "b" becomes least recently used
+    cache.put("c", 1, b"z" * 15)
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 30
+
+
+def test_oversized_entries_are_not_cached():
+    cache = RevisionLRU(100)
+    cache.put("a", 1, b"x" * 26)
+    assert cache.get("a", 1) is None
+
+
+def test_replacing_an_entry_keeps_the_byte_count_exact():
+    cache = RevisionLRU(100)
+    cache.put("a", 1, b"x" * 10)
+    cache.put("a", 1, b"x" * 20)
+    assert cache.stats()["bytes"] == 20
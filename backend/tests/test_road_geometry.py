@@ -1,5 +1,6 @@
 import pytest
 
+from feature_domain import validate_geometry_mapping
 from road_geometry import RoadGeometryError, split_road_span_geometry, validate_road_geometry
 
 
@@ -23,6 +24,15 @@ def test_invalid_or_zero_length_road_is_rejected(geometry):
         validate_road_geometry("road", geometry)
 
 
+def test_parsed_road_geometry_gets_the_same_checks():
+    validate_road_geometry("road", validate_geometry_mapping(road([[71.77, 40.38], [71.78, 40.39]])))
+    with pytest.raises(RoadGeometryError):
+        validate_road_geometry(
+            "road",
+            validate_geometry_mapping(road([[71.77, 40.38], [71.78, 40.39], [71.78, 40.39]])),
+        )
+
+
 def test_non_road_geometry_is_not_constrained_to_linestring():
     validate_road_geometry("point", {"type": "Point", "coordinates": [71.77, 40.38]})
 
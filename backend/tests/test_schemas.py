@@ -54,3 +54,59 @@ def test_business_registration_fields():
 def test_building_link_must_be_a_real_id():
     with pytest.raises(ValidationError):
         FeatureCreate(geometry={"type": "Point", "coordinates": [0, 0]}, building_id=0)
+
+
+def test_feature_geometry_is_parsed_once_from_request_to_wkb(monkeypatch):
+    import asyncio
+
+    import feature_domain
+    import feature_mutations
+
+    parses = []
+    real_shape = feature_domain.shape
+    monkeypatch.setattr(
+        feature_domain, "shape", lambda geometry: parses.append(geometry) or real_shape(geometry),
+    )
+    polygon = {
+        "type": "Polygon",
+        "coordinates": [[[69.2, 41.3], [69.3, 41.3], [69.3, 41.4], [69.2, 41.3]]],
+    }
+    feature = FeatureCreate(geometry=polygon, feature_type="building")
+    assert feature.geometry.bounds == (69.2, 41.3, 69.3, 41.4)
+    assert feature.model_dump()["geometry"] == polygon
+    asyncio.run(feature_mutations.geometry_value(feature.geometry, feature.feature_type))
+    assert len(parses) == 1
+
+
+@pytest.mark.parametrize("geometry", [
+    {"type": "LineString", "coordinates": [69.2, 41.3]},
+    {"type": "Polygon", "coordinates": [[69.2, 41.3], [69.3, 41.3], [69.3, 41.4], [69.2, 41.3]]},
+    {"type": "Point", "coordinates": [[69.2, 41.3]]},
+    {"type": "MultiLineString", "coordinates": [[[69.2, 41.3]], [[69.3, 41.3, 1, 2]]]},
+])
+def test_misnested_geometry_is_a_422_not_a_500(geometry):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import features_api
+    from auth import require_user
+    from database import get_db
+
+    with pytest.raises(ValidationError, match="must nest"):
+        FeatureUpdate(geometry=geometry)
+
+    app = FastAPI()
+    app.include_router(features_api.router)
+
+    async def no_db():
+        yield None
+
+    app.dependency_overrides[get_db] = no_db
+    app.dependency_overrides[require_user] = lambda: None
+    client = TestClient(app, raise_server_exceptions=False)
+    created = client.post("/features", json={"geometry": geometry, "feature_type": "line"})
+    updated = client.put(
+        "/features/1", json={"geometry": geometry},
+        headers={"If-Match": '"2024-01-01T00:00:00+00:00"'},
+    )
+    assert (created.status_code, updated.status_code) == (422, 422)
@@ -1,7 +1,15 @@
+import asyncio
 import json
+from datetime import datetime, timezone
 from types import SimpleNamespace
 
-from serializers import PROPERTY_COLUMNS, row_to_geojson
+from schemas import GeoJSONFeatureCollection
+from serializers import (
+    PROPERTY_COLUMNS,
+    feature_collection_chunks,
+    row_to_geojson,
+    row_to_geojson_json,
+)
 
 
 def make_row(**overrides):
@@ -49,3 +57,121 @@ def test_geojson_query_is_unordered_for_bbox_index_use():
     # country scale. Keep the base query unordered.
     from serializers import geojson_query
     assert "ORDER BY" not in str(geojson_query()).upper()
+
+
+def test_direct_encoding_matches_the_response_model():
+    row = make_row(
+        name="Чорсу",
+        updated_at=datetime(2024, 5, 1, 8, 30, 0, 125000, tzinfo=timezone.utc),
+    )
+    assert row_to_geojson_json(row) == row_to_geojson(row).model_dump_json().encode()
+
+
+def test_streamed_collection_matches_the_buffered_collection():
+    rows = [make_row(id=1), make_row(id=2, geometry_json=None), make_row(id=3)]
+
+    async def partitions():
+        yield rows[:2]
+        yield []
+        yield rows[2:]
+
+    async def collect():
+        return b"".join([chunk async for chunk in feature_collection_chunks(partitions())])
+
+    buffered = GeoJSONFeatureCollection(features=[row_to_geojson(row) for row in rows])
+    assert asyncio.run(collect()) == buffered.model_dump_json().encode()
+
+
+def test_empty_streamed_collection_is_valid_json():
+    async def partitions():
+        return
+        yield
+
+    async def collect():
+        return b"".join([chunk async for chunk in feature_collection_chunks(partitions())])
+
+    assert json.loads(asyncio.run(collect())) == {"type": "FeatureCollection", "features": []}
+
+
+def test_sql_assembled_feature_covers_every_serialized_column():
+    from serializers import AUDIT_COLUMNS, geojson_text_query
+
+    sql = str(geojson_text_query())
+    for ordinal, column in enumerate((*PROPERTY_COLUMNS, *AUDIT_COLUMNS)):
+        assert f"({ordinal}, '{column}', " in sql
+    # Compact json, not jsonb text, which puts a space after ":" and ",".
+    assert "json_strip_nulls(json_object_agg(key, value ORDER BY part, ordinal))" in sql
+    assert "jsonb_object_agg" not in sql and "::jsonb" not in sql
+    assert "WITH ORDINALITY" in sql
+    # Whole floats keep pydantic's ".0"; the only ORDER BY orders the keys.
+    assert "THEN (features.height_m::text || '.0')::json" in sql
+    assert sql.upper().count("ORDER BY") == 1
+
+
+def test_sql_collections_are_joined_without_json_agg_separators():
+    from serializers import geojson_text_collection_query, geojson_text_query
+
+    rows = geojson_text_query().limit(10)
+    sql = str(geojson_text_collection_query(rows))
+    assert "string_agg(layer.feature_json, ',')" in sql
+    assert sql.startswith("SELECT '{\"type\":\"FeatureCollection\",\"features\":[' || ")
+    assert "json_agg" not in sql
+
+
+def test_generalized_reads_fall_back_to_full_geometry():
+    from serializers import geojson_query, geojson_text_query
+
+    assert "coalesce(features.geometry_z9, features.geometry)" in str(
+        geojson_text_query("geometry_z9")
+    )
+    python_sql = str(geojson_query("geometry_z12").compile())
+    assert "coalesce(features.geometry_z12, features.geometry)" in python_sql
+    assert "geometry_z" not in str(geojson_query().compile())
+
+
+def test_vector_tiles_carry_the_style_attributes_and_api_timestamps():
+    from serializers import AUDIT_COLUMNS, mvt_tile_sql
+
+    sql = mvt_tile_sql()
+    for column in ("id", *PROPERTY_COLUMNS):
+        assert f"features.{column}" in sql
+    for column in AUDIT_COLUMNS:
+        assert f"\"Z\"') END AS {column}" in sql
+    # The index predicate stays on the full-resolution column.
+    generalized = mvt_tile_sql("geometry_z9")
+    assert "ST_Transform(coalesce(features.geometry_z9, features.geometry), 3857)" in generalized
+    assert "WHERE features.geometry && envelope.query" in generalized
+
+
+def test_binary_encodings_wrap_the_same_columns():
+    from serializers import AUDIT_COLUMNS, binary_collection_query, binary_rows_query
+
+    rows = binary_rows_query().limit(10)
+    fgb = str(binary_collection_query(rows, "application/flatgeobuf"))
+    assert "ST_AsFlatGeobuf(layer, true, 'geom')" in fgb
+    for column in ("id", *PROPERTY_COLUMNS, *AUDIT_COLUMNS, "extra_properties", "geom"):
+        assert column in fgb
+    geobuf = str(binary_collection_query(rows, "application/geobuf"))
+    assert "ST_AsGeobuf(layer, 'geom')" in geobuf
+
+
+def test_projected_reads_select_only_the_requested_fields():
+    from serializers import geojson_query, geojson_text_query
+
+    python_sql = str(geojson_query(fields=("name", "icon"), precision=6).compile())
+    assert "features.name" in python_sql and "features.icon" in python_sql
+    assert "features.properties" not in python_sql
+    assert "features.osm_tags" not in python_sql and "features.updated_at" not in python_sql
+    assert "ST_AsGeoJSON(features.geometry, " in python_sql
+
+    text_sql = str(geojson_text_query(fields=("name",), precision=5))
+    assert "ST_AsGeoJSON(features.geometry, 5)" in text_sql
+    assert "(0, 'name', to_json(features.name))" in text_sql and "'icon', " not in text_sql
+    assert "jsonb_each(features.properties)" not in text_sql
+    extras_only = str(geojson_text_query(fields=("properties",)))
+    assert "jsonb_each(features.properties)" in extras_only and "VALUES" not in extras_only
+
+
+def test_projected_rows_serialize_without_the_missing_columns():
+    row = SimpleNamespace(id=3, name="Depot", geometry_json=None)
+    assert row_to_geojson(row).properties == {"name": "Depot"}
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+from models import User
+from session_cache import SessionCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _user(user_id=4, revision=0, **values):
+    return User(
+        id=user_id, username=f"editor-{user_id}", is_admin=False, is_active=True,
+        created_at=datetime(2026, 7, 1, tzinfo=timezone.utc), auth_revision=revision,
+        password_hash="not-copied", **values,
+    )
+
+
+def _cache(**options):
+    clock = _Clock()
+    cache = SessionCache(clock=clock, **{"max_entries": 8, "ttl_s": 30, **options})
+    cache.on_listening(True)
+    return cache, clock
+
+
+def test_sessions_are_served_as_snapshots_until_the_ttl_or_token_expiry():
+    cache, clock = _cache()
+    cache.put("token-a", _user(), token_expires_in_s=3600)
+    cache.put("token-b", _user(5), token_expires_in_s=10)
+    snapshot = cache.get("token-a")
+    assert (snapshot.id, snapshot.username, snapshot.password_hash) == (4, "editor-4", None)
+
+    clock.now += 15
+    assert cache.get("token-a") is not None
+    assert cache.get("token-b") is None
+    clock.now += 15
+    assert cache.get("token-a") is None
+    assert cache.stats()["hits"] == 2
+
+
+def test_nothing_is_cached_while_notifications_cannot_arrive():
+    cache, _ = _cache()
+    cache.put("token-a", _user(), token_expires_in_s=3600)
+    cache.on_listening(False)
+    assert cache.get("token-a") is None
+    cache.put("token-a", _user(), token_expires_in_s=3600)
+    assert cache.get("token-a") is None
+
+
+def test_an_auth_change_evicts_the_user_and_refuses_older_lookups():
+    cache, _ = _cache()
+    cache.put("token-a", _user(4), token_expires_in_s=3600)
+    cache.put("token-b", _user(5), token_expires_in_s=3600)
+    cache.on_notification("4:1")
+    assert cache.get("token-a") is None
+    assert cache.get("token-b") is not None
+
+    # A lookup that read the row before the deactivation committed.
+    cache.put("token-a", _user(4, revision=0), token_expires_in_s=3600)
+    assert cache.get("token-a") is None
+    cache.put("token-a", _user(4, revision=1), token_expires_in_s=3600)
+    assert cache.get("token-a") is not None
+
+
+def test_least_recently_used_sessions_are_evicted_first():
+    cache, _ = _cache(max_entries=2)
+    cache.put("token-a", _user(1), token_expires_in_s=3600)
+    cache.put("token-b", _user(2), token_expires_in_s=3600)
+    cache.get("token-a")
+    cache.put("token-c", _user(3), token_expires_in_s=3600)
+    assert cache.get("token-b") is None
+    assert cache.get("token-a") is not None
@@ -0,0 +1,88 @@
+from tile_cache import MBTilesStore, TileCache, tile_range
+
+TASHKENT = (69.24, 41.29, 69.25, 41.30)
+SAMARKAND = (66.95, 39.64, 66.96, 39.65)
+
+
+def _tile_at(bounds, zoom):
+    x_min, _, y_min, _ = tile_range(bounds, zoom, margin=0)
+    return zoom, x_min, y_min
+
+
+def test_tile_range_covers_the_bounds_at_each_zoom():
+    assert tile_range((-180, -85, 180, 85), 0) == (0, 0, 0, 0)
+    assert tile_range((-180, -85, 180, 85), 2) == (0, 3, 0, 3)
+    x_min, x_max, y_min, y_max = tile_range(TASHKENT, 12, margin=0)
+    assert (x_min, y_min) == (2835, 1531)
+    assert x_max - x_min <= 1 and y_max - y_min <= 1
+
+
+def test_tile_range_includes_neighbours_within_the_render_buffer():
+    # A point just west of a tile edge at z12 (x=2836 starts at 69.2578125°).
+    edge = 69.2578125
+    point = (edge - 0.0001, 41.3, edge - 0.0001, 41.3)
+    assert tile_range(point, 12, margin=0)[:2] == (2835, 2835)
+    assert tile_range(point, 12)[:2] == (2835, 2836)
+
+
+def test_advance_evicts_only_tiles_under_dirty_bounds_at_every_zoom():
+    cache = TileCache(10_000)
+    cache.advance(1, [])
+    keys = [_tile_at(bounds, zoom) for bounds in (TASHKENT, SAMARKAND) for zoom in (6, 12, 16)]
+    for key in keys:
+        cache.put(key, 1, b"tile")
+    cache.advance(2, [(2, TASHKENT)])
+    for zoom in (6, 12, 16):
+        assert cache.get(_tile_at(TASHKENT, zoom)) is None
+    for zoom in (12, 16):
+        assert cache.get(_tile_at(SAMARKAND, zoom)) == b"tile"
+    assert cache.stats()["revision"] == 2
+
+
+def test_bounds_already_applied_are_ignored():
+    cache = TileCache(10_000)
+    cache.advance(5, [])
+    cache.put(_tile_at(TASHKENT, 12), 5, b"tile")
+    cache.advance(6, [(5, TASHKENT)])
+    assert cache.get(_tile_at(TASHKENT, 12)) == b"tile"
+
+
+def test_tiles_rendered_before_an_advance_are_not_stored():
+    cache = TileCache(10_000)
+    cache.advance(3, [])
+    cache.advance(4, [])
+    cache.put((0, 0, 0), 3, b"outdated")
+    assert cache.get((0, 0, 0)) is None
+
+
+def test_tile_cache_is_byte_budgeted_lru():
+    cache = TileCache(200, max_entry_fraction=0.5)
+    cache.advance(1, [])
+    cache.put((1, 0, 0), 1, b"a" * 20)
+    cache.put((1, 1, 0), 1, b"b" * 20)
+    assert cache.get((1, 0, 0)) is not None
+    cache.put((1, 0, 1), 1, b"c" * 20)
+    assert cache.get((1, 1, 0)) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 2 * (20 + 64)
+
+
+def test_mbtiles_store_invalidates_covered_tiles_and_rejects_stale_writes(tmp_path):
+    store = MBTilesStore(str(tmp_path / "tiles.mbtiles"))
+    store.advance(1, None)
+    tashkent, samarkand = _tile_at(TASHKENT, 14), _tile_at(SAMARKAND, 14)
+    store.put(tashkent, 1, b"t")
+    store.put(samarkand, 1, b"s")
+    assert store.get(tashkent) == b"t"
+
+    store.advance(2, [(2, TASHKENT)])
+    assert store.revision() == 2
+    assert store.get(tashkent) is None
+    assert store.get(samarkand) == b"s"
+
+    store.put(tashkent, 1, b"stale")
+    assert store.get(tashkent) is None
+
+    store.advance(3, None)
+    assert store.get(samarkand) is None
+    store.close()
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import re
+
+import pytest
+from pydantic import ValidationError
+
+import imports_api
+from osm_import import IMPORT_KINDS, UPSERT_CHUNK_SIZE
+from overpass import OverpassUnavailable
+from schemas import AreaImportRequest, BoundsRequest
+from tiled_import import _neighbours, run_tiled_import, tile_grid
+
+AREA = AreaImportRequest(west=69.0, south=41.0, east=70.0, north=41.75)
+
+
+def way(osm_id):
+    return {
+        "type": "way",
+        "id": osm_id,
+        "tags": {"highway": "residential"},
+        "geometry": [{"lon": 69.20, "lat": 41.30}, {"lon": 69.21, "lat": 41.30}],
+    }
+
+
+class Database:
+    def __init__(self):
+        self.added = []
+        self.committed = False
+        self.commits = 0
+
+    async def execute(self, _query):
+        class Result:
+            @staticmethod
+            def scalars():
+                return []
+
+        return Result()
+
+    def add(self, feature):
+        self.added.append(feature)
+
+    async def flush(self):
+        pass
+
+    def expunge_all(self):
+        pass
+
+    async def commit(self):
+        self.committed = True
+        self.commits += 1
+
+
+def _run(area, db, tile_degrees, **options):
+    async def run():
+        return [progress async for progress in run_tiled_import(
+            IMPORT_KINDS["roads"], tile_grid(area, tile_degrees), db, **options,
+        )]
+
+    return asyncio.run(run())
+
+
+def test_tile_grid_covers_the_area_with_viewport_sized_tiles():
+    tiles = tile_grid(AREA, 0.5)
+    assert len(tiles) == 2 * 2
+    assert all(isinstance(tile, BoundsRequest) for tile in tiles)
+    assert {(tile.west, tile.east) for tile in tiles} == {(69.0, 69.5), (69.5, 70.0)}
+    assert {(tile.south, tile.north) for tile in tiles} == {(41.0, 41.375), (41.375, 41.75)}
+    assert tile_grid(AREA, 0.2)[-1].east == AREA.east
+    assert len(tile_grid(AREA, 0.2)) == 5 * 4
+
+
+def test_tile_grid_of_an_off_grid_area_keeps_every_tile():
+    area = AreaImportRequest(west=69.00000004, south=41, east=70.00000004, north=42)
+    tiles = tile_grid(area, 0.5)
+    assert len(tiles) == 4
+    assert (tiles[0].west, tiles[-1].east) == (69.00000004, 70.00000004)
+    assert all(tile.east - tile.west < 0.5 + 1e-6 for tile in tiles)
+
+
+def test_area_imports_have_their_own_cap_and_viewport_imports_keep_theirs():
+    AreaImportRequest(west=60.0, south=40.0, east=64.0, north=44.0)
+    with pytest.raises(ValidationError, match="at most"):
+        AreaImportRequest(west=60.0, south=40.0, east=65.0, north=44.0)
+    with pytest.raises(ValidationError, match="too large"):
+        BoundsRequest(west=69.0, south=41.0, east=69.6, north=41.5)
+
+
+def test_tiles_are_fetched_concurrently_and_edge_elements_imported_once(monkeypatch):
+    running = 0
+    most_running = 0
+
+    async def streamed(query, bypass_cache=False):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        south, west = (float(value) for value in re.search(r"\(([\d.]+),([\d.]+),", query).groups())
+        await asyncio.sleep(0.01)
+        yield way(1)  # crosses every tile edge
+        yield way(int(south * 1000 + west * 10))
+        running -= 1
+
+    monkeypatch.setattr("tiled_import.stream_overpass", streamed)
+    db = Database()
+    reports = _run(AREA, db, 0.25, concurrency=3)
+
+    assert most_running == 3
+    assert [report["tiles_done"] for report in reports[:-1]] == list(range(1, 13))
+    final = reports[-1]
+    assert final["done"] and db.committed
+    assert (final["tiles"], final["elements"], final["duplicates"]) == (12, 13, 11)
+    assert final["roads_loaded"] == len(db.added) == 13
+    assert final["message"] == "Loaded 13 roads from OpenStreetMap"
+
+
+def test_repeats_are_only_looked_up_on_neighbouring_tiles(monkeypatch):
+    neighbours = _neighbours(tile_grid(AREA, 0.25))
+    assert neighbours[0] == (1, 4, 5)
+    assert neighbours[5] == (0, 1, 2, 4, 6, 8, 9, 10)
+    assert neighbours[11] == (6, 7, 10)
+
+    async def streamed(query, bypass_cache=False):
+        south, west = (float(value) for value in re.search(r"\(([\d.]+),([\d.]+),", query).groups())
+        if south == 41.0 and west in (69.0, 69.75):
+            yield way(7)  # the two ends of the bottom row, three tiles apart
+
+    monkeypatch.setattr("tiled_import.stream_overpass", streamed)
+    db = Database()
+    final = _run(AREA, db, 0.25, concurrency=1)[-1]
+    # Identities are not kept grid-wide; the idempotent upsert absorbs the repeat.
+    assert (final["elements"], final["duplicates"]) == (2, 0)
+
+
+def test_a_slow_tile_still_reports_progress_at_the_interval(monkeypatch):
+    async def streamed(query, bypass_cache=False):
+        await asyncio.sleep(0.2)
+        yield way(len(query))
+
+    monkeypatch.setattr("tiled_import.stream_overpass", streamed)
+    reports = _run(AREA, Database(), 0.5, concurrency=4, progress_interval=0.02)
+    waiting = [report for report in reports if report["tiles_done"] == 0]
+    assert len(waiting) >= 3
+    assert reports[-1]["done"]
+
+
+def test_a_failed_tile_stops_the_import_and_keeps_committed_chunks(monkeypatch):
+    async def streamed(query, bypass_cache=False):
+        if "41.375" in query.split("(")[-1].split(",")[0]:
+            raise OverpassUnavailable("All Overpass mirrors are busy")
+        for osm_id in range(UPSERT_CHUNK_SIZE):
+            yield way(osm_id * 10 + len(query) % 10)
+
+    monkeypatch.setattr("tiled_import.stream_overpass", streamed)
+    db = Database()
+    with pytest.raises(OverpassUnavailable):
+        _run(AREA, db, 0.5, concurrency=1)
+    # Each finished chunk was its own transaction.
+    assert db.commits >= 1
+    assert len(db.added) >= UPSERT_CHUNK_SIZE
+
+
+def test_area_import_stream_always_ends_with_a_terminal_line(monkeypatch):
+    class Session:
+        async def __aenter__(self):
+            return Database()
+
+        async def __aexit__(self, *_exc):
+            return False
+
+    async def failing(_kind, _tiles, _db):
+        yield {"tiles": 4, "tiles_done": 1}
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(imports_api, "async_session", Session)
+    monkeypatch.setattr(imports_api, "run_tiled_import", failing)
+
+    async def lines():
+        return [line async for line in imports_api._area_import_lines("roads", [])]
+
+    *progress, last = [json.loads(line) for line in asyncio.run(lines())]
+    assert progress == [{"tiles": 4, "tiles_done": 1}]
+    assert last["tiles_done"] == 1 and "failed" in last["error"]
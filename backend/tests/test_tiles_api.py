@@ -0,0 +1,20 @@
+from tiles_api import accepts_gzip
+
+
+def test_gzip_is_accepted_only_with_a_nonzero_quality():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.8")
+    assert accepts_gzip("x-gzip")
+    assert accepts_gzip("*")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("gzip; q=0.000, br")
+    assert not accepts_gzip("*;q=0")
+
+
+def test_an_explicit_gzip_entry_overrides_the_wildcard():
+    assert not accepts_gzip("*, gzip;q=0")
+    assert not accepts_gzip("gzip;q=0, *")
+    assert accepts_gzip("*;q=0, gzip")
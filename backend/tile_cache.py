@@ -0,0 +1,254 @@
+"""Rendered editor tiles cached until a write touches the area they cover.
+
+Writes record the bounds of the rows they changed (migration 017). A cache
+that falls behind the feature_stat revision evicts, at every zoom, only the
+tiles those bounds cover instead of starting over. Both stores here are
+synchronous and database-free; vector_tiles.py feeds them the dirty bounds.
+"""
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from feature_domain import Bounds
+
+TileKey = tuple[int, int, int]
+
+MAX_ZOOM = 22
+# Tiles are rendered with a 64/4096 buffer, so a change just outside a tile
+# can still draw inside it.
+TILE_MARGIN = 64 / 4096
+_MAX_LATITUDE = 85.0511287798066
+# Empty tiles are most of the cache by count; charge them a token size.
+_ENTRY_OVERHEAD = 64
+
+
+def tile_range(bounds: Bounds, zoom: int, margin: float = TILE_MARGIN) -> tuple[int, int, int, int]:
+    """XYZ tiles covering lon/lat bounds: ``(x_min, x_max, y_min, y_max)``."""
+    west, south, east, north = bounds
+    scale = 2 ** zoom
+
+    def tile_x(lon: float) -> float:
+        return (lon + 180.0) / 360.0 * scale
+
+    def tile_y(lat: float) -> float:
+        lat = math.radians(max(-_MAX_LATITUDE, min(_MAX_LATITUDE, lat)))
+        return (1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * scale
+
+    last = scale - 1
+    return (
+        max(0, min(last, math.floor(tile_x(west) - margin))),
+        max(0, min(last, math.floor(tile_x(east) + margin))),
+        max(0, min(last, math.floor(tile_y(north) - margin))),
+        max(0, min(last, math.floor(tile_y(south) + margin))),
+    )
+
+
+class TileCache:
+    """A byte-budgeted LRU of tile bodies, current as of ``revision``."""
+
+    def __init__(self, max_bytes: int, *, max_entry_fraction: float = 0.25):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.revision: Optional[int] = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[TileKey, bytes] = OrderedDict()
+        self._by_zoom: dict[int, set[tuple[int, int]]] = {}
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: TileKey, revision: int, body: bytes) -> None:
+        # A tile rendered before the last advance may predate an eviction.
+        if revision != self.revision or len(body) + _ENTRY_OVERHEAD > self.max_entry_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = body
+        self._by_zoom.setdefault(key[0], set()).add(key[1:])
+        self.size += len(body) + _ENTRY_OVERHEAD
+        while self.size > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def reset(self, revision: int) -> None:
+        self._entries.clear()
+        self._by_zoom.clear()
+        self.size = 0
+        self.revision = revision
+
+    def advance(self, revision: int, dirty: Iterable[tuple[int, Bounds]]) -> None:
+        """Evict tiles covering bounds recorded after ``self.revision``."""
+        if self.revision is None:
+            self.reset(revision)
+            return
+        if revision <= self.revision:
+            return
+        for dirty_revision, bounds in dirty:
+            if self.revision < dirty_revision <= revision:
+                self._evict_bounds(bounds)
+        self.revision = revision
+
+    def _evict_bounds(self, bounds: Bounds) -> None:
+        for zoom, cells in list(self._by_zoom.items()):
+            x_min, x_max, y_min, y_max = tile_range(bounds, zoom)
+            area = (x_max - x_min + 1) * (y_max - y_min + 1)
+            if area <= len(cells):
+                covered = [
+                    (x, y)
+                    for x in range(x_min, x_max + 1)
+                    for y in range(y_min, y_max + 1)
+                    if (x, y) in cells
+                ]
+            else:
+                covered = [
+                    (x, y) for x, y in cells
+                    if x_min <= x <= x_max and y_min <= y <= y_max
+                ]
+            for x, y in covered:
+                self._discard((zoom, x, y))
+                self.invalidations += 1
+
+    def _discard(self, key: TileKey) -> None:
+        body = self._entries.pop(key, None)
+        if body is None:
+            return
+        self.size -= len(body) + _ENTRY_OVERHEAD
+        cells = self._by_zoom[key[0]]
+        cells.discard(key[1:])
+        if not cells:
+            del self._by_zoom[key[0]]
+
+    def stats(self) -> dict[str, int | None]:
+        return {
+            "revision": self.revision,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class MBTilesStore:
+    """Tiles in an MBTiles (SQLite) file shared by every worker.
+
+    The file's revision lives in its metadata table; invalidation and writes
+    check it inside one SQLite transaction, so a worker that rendered a tile
+    before another worker advanced the file cannot store it afterwards.
+    Methods block; call them from a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, "
+                "tile_row INTEGER, tile_data BLOB, "
+                "PRIMARY KEY (zoom_level, tile_column, tile_row))"
+            )
+            connection.execute(
+                "INSERT OR IGNORE INTO metadata (name, value) VALUES "
+                "('name', 'features'), ('format', 'pbf')"
+            )
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _row(zoom: int, y: int) -> int:
+        # MBTiles rows count from the south (TMS); requests use XYZ.
+        return 2 ** zoom - 1 - y
+
+    def _revision(self, db: sqlite3.Connection) -> Optional[int]:
+        row = db.execute("SELECT value FROM metadata WHERE name = 'revision'").fetchone()
+        return int(row[0]) if row else None
+
+    def revision(self) -> Optional[int]:
+        with self._lock:
+            return self._revision(self._db())
+
+    def get(self, key: TileKey) -> Optional[bytes]:
+        zoom, x, y = key
+        with self._lock:
+            row = self._db().execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                "AND tile_row = ?",
+                (zoom, x, self._row(zoom, y)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: TileKey, revision: int, body: bytes) -> None:
+        zoom, x, y = key
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._revision(db) == revision:
+                    db.execute(
+                        "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                        (zoom, x, self._row(zoom, y), body),
+                    )
+            finally:
+                db.execute("COMMIT")
+
+    def advance(self, revision: int, dirty: Optional[Iterable[tuple[int, Bounds]]]) -> None:
+        """Delete tiles under newer dirty bounds, or all tiles when ``dirty``
+        is None (the database no longer has the bounds since this file's
+        revision)."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                stored = self._revision(db)
+                if stored is not None and stored >= revision:
+                    return
+                if stored is None or dirty is None:
+                    db.execute("DELETE FROM tiles")
+                else:
+                    for dirty_revision, bounds in dirty:
+                        if stored < dirty_revision <= revision:
+                            self._delete_bounds(db, bounds)
+                db.execute(
+                    "INSERT OR REPLACE INTO metadata (name, value) VALUES ('revision', ?)",
+                    (str(revision),),
+                )
+            finally:
+                db.execute("COMMIT")
+
+    def _delete_bounds(self, db: sqlite3.Connection, bounds: Bounds) -> None:
+        for zoom in range(MAX_ZOOM + 1):
+            x_min, x_max, y_min, y_max = tile_range(bounds, zoom)
+            db.execute(
+                "DELETE FROM tiles WHERE zoom_level = ? AND tile_column BETWEEN ? AND ? "
+                "AND tile_row BETWEEN ? AND ?",
+                (zoom, x_min, x_max, self._row(zoom, y_max), self._row(zoom, y_min)),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
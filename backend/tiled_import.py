@@ -0,0 +1,171 @@
+"""Large-area OSM imports fetched as a grid of Overpass tiles (rule B7).
+
+A viewport import stays one Overpass query within the 0.25 deg² cap of
+BoundsRequest. An area import (AreaImportRequest) is cut into tiles of at
+most TILED_IMPORT_TILE_DEGREES square, fetched TILED_IMPORT_CONCURRENCY at a
+time. An element crossing a tile edge comes back from every tile it touches
+and is upserted once, by OSM type and id: each tile's identities are kept
+only until the tile and all its neighbours are done, so memory follows the
+grid's frontier rather than the area. A long way that reappears in a
+non-neighbouring tile is upserted again, which the upsert makes harmless. Elements go through the chunked
+upsert of osm_import, each chunk committed on its own, so the import lock
+is never held for the length of an area import. A failed run keeps what it
+wrote; the upsert is idempotent, so running it again completes the area.
+Progress is reported after every tile and chunk, and at least every
+_PROGRESS_INTERVAL_S while a slow tile keeps the stream otherwise silent.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+from collections.abc import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import TILED_IMPORT_CONCURRENCY, TILED_IMPORT_TILE_DEGREES
+from osm_import import UPSERT_CHUNK_SIZE, ImportKind, build_candidate, commit_chunk, import_result
+from overpass import stream_overpass
+from schemas import AreaImportRequest, BoundsRequest
+
+# Elements buffered between the tile fetches and the upserts; a full queue
+# pauses the fetches instead of growing memory.
+_QUEUE_ELEMENTS = 5000
+# Tile edges are rounded so the same area always yields the same queries
+# (and Overpass disk-cache keys).
+_EDGE_DIGITS = 7
+# Well under nginx's 180s proxy_read_timeout (rule X5), so a tile stuck in
+# the Overpass fallback chain never leaves the NDJSON stream idle that long.
+_PROGRESS_INTERVAL_S = 30.0
+
+_TILE_DONE = object()
+
+
+def tile_grid(
+    area: AreaImportRequest, tile_degrees: float = TILED_IMPORT_TILE_DEGREES,
+) -> list[BoundsRequest]:
+    """Equal tiles covering ``area``, each ``tile_degrees`` wide and high at
+    most, row by row from the south-west corner.
+
+    The area was validated already, so tiles skip BoundsRequest validation:
+    rounding an inner edge may leave a tile a hair over the viewport cap.
+    """
+
+    def edges(low: float, high: float) -> list[float]:
+        count = max(1, math.ceil((high - low) / tile_degrees))
+        step = (high - low) / count
+        inner = [round(low + step * index, _EDGE_DIGITS) for index in range(1, count)]
+        return [low, *inner, high]
+
+    columns = edges(area.west, area.east)
+    rows = edges(area.south, area.north)
+    return [
+        BoundsRequest.model_construct(
+            west=west, south=south, east=east, north=north, bypass_cache=area.bypass_cache,
+        )
+        for south, north in zip(rows, rows[1:])
+        for west, east in zip(columns, columns[1:])
+    ]
+
+
+def _neighbours(tiles: list[BoundsRequest]) -> list[tuple[int, ...]]:
+    """Indexes of the up to eight tiles around each tile of a tile_grid."""
+    columns = sum(1 for tile in tiles if tile.south == tiles[0].south) if tiles else 1
+    rows = len(tiles) // columns
+    return [
+        tuple(
+            (row + down) * columns + column + across
+            for down in (-1, 0, 1)
+            for across in (-1, 0, 1)
+            if (down or across) and 0 <= row + down < rows and 0 <= column + across < columns
+        )
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+async def _fetch_tile(
+    kind: ImportKind,
+    index: int,
+    tile: BoundsRequest,
+    queue: asyncio.Queue,
+    slots: asyncio.Semaphore,
+) -> None:
+    try:
+        async with slots:
+            async for element in stream_overpass(kind.query(tile), bypass_cache=tile.bypass_cache):
+                await queue.put((index, element))
+        await queue.put((index, _TILE_DONE))
+    except Exception as error:  # handed to the consumer, which fails the import
+        await queue.put((index, error))
+
+
+async def run_tiled_import(
+    kind: ImportKind,
+    tiles: list[BoundsRequest],
+    db: AsyncSession,
+    *,
+    concurrency: int = TILED_IMPORT_CONCURRENCY,
+    progress_interval: float = _PROGRESS_INTERVAL_S,
+) -> AsyncIterator[dict]:
+    """Import ``tiles`` (see tile_grid), yielding progress as it goes.
+
+    Every progress report carries ``tiles``, ``tiles_done``, ``elements``
+    (imported so far), ``duplicates`` (edge-crossing repeats skipped) and the
+    kind's count key of rows committed so far; the last one adds ``done``
+    and the run_import result message. A failure raises; the rows counted in
+    the last report stay imported.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_ELEMENTS)
+    slots = asyncio.Semaphore(concurrency)
+    fetches = [
+        asyncio.create_task(_fetch_tile(kind, index, tile, queue, slots))
+        for index, tile in enumerate(tiles)
+    ]
+    progress = {
+        "tiles": len(tiles), "tiles_done": 0, "elements": 0, "duplicates": 0, kind.count_key: 0,
+    }
+    neighbours = _neighbours(tiles)
+    seen: dict[int, set[tuple[str, int]]] = {}
+    finished: set[int] = set()
+    chunk = []
+
+    try:
+        while progress["tiles_done"] < len(tiles):
+            try:
+                index, item = await asyncio.wait_for(queue.get(), progress_interval)
+            except asyncio.TimeoutError:
+                yield dict(progress)
+                continue
+            if item is _TILE_DONE:
+                progress["tiles_done"] += 1
+                finished.add(index)
+                for tile in (index, *neighbours[index]):
+                    if tile in finished and finished.issuperset(neighbours[tile]):
+                        seen.pop(tile, None)
+                yield dict(progress)
+                continue
+            if isinstance(item, Exception):
+                raise item
+            identity = (item.get("type"), item.get("id"))
+            repeated = any(identity in seen.get(tile, ()) for tile in (index, *neighbours[index]))
+            seen.setdefault(index, set()).add(identity)
+            if repeated:
+                progress["duplicates"] += 1
+                continue
+            progress["elements"] += 1
+            feature = build_candidate(kind, item)
+            if feature is None:
+                continue
+            chunk.append(feature)
+            if len(chunk) >= UPSERT_CHUNK_SIZE:
+                progress[kind.count_key] += await commit_chunk(kind, chunk, db)
+                chunk = []
+                yield dict(progress)
+        if chunk:
+            progress[kind.count_key] += await commit_chunk(kind, chunk, db)
+    finally:
+        for fetch in fetches:
+            fetch.cancel()
+        await asyncio.gather(*fetches, return_exceptions=True)
+
+    yield {**progress, **import_result(kind, progress[kind.count_key]), "done": True}
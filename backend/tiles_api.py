@@ -0,0 +1,57 @@
+"""Editor vector tiles over HTTP (rule B1: routes stay thin, rendering and
+caching in vector_tiles.py). nginx serves these at /tiles/editor/.
+"""
+import gzip
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import vector_tiles
+from auth import require_admin
+from database import get_db
+from feature_reads import header_qualities
+from models import User
+from tile_cache import MAX_ZOOM
+
+router = APIRouter()
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding allows gzip: listed (or matched by ``*``)
+    with a q-value above zero. An explicit gzip entry overrides ``*``.
+    """
+    qualities = header_qualities(accept_encoding)
+    for coding in qualities:
+        if coding in ("gzip", "x-gzip"):
+            return qualities[coding] > 0
+    return qualities.get("*", 0.0) > 0
+
+
+@router.get("/tiles/editor/cache")
+async def editor_tile_cache_stats(_: User = Depends(require_admin)):
+    """This worker's tile cache counters; each uvicorn worker has its own."""
+    return vector_tiles.cache_stats()
+
+
+@router.api_route("/tiles/editor/{z}/{x}/{y}", methods=["GET", "HEAD"])
+async def editor_tile(
+    z: int = Path(ge=0, le=MAX_ZOOM),
+    x: int = Path(ge=0),
+    y: int = Path(ge=0),
+    accept_encoding: Optional[str] = Header(default=None, alias="Accept-Encoding"),
+    db: AsyncSession = Depends(get_db),
+):
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=422, detail="tile x/y are outside zoom level z")
+    body, cache_status = await vector_tiles.editor_tile(db, (z, x, y))
+    headers = {"X-Cache": cache_status, "Vary": "Accept-Encoding"}
+    if not body:
+        return Response(status_code=204, headers=headers)
+    if accepts_gzip(accept_encoding):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(body, media_type=MVT_MEDIA_TYPE, headers=headers)
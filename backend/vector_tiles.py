@@ -0,0 +1,117 @@
+"""Editor vector tiles rendered by PostGIS and cached tile by tile.
+
+Each request first brings the caches up to the current feature_stat revision
+by evicting the tiles under the bounds recorded since (migration 017), then
+serves from memory, from the optional MBTiles file, or renders the tile.
+Bodies are stored gzip-compressed; an empty body is an empty tile.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import TILE_CACHE_MAX_BYTES, TILE_CACHE_MBTILES
+from feature_domain import Bounds
+from feature_reads import feature_revision, generalized_geometry
+from serializers import mvt_tile_sql
+from tile_cache import TILE_MARGIN, MBTilesStore, TileCache, TileKey
+
+EXTENT = 4096
+BUFFER = 64
+# Migration 017 keeps at least this many revisions of dirty bounds; a cache
+# further behind cannot know what changed and starts over.
+RETAINED_REVISIONS = 10000
+# Past this many recorded bounds, clearing is cheaper than evicting.
+MAX_DIRTY_BOUNDS = 50000
+
+_DIRTY_BOUNDS_SQL = text(
+    "SELECT revision, ST_XMin(bounds), ST_YMin(bounds), ST_XMax(bounds), ST_YMax(bounds) "
+    "FROM feature_dirty_bounds WHERE revision > :since AND revision <= :until "
+    "LIMIT :limit"
+)
+
+tile_cache = TileCache(TILE_CACHE_MAX_BYTES)
+disk_cache: Optional[MBTilesStore] = MBTilesStore(TILE_CACHE_MBTILES) if TILE_CACHE_MBTILES else None
+_sync_lock = asyncio.Lock()
+
+
+async def _dirty_bounds(
+    db: AsyncSession, since: int, until: int,
+) -> Optional[list[tuple[int, Bounds]]]:
+    """Bounds written after ``since``, or None when only a reset is safe."""
+    if until - since > RETAINED_REVISIONS:
+        return None
+    rows = (await db.execute(_DIRTY_BOUNDS_SQL, {
+        "since": since, "until": until, "limit": MAX_DIRTY_BOUNDS + 1,
+    })).all()
+    if len(rows) > MAX_DIRTY_BOUNDS:
+        return None
+    return [(row[0], (row[1], row[2], row[3], row[4])) for row in rows]
+
+
+async def sync(db: AsyncSession) -> int:
+    """Advance both caches to the current revision and return it.
+
+    The revision is read before any tile is rendered, so a cached tile is
+    never older than the revision it is stored under.
+    """
+    revision = await feature_revision(db)
+    async with _sync_lock:
+        disk_revision = await asyncio.to_thread(disk_cache.revision) if disk_cache else None
+        behind = [
+            known for known in (
+                tile_cache.revision,
+                disk_revision if disk_cache is not None else None,
+            )
+            if known is not None and known < revision
+        ]
+        dirty = await _dirty_bounds(db, min(behind), revision) if behind else None
+        if tile_cache.revision is None or (dirty is None and tile_cache.revision < revision):
+            tile_cache.reset(revision)
+        else:
+            tile_cache.advance(revision, dirty or ())
+        if disk_cache is not None and (disk_revision is None or disk_revision < revision):
+            await asyncio.to_thread(disk_cache.advance, revision, dirty)
+    return revision
+
+
+async def render_tile(db: AsyncSession, key: TileKey) -> bytes:
+    zoom, x, y = key
+    body = await db.scalar(text(mvt_tile_sql(generalized_geometry(zoom))), {
+        "z": zoom, "x": x, "y": y,
+        "extent": EXTENT, "buffer": BUFFER, "margin": TILE_MARGIN,
+    })
+    return gzip.compress(bytes(body), compresslevel=6) if body else b""
+
+
+async def editor_tile(db: AsyncSession, key: TileKey) -> tuple[bytes, str]:
+    """The gzip tile body and where it came from: HIT, DISK, or MISS."""
+    revision = await sync(db)
+    body = tile_cache.get(key)
+    if body is not None:
+        return body, "HIT"
+    if disk_cache is not None:
+        body = await asyncio.to_thread(disk_cache.get, key)
+        if body is not None:
+            tile_cache.put(key, revision, body)
+            return body, "DISK"
+    body = await render_tile(db, key)
+    tile_cache.put(key, revision, body)
+    if disk_cache is not None:
+        await asyncio.to_thread(disk_cache.put, key, revision, body)
+    return body, "MISS"
+
+
+def cache_stats() -> dict:
+    stats = tile_cache.stats()
+    stats["disk"] = disk_cache.path if disk_cache is not None else None
+    return stats
+
+
+def close() -> None:
+    if disk_cache is not None:
+        disk_cache.close()
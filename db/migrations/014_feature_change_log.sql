@@ -0,0 +1,93 @@
+-- 014: durable per-row change log for delta sync.
+-- Tabs that notice a new feature_stat revision used to refetch the whole
+-- collection even when one row changed. The statement-level stamp from 008 is
+-- replaced by three transition-table triggers that bump the same revision and
+-- record which feature ids the statement upserted or deleted, so
+-- /features/changes?since=<revision> can return just those rows.
+--
+-- feature_stat.change_log_floor is the oldest `since` for which the log is
+-- complete. It moves forward when old entries are pruned and when one
+-- statement touches too many rows to log (the bulk load): a client behind the
+-- floor must do a full reload. Idempotent so a re-run is a no-op.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS feature_changes (
+    revision BIGINT NOT NULL,
+    feature_id INTEGER NOT NULL,
+    deleted BOOLEAN NOT NULL,
+    PRIMARY KEY (revision, feature_id)
+);
+
+ALTER TABLE feature_stat
+    ADD COLUMN IF NOT EXISTS change_log_floor BIGINT NOT NULL DEFAULT 0;
+
+-- Writes before this migration were never logged.
+UPDATE feature_stat SET change_log_floor = revision
+WHERE id AND NOT EXISTS (SELECT 1 FROM feature_changes);
+
+CREATE OR REPLACE FUNCTION log_feature_changes() RETURNS trigger AS $$
+DECLARE
+    -- Statements above this size (bulk loads, clear-all) move the floor
+    -- instead of logging every row; a full reload is cheaper for them anyway.
+    max_logged_rows CONSTANT BIGINT := 10000;
+    -- Revisions of history kept for lagging tabs, pruned every 1000 bumps.
+    retained_revisions CONSTANT BIGINT := 10000;
+    current_revision BIGINT;
+    changed_rows BIGINT;
+BEGIN
+    UPDATE feature_stat SET revision = revision + 1, updated_at = now() WHERE id
+    RETURNING revision INTO current_revision;
+
+    IF TG_OP = 'DELETE' THEN
+        SELECT count(*) INTO changed_rows FROM old_rows;
+    ELSE
+        SELECT count(*) INTO changed_rows FROM new_rows;
+    END IF;
+
+    IF changed_rows > max_logged_rows THEN
+        UPDATE feature_stat SET change_log_floor = current_revision WHERE id;
+        DELETE FROM feature_changes WHERE revision < current_revision;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO feature_changes (revision, feature_id, deleted)
+        SELECT current_revision, id, TRUE FROM old_rows;
+    ELSE
+        INSERT INTO feature_changes (revision, feature_id, deleted)
+        SELECT current_revision, id, FALSE FROM new_rows;
+    END IF;
+
+    IF current_revision % 1000 = 0 THEN
+        DELETE FROM feature_changes
+        WHERE revision <= current_revision - retained_revisions;
+        UPDATE feature_stat
+        SET change_log_floor = greatest(change_log_floor, current_revision - retained_revisions)
+        WHERE id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The single statement trigger from 008 would bump the revision a second time.
+DROP TRIGGER IF EXISTS features_bump_stat ON features;
+
+DROP TRIGGER IF EXISTS features_change_log_insert ON features;
+CREATE TRIGGER features_change_log_insert
+    AFTER INSERT ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_feature_changes();
+
+DROP TRIGGER IF EXISTS features_change_log_update ON features;
+CREATE TRIGGER features_change_log_update
+    AFTER UPDATE ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_feature_changes();
+
+DROP TRIGGER IF EXISTS features_change_log_delete ON features;
+CREATE TRIGGER features_change_log_delete
+    AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION log_feature_changes();
+
+COMMIT;
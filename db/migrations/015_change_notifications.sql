@@ -0,0 +1,44 @@
+-- 015: push change notifications instead of per-tab polling.
+-- Every open client tab polled /features/version, one pooled query each. The
+-- backend now holds one LISTEN connection per worker and fans these
+-- notifications out to Server-Sent Events subscribers. NOTIFY is delivered
+-- only when the writing transaction commits, so a subscriber never hears about
+-- a revision it cannot read yet. Idempotent so a re-run is a no-op.
+BEGIN;
+
+-- Statement triggers for one event fire in name order, so this runs after
+-- features_change_log_* (014) has bumped the revision it announces.
+CREATE OR REPLACE FUNCTION notify_feature_stat() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'feature_stat',
+        (SELECT revision FROM feature_stat WHERE id)::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS features_notify_stat ON features;
+CREATE TRIGGER features_notify_stat
+    AFTER INSERT OR UPDATE OR DELETE ON features
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_feature_stat();
+
+CREATE OR REPLACE FUNCTION notify_road_network_state() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('road_network_state', json_build_object(
+        'status', NEW.status,
+        'progress', NEW.progress,
+        'is_stale', NEW.is_stale,
+        'source_revision', NEW.source_revision,
+        'published_revision', NEW.published_revision
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS road_network_build_state_notify ON road_network_build_state;
+CREATE TRIGGER road_network_build_state_notify
+    AFTER UPDATE ON road_network_build_state
+    FOR EACH ROW EXECUTE FUNCTION notify_road_network_state();
+
+COMMIT;
@@ -0,0 +1,56 @@
+-- 016: precomputed generalized geometry for low-zoom viewport reads.
+-- Large landuse, forest and water polygons and long roads dominate viewport
+-- payloads at low zoom, where most of their vertices fall inside one pixel.
+-- Each row keeps topology-preserving simplifications for two zoom bands,
+-- written by a BEFORE trigger so reads never simplify per request. A band
+-- column is NULL when simplification removes no vertex (points, short
+-- lines); readers fall back to the full geometry. The tolerances are about
+-- half a pixel at the band's highest zoom and must match
+-- GENERALIZED_GEOMETRY_LEVELS in backend/feature_reads.py.
+-- Idempotent so a re-run is a no-op.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION generalize_feature_geometry(
+    geom geometry,
+    tolerance double precision
+) RETURNS geometry LANGUAGE sql IMMUTABLE AS $$
+    SELECT simplified
+    FROM (SELECT ST_SimplifyPreserveTopology(geom, tolerance) AS simplified) generalized
+    WHERE ST_NPoints(simplified) < ST_NPoints(geom)
+$$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'features' AND column_name = 'geometry_z9'
+    ) THEN
+        ALTER TABLE features
+            ADD COLUMN geometry_z9 geometry(Geometry, 4326),
+            ADD COLUMN geometry_z12 geometry(Geometry, 4326);
+        -- Derived columns are not an edit: the backfill must not bump the
+        -- feature revision, flood the change log, or stale the road network.
+        ALTER TABLE features DISABLE TRIGGER USER;
+        UPDATE features
+        SET geometry_z9 = generalize_feature_geometry(geometry, 0.001),
+            geometry_z12 = generalize_feature_geometry(geometry, 0.0001)
+        WHERE geometry IS NOT NULL;
+        ALTER TABLE features ENABLE TRIGGER USER;
+    END IF;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION set_generalized_geometry() RETURNS trigger AS $$
+BEGIN
+    NEW.geometry_z9 := generalize_feature_geometry(NEW.geometry, 0.001);
+    NEW.geometry_z12 := generalize_feature_geometry(NEW.geometry, 0.0001);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS features_generalize_geometry ON features;
+CREATE TRIGGER features_generalize_geometry
+    BEFORE INSERT OR UPDATE OF geometry ON features
+    FOR EACH ROW EXECUTE FUNCTION set_generalized_geometry();
+
+COMMIT;
@@ -0,0 +1,81 @@
+-- 017: dirty-tile bounds for the backend editor tile cache.
+-- Martin could not invalidate cached editor tiles, so it ran without a cache
+-- and every tile request queried PostGIS. The backend now caches rendered
+-- tiles and evicts only those covering a change. Each feature write records
+-- the bounds of the rows it touched — before and after the write, so a moved
+-- or deleted feature also clears the tiles it left — stamped with the
+-- revision 014 bumped for that statement. Idempotent so a re-run is a no-op.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS feature_dirty_bounds (
+    revision BIGINT NOT NULL,
+    bounds geometry(Geometry, 4326) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feature_dirty_bounds_revision_idx
+    ON feature_dirty_bounds (revision);
+
+-- Statement triggers for one event fire in name order, so these run after
+-- features_change_log_* (014) has bumped the revision they record.
+CREATE OR REPLACE FUNCTION record_feature_dirty_bounds() RETURNS trigger AS $$
+DECLARE
+    -- Larger statements (bulk loads, clear-all) record one extent per side
+    -- instead of an envelope per row.
+    max_row_bounds CONSTANT BIGINT := 1000;
+    -- Matches feature_changes retention; backend/vector_tiles.py clears its
+    -- whole cache when it falls further behind than this.
+    retained_revisions CONSTANT BIGINT := 10000;
+    current_revision BIGINT;
+BEGIN
+    SELECT revision INTO current_revision FROM feature_stat WHERE id;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF (SELECT count(*) FROM old_rows) > max_row_bounds THEN
+            INSERT INTO feature_dirty_bounds (revision, bounds)
+            SELECT current_revision, ST_SetSRID(ST_Extent(geometry)::geometry, 4326)
+            FROM old_rows HAVING ST_Extent(geometry) IS NOT NULL;
+        ELSE
+            INSERT INTO feature_dirty_bounds (revision, bounds)
+            SELECT DISTINCT current_revision, ST_Envelope(geometry)
+            FROM old_rows WHERE geometry IS NOT NULL;
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF (SELECT count(*) FROM new_rows) > max_row_bounds THEN
+            INSERT INTO feature_dirty_bounds (revision, bounds)
+            SELECT current_revision, ST_SetSRID(ST_Extent(geometry)::geometry, 4326)
+            FROM new_rows HAVING ST_Extent(geometry) IS NOT NULL;
+        ELSE
+            INSERT INTO feature_dirty_bounds (revision, bounds)
+            SELECT DISTINCT current_revision, ST_Envelope(geometry)
+            FROM new_rows WHERE geometry IS NOT NULL;
+        END IF;
+    END IF;
+
+    IF current_revision % 1000 = 0 THEN
+        DELETE FROM feature_dirty_bounds
+        WHERE revision <= current_revision - retained_revisions;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS features_dirty_bounds_insert ON features;
+CREATE TRIGGER features_dirty_bounds_insert
+    AFTER INSERT ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_feature_dirty_bounds();
+
+DROP TRIGGER IF EXISTS features_dirty_bounds_update ON features;
+CREATE TRIGGER features_dirty_bounds_update
+    AFTER UPDATE ON features
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_feature_dirty_bounds();
+
+DROP TRIGGER IF EXISTS features_dirty_bounds_delete ON features;
+CREATE TRIGGER features_dirty_bounds_delete
+    AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_feature_dirty_bounds();
+
+COMMIT;
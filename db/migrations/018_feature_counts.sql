@@ -0,0 +1,75 @@
+-- 018: exact per-type feature counts maintained on write.
+-- /meta counted the whole features table on every client load, and the bulk
+-- loader grouped it again for its summary. Transition-table triggers now keep
+-- one row per (feature_type, source_kind) up to date, so both read a handful
+-- of rows. Every feature write already locks the single feature_stat row
+-- first (014), so these upserts never deadlock. Idempotent so a re-run is a
+-- no-op.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS feature_counts (
+    feature_type TEXT,
+    source_kind TEXT NOT NULL,
+    count BIGINT NOT NULL
+);
+-- feature_type may be NULL; NULLS NOT DISTINCT makes it one key.
+CREATE UNIQUE INDEX IF NOT EXISTS feature_counts_key
+    ON feature_counts (feature_type, source_kind) NULLS NOT DISTINCT;
+
+CREATE OR REPLACE FUNCTION count_feature_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO feature_counts (feature_type, source_kind, count)
+        SELECT feature_type, source_kind, count(*) FROM new_rows GROUP BY 1, 2
+        ON CONFLICT (feature_type, source_kind)
+        DO UPDATE SET count = feature_counts.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO feature_counts (feature_type, source_kind, count)
+        SELECT feature_type, source_kind, -count(*) FROM old_rows GROUP BY 1, 2
+        ON CONFLICT (feature_type, source_kind)
+        DO UPDATE SET count = feature_counts.count + EXCLUDED.count;
+    ELSE
+        -- Only rows whose type or kind changed move a count.
+        INSERT INTO feature_counts (feature_type, source_kind, count)
+        SELECT feature_type, source_kind, sum(delta)
+        FROM (
+            SELECT feature_type, source_kind, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT feature_type, source_kind, 1 FROM new_rows
+        ) moved
+        GROUP BY 1, 2
+        HAVING sum(delta) <> 0
+        ON CONFLICT (feature_type, source_kind)
+        DO UPDATE SET count = feature_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Counting and installing the triggers must not miss a concurrent write.
+LOCK TABLE features IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO feature_counts (feature_type, source_kind, count)
+SELECT feature_type, source_kind, count(*) FROM features
+WHERE NOT EXISTS (SELECT 1 FROM feature_counts)
+GROUP BY 1, 2;
+
+DROP TRIGGER IF EXISTS features_counts_insert ON features;
+CREATE TRIGGER features_counts_insert
+    AFTER INSERT ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_feature_changes();
+
+DROP TRIGGER IF EXISTS features_counts_update ON features;
+CREATE TRIGGER features_counts_update
+    AFTER UPDATE ON features
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_feature_changes();
+
+DROP TRIGGER IF EXISTS features_counts_delete ON features;
+CREATE TRIGGER features_counts_delete
+    AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_feature_changes();
+
+COMMIT;
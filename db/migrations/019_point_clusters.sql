@@ -0,0 +1,108 @@
+-- 019: multi-resolution point counts for low-zoom cluster reads.
+-- A country-wide bbox read of point features would flood the browser, so the
+-- full-base editor showed nothing below its edit zoom. Point features are now
+-- summarized per Web Mercator grid cell at every even grid level 2..16: a
+-- cell at level L is one XYZ tile at zoom L. Each row keeps the count and the
+-- coordinate sums, so a cluster's position is the mean of its points.
+-- Transition-table triggers keep the cells current like feature_counts (018),
+-- and every feature write already locks the feature_stat row first (014), so
+-- these upserts never deadlock. Idempotent so a re-run is a no-op.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS feature_point_cells (
+    level SMALLINT NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    feature_type TEXT NOT NULL,
+    count BIGINT NOT NULL,
+    sum_lon DOUBLE PRECISION NOT NULL,
+    sum_lat DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (level, cell_x, cell_y, feature_type)
+);
+
+-- The grid cell of a lon/lat at every summarized level (the XYZ tile math
+-- of backend/tile_cache.py).
+CREATE OR REPLACE FUNCTION feature_point_cells_of(lon DOUBLE PRECISION, lat DOUBLE PRECISION)
+RETURNS TABLE (level SMALLINT, cell_x INTEGER, cell_y INTEGER) AS $$
+    SELECT
+        grid.level::SMALLINT,
+        least(grid.scale - 1, greatest(0, floor((lon + 180.0) / 360.0 * grid.scale)))::INTEGER,
+        least(grid.scale - 1, greatest(0, floor(
+            (1.0 - asinh(tan(radians(least(85.0511287798066, greatest(-85.0511287798066, lat)))))
+                / pi()) / 2.0 * grid.scale
+        )))::INTEGER
+    FROM (
+        SELECT level, 2 ^ level AS scale FROM generate_series(2, 16, 2) AS level
+    ) grid
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+CREATE OR REPLACE FUNCTION cluster_point_changes() RETURNS trigger AS $$
+DECLARE
+    -- Signed point rows of one transition table; other types are never
+    -- summarized.
+    points CONSTANT TEXT :=
+        'SELECT feature_type, ST_X(geometry) AS lon, ST_Y(geometry) AS lat, %s AS delta '
+        'FROM %I WHERE GeometryType(geometry) = ''POINT'' AND feature_type IN '
+        '(''point'', ''poi'', ''business'', ''streetlight'', ''traffic_light'')';
+    deltas TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        deltas := format(points, 1, 'new_rows');
+    ELSIF TG_OP = 'DELETE' THEN
+        deltas := format(points, -1, 'old_rows');
+    ELSE
+        deltas := format(points, -1, 'old_rows') || ' UNION ALL ' || format(points, 1, 'new_rows');
+    END IF;
+    -- An update that moved no point cancels out and writes no row.
+    EXECUTE
+        'INSERT INTO feature_point_cells AS cells '
+        '(level, cell_x, cell_y, feature_type, count, sum_lon, sum_lat) '
+        'SELECT cell.level, cell.cell_x, cell.cell_y, points.feature_type, '
+        'sum(points.delta), sum(points.lon * points.delta), sum(points.lat * points.delta) '
+        'FROM (' || deltas || ') points '
+        'CROSS JOIN LATERAL feature_point_cells_of(points.lon, points.lat) cell '
+        'GROUP BY 1, 2, 3, 4 '
+        'HAVING sum(points.delta) <> 0 '
+        'OR sum(points.lon * points.delta) <> 0 OR sum(points.lat * points.delta) <> 0 '
+        'ON CONFLICT (level, cell_x, cell_y, feature_type) DO UPDATE SET '
+        'count = cells.count + EXCLUDED.count, '
+        'sum_lon = cells.sum_lon + EXCLUDED.sum_lon, '
+        'sum_lat = cells.sum_lat + EXCLUDED.sum_lat';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Summarizing and installing the triggers must not miss a concurrent write.
+LOCK TABLE features IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO feature_point_cells (level, cell_x, cell_y, feature_type, count, sum_lon, sum_lat)
+SELECT cell.level, cell.cell_x, cell.cell_y, points.feature_type,
+       count(*), sum(points.lon), sum(points.lat)
+FROM (
+    SELECT feature_type, ST_X(geometry) AS lon, ST_Y(geometry) AS lat FROM features
+    WHERE feature_type IN ('point', 'poi', 'business', 'streetlight', 'traffic_light')
+      AND GeometryType(geometry) = 'POINT'
+) points
+CROSS JOIN LATERAL feature_point_cells_of(points.lon, points.lat) cell
+WHERE NOT EXISTS (SELECT 1 FROM feature_point_cells)
+GROUP BY 1, 2, 3, 4;
+
+DROP TRIGGER IF EXISTS features_point_cells_insert ON features;
+CREATE TRIGGER features_point_cells_insert
+    AFTER INSERT ON features
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION cluster_point_changes();
+
+DROP TRIGGER IF EXISTS features_point_cells_update ON features;
+CREATE TRIGGER features_point_cells_update
+    AFTER UPDATE ON features
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION cluster_point_changes();
+
+DROP TRIGGER IF EXISTS features_point_cells_delete ON features;
+CREATE TRIGGER features_point_cells_delete
+    AFTER DELETE ON features
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION cluster_point_changes();
+
+COMMIT;
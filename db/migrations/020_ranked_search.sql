@@ -0,0 +1,27 @@
+-- 020: index-ordered feature search.
+-- The 006 GIN index filters a leading-wildcard ILIKE, but every match still
+-- had to be sorted, and a one-letter query matches most named features. Two
+-- indexes now return matches already in rank order, so a LIMIT stops early:
+-- a C-collated b-tree over a normalized name serves prefix lookups as a range
+-- scan, and a GiST trigram index serves word-similarity ranking as a
+-- nearest-neighbour scan. Unnamed features (most buildings) are left out of
+-- both. Idempotent so a re-run is a no-op.
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Case- and whitespace-insensitive form of a name; search queries are
+-- normalized with the same function.
+CREATE OR REPLACE FUNCTION feature_search_key(name TEXT) RETURNS TEXT AS $$
+    SELECT lower(regexp_replace(btrim(name), '\s+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+CREATE INDEX IF NOT EXISTS idx_features_search_key
+  ON features (feature_search_key(name) COLLATE "C")
+  WHERE name IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_features_name_trgm_gist
+  ON features USING gist (name gist_trgm_ops)
+  WHERE name IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,71 @@
+-- 021: one feature_stat revision per transaction.
+-- 014 bumped the revision once per statement, so a transaction that writes
+-- several statements (a road split, a /features/batch of edits) published
+-- one revision per statement, each a separate invalidation for every cache
+-- and tab, although no reader can observe the revisions in between.
+-- feature_stat now remembers which transaction made the last bump; later
+-- statements of that transaction log their rows under the same revision.
+-- The first statement still takes the feature_stat row lock, so the lock
+-- order of 014 is unchanged. Idempotent so a re-run is a no-op.
+BEGIN;
+
+ALTER TABLE feature_stat ADD COLUMN IF NOT EXISTS revision_xact xid8;
+
+CREATE OR REPLACE FUNCTION log_feature_changes() RETURNS trigger AS $$
+DECLARE
+    -- Statements above this size (bulk loads, clear-all) move the floor
+    -- instead of logging every row; a full reload is cheaper for them anyway.
+    max_logged_rows CONSTANT BIGINT := 10000;
+    -- Revisions of history kept for lagging tabs, pruned every 1000 bumps.
+    retained_revisions CONSTANT BIGINT := 10000;
+    current_revision BIGINT;
+    bumped BOOLEAN := FALSE;
+    changed_rows BIGINT;
+BEGIN
+    UPDATE feature_stat
+    SET revision = revision + 1, updated_at = now(), revision_xact = pg_current_xact_id()
+    WHERE id AND revision_xact IS DISTINCT FROM pg_current_xact_id()
+    RETURNING revision INTO current_revision;
+    IF FOUND THEN
+        bumped := TRUE;
+    ELSE
+        -- An earlier statement of this transaction already bumped it.
+        UPDATE feature_stat SET updated_at = now() WHERE id
+        RETURNING revision INTO current_revision;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        SELECT count(*) INTO changed_rows FROM old_rows;
+    ELSE
+        SELECT count(*) INTO changed_rows FROM new_rows;
+    END IF;
+
+    IF changed_rows > max_logged_rows THEN
+        UPDATE feature_stat SET change_log_floor = current_revision WHERE id;
+        DELETE FROM feature_changes WHERE revision < current_revision;
+        RETURN NULL;
+    END IF;
+
+    -- A row written twice in one transaction keeps its last state.
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO feature_changes (revision, feature_id, deleted)
+        SELECT current_revision, id, TRUE FROM old_rows
+        ON CONFLICT (revision, feature_id) DO UPDATE SET deleted = EXCLUDED.deleted;
+    ELSE
+        INSERT INTO feature_changes (revision, feature_id, deleted)
+        SELECT current_revision, id, FALSE FROM new_rows
+        ON CONFLICT (revision, feature_id) DO UPDATE SET deleted = EXCLUDED.deleted;
+    END IF;
+
+    IF bumped AND current_revision % 1000 = 0 THEN
+        DELETE FROM feature_changes
+        WHERE revision <= current_revision - retained_revisions;
+        UPDATE feature_stat
+        SET change_log_floor = greatest(change_log_floor, current_revision - retained_revisions)
+        WHERE id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,35 @@
+-- 022: an auth revision stamp on users for cached session lookups.
+-- Each API worker caches the active user behind a session token for a few
+-- seconds, so authenticated requests skip a users lookup. A change that
+-- affects authorization (deactivate, demote, rename, new password) bumps the
+-- row's auth_revision and NOTIFYs 'user_auth' with "id:revision" on commit;
+-- every worker's change-event connection drops its cached sessions for that
+-- user, and a lookup that read an older revision is never cached. Idempotent
+-- so a re-run is a no-op.
+BEGIN;
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS auth_revision BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION bump_user_auth_revision() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('user_auth', OLD.id || ':' || (OLD.auth_revision + 1));
+        RETURN OLD;
+    END IF;
+    IF NEW.is_active IS DISTINCT FROM OLD.is_active
+       OR NEW.is_admin IS DISTINCT FROM OLD.is_admin
+       OR NEW.username IS DISTINCT FROM OLD.username
+       OR NEW.password_hash IS DISTINCT FROM OLD.password_hash THEN
+        NEW.auth_revision := OLD.auth_revision + 1;
+        PERFORM pg_notify('user_auth', NEW.id || ':' || NEW.auth_revision);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_auth_revision ON users;
+CREATE TRIGGER users_auth_revision
+    BEFORE UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION bump_user_auth_revision();
+
+COMMIT;
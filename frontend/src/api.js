@@ -59,13 +59,24 @@ async function request(path, { method = 'GET', body, headers = {} } = {}) {
 }
 
 export const featuresApi = {
-  list: () => request('/api/features'),
+  list: () => request('/api/features?stream=true'),
   version: () => request('/api/features/version'),
+  changes: (since) => request(`/api/features/changes?since=${since}`),
+  // Pushed `features` (revision) and `road_network` (rebuild state) events.
+  events: () => new EventSource('/api/features/events'),
   meta: () => request('/api/meta'),
   businesses: (buildingId) => request(`/api/features/${buildingId}/businesses`),
-  search: (query, limit = 20) => request(`/api/features/search?q=${encodeURIComponent(query)}&limit=${limit}`),
+  // Matches inside bbox, when given, rank first.
+  search: (query, limit = 20, bbox = null) => request(
+    `/api/features/search?q=${encodeURIComponent(query)}&limit=${limit}${bbox ? `&bbox=${bbox}` : ''}`,
+  ),
   listInBounds: (bbox, limit) => request(`/api/features?bbox=${bbox}&limit=${limit}`),
+  // Point counts per grid cell, for overviews below the edit zoom.
+  clusters: (bbox, zoom) => request(`/api/features/clusters?bbox=${bbox}&zoom=${Math.floor(zoom)}`),
   get: (id) => request(`/api/features/${id}`),
+  // Many features in one round trip; ids that no longer exist come back in
+  // `missing`.
+  getMany: (ids) => request('/api/features/batch-get', { method: 'POST', body: { ids } }),
   create: (payload) => request('/api/features', { method: 'POST', body: payload }),
   update: (
     id,
@@ -117,6 +128,22 @@ export const featuresApi = {
       headers: versionHeaders(expectedUpdatedAt),
     },
   ),
+  // Creates, updates, and deletes applied in one transaction; all or none.
+  // Updates and deletes carry expectedUpdatedAt like update() and remove().
+  batch: (operations) => request('/api/features/batch', {
+    method: 'POST',
+    body: {
+      operations: operations.map(({
+        expectedUpdatedAt, confirmPublished = false, ...operation
+      }) => (operation.op === 'create'
+        ? operation
+        : {
+          ...operation,
+          if_match: versionHeaders(expectedUpdatedAt)['If-Match'],
+          confirm_published: confirmPublished,
+        })),
+    },
+  }),
   clearAll: () => request('/api/features/clear-all', { method: 'DELETE' }),
   importOsm: (kind, bounds) => request(`/api/load-osm-${kind}`, { method: 'POST', body: bounds }),
 };
@@ -201,3 +201,49 @@ export function addTileSymbolLayers(map) {
     }, beforeId);
   }
 }
+
+// Server-side point counts per grid cell (GET /features/clusters), shown
+// below the zoom where the tile icons start. EditorData fills the source.
+export const CLUSTER_SOURCE = 'editor_clusters';
+const CLUSTER_MAX_ZOOM = 15;
+
+export function addClusterLayers(map) {
+  if (!map.getSource(CLUSTER_SOURCE)) {
+    map.addSource(CLUSTER_SOURCE, {
+      type: 'geojson',
+      data: { type: 'FeatureCollection', features: [] },
+    });
+  }
+  const beforeId = map.getLayer('place-labels') ? 'place-labels' : undefined;
+  if (!map.getLayer('editor-clusters')) {
+    map.addLayer({
+      id: 'editor-clusters',
+      type: 'circle',
+      source: CLUSTER_SOURCE,
+      maxzoom: CLUSTER_MAX_ZOOM,
+      paint: {
+        'circle-color': '#3b82f6',
+        'circle-opacity': 0.75,
+        'circle-stroke-color': '#ffffff',
+        'circle-stroke-width': 1,
+        'circle-radius': ['interpolate', ['linear'], ['get', 'count'], 1, 4, 100, 12, 10000, 24],
+      },
+    }, beforeId);
+  }
+  if (!map.getLayer('editor-cluster-counts')) {
+    map.addLayer({
+      id: 'editor-cluster-counts',
+      type: 'symbol',
+      source: CLUSTER_SOURCE,
+      maxzoom: CLUSTER_MAX_ZOOM,
+      filter: ['>', ['get', 'count'], 1],
+      layout: {
+        'text-field': ['to-string', ['get', 'count']],
+        'text-font': ['Noto Sans Regular'],
+        'text-size': 10,
+        'text-allow-overlap': true,
+      },
+      paint: { 'text-color': '#ffffff' },
+    }, beforeId);
+  }
+}
@@ -1,4 +1,5 @@
 import { featuresApi } from './api.js';
+import { FeatureCollectionSync } from './editor-data.js';
 import { enableEmojiIcons, featureAnchors } from './emoji-icons.js';
 import { setLayerVisibility } from './layers.js';
 import { addTileSymbolLayers, paintEditorAsBasemap, EDITOR_3D_LAYER } from './basemap-render.js';
@@ -52,19 +53,22 @@ let fullBase = false;
 
 let revision = 0;
 let lastVersion = null;
+const collection = new FeatureCollectionSync();
 
-// Polling asks only for a change stamp (count + latest timestamp); the tile
-// source (and, in overlay mode, the anchor source) reload only when an edit
-// actually happened, so an idle map never repaints. In full-base mode the
-// whole-collection fetch is skipped entirely — nothing scales it to 2.2M rows.
-async function refreshEdits() {
+// Edits arrive as pushed `features` events carrying the feature_stat revision;
+// without EventSource the client polls the cheap /features/version stamp
+// instead. The tile source (and, in overlay mode, the anchor source) reload
+// only when the revision actually moved, so an idle map never repaints. In
+// full-base mode the whole-collection fetch is skipped entirely — nothing
+// scales it to 2.2M rows. In overlay mode only the rows changed since the last
+// refresh are fetched.
+async function refreshEdits(knownRevision) {
   try {
-    const version = await featuresApi.version();
-    const stamp = `${version.revision}`;
+    const stamp = `${knownRevision ?? (await featuresApi.version()).revision}`;
     if (stamp === lastVersion) return;
     if (!fullBase) {
-      const collection = await featuresApi.list();
-      map.getSource('editor_anchors')?.setData(featureAnchors(collection.features));
+      const features = await collection.load();
+      map.getSource('editor_anchors')?.setData(featureAnchors(features));
     }
     revision += 1;
     map.getSource('editor')?.setTiles([`/tiles/editor/{z}/{x}/{y}?revision=${revision}`]);
@@ -74,6 +78,28 @@ async function refreshEdits() {
   }
 }
 
+// A hidden tab defers the refresh; returning to the tab applies the newest
+// revision it heard about (or polls for one) immediately.
+function followEdits() {
+  if (typeof EventSource === 'undefined') {
+    setInterval(() => {
+      if (!document.hidden) refreshEdits();
+    }, REFRESH_INTERVAL_MS);
+    document.addEventListener('visibilitychange', () => {
+      if (!document.hidden) refreshEdits();
+    });
+    return;
+  }
+  let pushedRevision = null;
+  featuresApi.events().addEventListener('features', (event) => {
+    pushedRevision = JSON.parse(event.data).revision;
+    if (!document.hidden) refreshEdits(pushedRevision);
+  });
+  document.addEventListener('visibilitychange', () => {
+    if (!document.hidden && pushedRevision != null) refreshEdits(pushedRevision);
+  });
+}
+
 // Repaint to the basemap palette as soon as the style parses — before the
 // first tile is fetched or painted. The `load` event fires only after the first
 // full render, so painting there flashes the editor's editing colors (violet/
@@ -95,11 +121,5 @@ map.on('load', async () => {
   }
   if (fullBase) addTileSymbolLayers(map);
   await refreshEdits();
-  // A hidden tab skips polling; returning to the tab refreshes immediately.
-  setInterval(() => {
-    if (!document.hidden) refreshEdits();
-  }, REFRESH_INTERVAL_MS);
-  document.addEventListener('visibilitychange', () => {
-    if (!document.hidden) refreshEdits();
-  });
+  followEdits();
 });
@@ -1,10 +1,51 @@
 import { featuresApi } from './api.js';
 import { applyBaseFeatureMasks } from './base-masks.js';
+import { CLUSTER_SOURCE } from './basemap-render.js';
 import { featureAnchors } from './emoji-icons.js';
-import { collectVertices } from './geometry.js';
+import { collectVertices, viewportBbox } from './geometry.js';
 
 const VIEWPORT_FEATURE_LIMIT = 2000;
 const EDIT_ZOOM = 15;
+const EMPTY_COLLECTION = { type: 'FeatureCollection', features: [] };
+
+// Replaces changed features and drops deleted ids from a collection, as
+// returned by /api/features/changes.
+export function applyFeatureChanges(features, changes) {
+  const replaced = new Set(
+    [...changes.deleted, ...changes.features.map((feature) => feature.id)].map(String),
+  );
+  return [
+    ...features.filter((feature) => !replaced.has(String(feature.id))),
+    ...changes.features,
+  ];
+}
+
+// Keeps one full feature collection current. The first load (and any load
+// the server answers with full_reload) fetches everything; later loads ask
+// only for rows changed since the revision already held. The revision is read
+// before the collection, so it can only understate what the copy contains.
+export class FeatureCollectionSync {
+  constructor() {
+    this.features = null;
+    this.revision = null;
+  }
+
+  async load() {
+    if (this.features && this.revision != null) {
+      const changes = await featuresApi.changes(this.revision);
+      if (!changes.full_reload) {
+        this.features = applyFeatureChanges(this.features, changes);
+        this.revision = changes.revision;
+        return this.features;
+      }
+    }
+    const { revision } = await featuresApi.version();
+    const collection = await featuresApi.list();
+    this.features = collection.features;
+    this.revision = revision;
+    return this.features;
+  }
+}
 
 // Owns feature collection reads and their map-facing derived data. Each read
 // gets a sequence token so a slower old viewport response cannot replace a
@@ -14,6 +55,8 @@ export class EditorData {
     this.map = map;
     this.featureCount = featureCount;
     this.sequence = 0;
+    this.showingClusters = false;
+    this.collection = new FeatureCollectionSync();
   }
 
   async refresh({ fullBase, totalFeatureCount, baseFilters }) {
@@ -22,16 +65,16 @@ export class EditorData {
       return this.refreshViewport(sequence, totalFeatureCount);
     }
     try {
-      const collection = await featuresApi.list();
+      const features = await this.collection.load();
       if (!this.isCurrent(sequence)) return null;
-      const visible = this.visibleFeatures(collection.features);
+      const visible = this.visibleFeatures(features);
       this.featureCount.textContent = visible.length;
-      applyBaseFeatureMasks(this.map, baseFilters, collection.features);
-      this.map.getSource('editor_anchors')?.setData(featureAnchors(collection.features));
+      applyBaseFeatureMasks(this.map, baseFilters, features);
+      this.map.getSource('editor_anchors')?.setData(featureAnchors(features));
       return {
         visible,
         snapVertices: collectVertices(visible),
-        tombstones: collection.features.filter(
+        tombstones: features.filter(
           (feature) => feature.properties?.source_kind === 'base_tombstone',
         ),
       };
@@ -49,17 +92,15 @@ export class EditorData {
       this.featureCount.textContent = totalFeatureCount;
     }
     if (this.map.getZoom() < EDIT_ZOOM) {
+      await this.refreshClusters(sequence);
       return { visible: [], snapVertices: [], tombstones: null };
     }
+    if (this.showingClusters) this.setClusters(EMPTY_COLLECTION);
     try {
-      const bounds = this.map.getBounds();
-      const bbox = [
-        bounds.getWest(),
-        bounds.getSouth(),
-        bounds.getEast(),
-        bounds.getNorth(),
-      ].join(',');
-      const collection = await featuresApi.listInBounds(bbox, VIEWPORT_FEATURE_LIMIT);
+      const collection = await featuresApi.listInBounds(
+        viewportBbox(this.map),
+        VIEWPORT_FEATURE_LIMIT,
+      );
       if (!this.isCurrent(sequence)) return null;
       const visible = this.visibleFeatures(collection.features);
       return {
@@ -74,6 +115,22 @@ export class EditorData {
     }
   }
 
+  // Below the edit zoom, point features are drawn as server-side counts per
+  // grid cell instead of being downloaded.
+  async refreshClusters(sequence) {
+    try {
+      const clusters = await featuresApi.clusters(viewportBbox(this.map), this.map.getZoom());
+      if (this.isCurrent(sequence)) this.setClusters(clusters);
+    } catch (error) {
+      if (this.isCurrent(sequence)) console.error('Unable to load point clusters', error);
+    }
+  }
+
+  setClusters(collection) {
+    this.map.getSource(CLUSTER_SOURCE)?.setData(collection);
+    this.showingClusters = collection.features.length > 0;
+  }
+
   visibleFeatures(features) {
     return features.filter(
       (feature) => feature.properties?.source_kind !== 'base_tombstone',
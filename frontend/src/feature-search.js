@@ -1,5 +1,5 @@
 import { featuresApi } from './api.js';
-import { geometryBounds } from './geometry.js';
+import { geometryBounds, viewportBbox } from './geometry.js';
 import { t } from './strings.js';
 
 export class FeatureSearchUI {
@@ -31,7 +31,7 @@ export class FeatureSearchUI {
     if (!needle) return;
     let feature;
     try {
-      feature = (await featuresApi.search(needle, 1)).features[0];
+      feature = (await featuresApi.search(needle, 1, viewportBbox(this.map))).features[0];
     } catch (error) {
       console.error('Unable to search features', error);
       this.onStatus(t('searchMiss', { query: needle }), true);
@@ -54,7 +54,7 @@ export class FeatureSearchUI {
 
   async populateOptions(query, sequence = ++this.requestSequence) {
     try {
-      const collection = await featuresApi.search(query, 8);
+      const collection = await featuresApi.search(query, 8, viewportBbox(this.map));
       if (sequence !== this.requestSequence) return;
       const names = [
         ...new Set(collection.features
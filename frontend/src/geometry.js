@@ -217,6 +217,18 @@ export function geometryBounds(geometry) {
   return [[west, south], [east, north]];
 }
 
+// The map's visible bounds as an API bbox parameter, clamped to valid
+// coordinates because the view can span more than one world copy.
+export function viewportBbox(map) {
+  const bounds = map.getBounds();
+  return [
+    Math.max(-180, bounds.getWest()),
+    Math.max(-90, bounds.getSouth()),
+    Math.min(180, bounds.getEast()),
+    Math.min(90, bounds.getNorth()),
+  ].join(',');
+}
+
 function roundCoordinates(value) {
   if (Array.isArray(value)) return value.map(roundCoordinates);
   return Number(value.toFixed(COORDINATE_PRECISION));
@@ -2,6 +2,7 @@ import { featuresApi } from './api.js';
 import { AuthController } from './auth-ui.js';
 import { captureBaseFilters } from './base-masks.js';
 import {
+  addClusterLayers,
   addTileSymbolLayers,
   paintEditorAsBasemap,
   TILE_SYMBOL_LAYERS,
@@ -224,6 +225,7 @@ class MapEditor {
       if (this.fullBase) {
         paintEditorAsBasemap(this.map);
         addTileSymbolLayers(this.map);
+        addClusterLayers(this.map);
         this.interactiveLayers = [...EDITOR_LAYERS, ...TILE_SYMBOL_LAYERS];
         this.elements['toggle-imports'].checked = true;
       }
@@ -5,7 +5,11 @@ import {
   mergeFeatureProperties,
   rawFeaturePayload,
 } from '../frontend/src/feature-form.js';
-import { EditorData } from '../frontend/src/editor-data.js';
+import {
+  EditorData,
+  FeatureCollectionSync,
+  applyFeatureChanges,
+} from '../frontend/src/editor-data.js';
 import { featuresApi } from '../frontend/src/api.js';
 import { UndoStack } from '../frontend/src/undo-stack.js';
 
@@ -134,4 +138,66 @@ assert.throws(
   /feature version is required/i,
 );
 
+// Delta sync replaces changed rows, drops deleted ids, and falls back to a
+// full reload when the server's change log no longer covers the revision.
+const point = (id, name) => ({ id, geometry: null, properties: { name } });
+assert.deepEqual(
+  applyFeatureChanges(
+    [point(1, 'kept'), point(2, 'old'), point(3, 'deleted')],
+    { features: [point(2, 'new'), point(4, 'added')], deleted: ['3'] },
+  ).map((feature) => `${feature.id}:${feature.properties.name}`),
+  ['1:kept', '2:new', '4:added'],
+);
+const syncResponses = {
+  '/api/features/version': { revision: 5 },
+  '/api/features?stream=true': { type: 'FeatureCollection', features: [point(1, 'a')] },
+  '/api/features/changes?since=5': {
+    revision: 6, full_reload: false, features: [point(2, 'b')], deleted: [1],
+  },
+  '/api/features/changes?since=6': { revision: 9, full_reload: true, features: [], deleted: [] },
+};
+const syncPaths = [];
+globalThis.fetch = async (path) => {
+  syncPaths.push(path);
+  return { ok: true, status: 200, json: async () => syncResponses[path] };
+};
+const sync = new FeatureCollectionSync();
+assert.deepEqual((await sync.load()).map((feature) => feature.id), [1]);
+assert.deepEqual((await sync.load()).map((feature) => feature.id), [2]);
+assert.equal(sync.revision, 6);
+syncResponses['/api/features/version'] = { revision: 9 };
+assert.deepEqual((await sync.load()).map((feature) => feature.id), [1]);
+assert.equal(sync.revision, 9);
+assert.deepEqual(syncPaths, [
+  '/api/features/version',
+  '/api/features?stream=true',
+  '/api/features/changes?since=5',
+  '/api/features/changes?since=6',
+  '/api/features/version',
+  '/api/features?stream=true',
+]);
+
+// Below the edit zoom a full-base viewport reads point clusters, not features.
+const clusterData = [];
+const clusterPaths = [];
+globalThis.fetch = async (path) => {
+  clusterPaths.push(path);
+  return {
+    ok: true,
+    status: 200,
+    json: async () => ({ type: 'FeatureCollection', features: [point(9, 'cell')] }),
+  };
+};
+const overview = new EditorData({
+  map: {
+    ...map,
+    getZoom: () => 7.6,
+    getSource: () => ({ setData: (data) => clusterData.push(data) }),
+  },
+  featureCount,
+});
+assert.deepEqual((await overview.refresh({ fullBase: true })).visible, []);
+assert.deepEqual(clusterPaths, ['/api/features/clusters?bbox=71,40,72,41&zoom=7']);
+assert.equal(clusterData[0].features[0].id, 9);
+
 console.log('Feature payload, undo-state, and concurrency checks passed');